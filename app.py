@@ -1,3 +1,4 @@
+import os
 from flask import Flask
 from flask_cors import CORS
 #from config import db, DATABASE_URI
@@ -19,12 +20,19 @@ from models.TblTicketFollower import TblTicketFollower
 from controllers.UserController import user_controller
 from controllers.CategoryController import category_controller
 from controllers.TicketController import ticket_controller
+from controllers.WebhookController import webhook_controller
+from controllers.UploadController import upload_controller
+from service.grispi_sync import GRISPI_SYNC_ENABLED, start_grispi_sync
+from service.mailer import MAIL_QUEUE_ENABLED, get_mail_queue
 
 
 
 
 app = Flask(__name__)
 CORS(app)
+
+# Dosya indirmelerinde gövdeyi web sunucusu (Apache mod_xsendfile / lighttpd) yazsın
+app.config['USE_X_SENDFILE'] = os.getenv("USE_X_SENDFILE", "false").lower() in ("1", "true", "yes")
 """
 migrate =Migrate(app,db)
 
@@ -40,6 +48,16 @@ db.init_app(app)
 app.register_blueprint(user_controller,url_prefix='/User')
 app.register_blueprint(category_controller,url_prefix='/Category')
 app.register_blueprint(ticket_controller,url_prefix='/Ticket')
+app.register_blueprint(webhook_controller,url_prefix='/Webhook')
+app.register_blueprint(upload_controller,url_prefix='/Upload')
+
+# Grispi ticket aynası (GRISPI_SYNC_ENABLED=true ise arka planda çalışır)
+if GRISPI_SYNC_ENABLED:
+    start_grispi_sync()
+
+# Önceki çalıştırmadan spool'da kalan e-postalar beklemeden gönderilsin
+if MAIL_QUEUE_ENABLED:
+    get_mail_queue()
 
 
 
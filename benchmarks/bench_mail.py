@@ -0,0 +1,261 @@
+"""
+bench_mail.py
+-------------
+E-posta gönderim yolu için uçtan uca benchmark (lokal SMTP sink'e karşı, gerçek sunucu gerekmez).
+
+Senaryolar:
+- single    : MailService.send_email ile tek tek gönderim (havuzdaki oturum yeniden kullanılır)
+- bulk      : MailService.send_bulk ile kişiselleştirilmiş toplu gönderim (PIPELINING)
+- templated : mailer.send_ticket_opened_email (şablon render + MIME + gönderim)
+- attach    : send_email + dosya eki (akıtılan base64 yolu)
+
+Her senaryo için mesaj/sn, p50/p99 gönderim gecikmesi ve tracemalloc tepe belleği ölçülür.
+Bellek ölçümü ayrı bir turda yapılır; tracemalloc hız ölçümünü etkilemez.
+Ölçümden önce ASCII dışı gövdeli mesajlar (ekli / eksiz) ayrı bir sink'e gönderilip içerikleri
+kontrol edilir; bozulan gövde ya da ek varsa benchmark çalışmaz.
+
+Çalıştırma:
+    python -m benchmarks.bench_mail [--n 2000] [--latency 0.001] [--sessions 2]
+    python -m benchmarks.bench_mail --json out.json                # sonuçları kaydet
+    python -m benchmarks.bench_mail --baseline out.json            # gerilemede exit 1
+
+--port verilirse gömülü sink yerine o adresteki sunucu kullanılır (örn. python -m benchmarks.smtp_sink).
+"""
+
+import argparse
+import email
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from email import policy as email_policy
+
+from benchmarks.smtp_sink import SmtpSink
+from service.mail_service import MailService
+
+FROM = "bench@example.com"
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def _timed_calls(fn, n):
+    """fn(i)'yi n kez çağırır; çağrı başına gecikmeleri döner."""
+    latencies = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        ok = fn(i)
+        latencies.append(time.perf_counter() - t0)
+        if ok is False:
+            raise RuntimeError(f"{i}. gönderim başarısız")
+    return latencies
+
+
+def _bulk_latencies(svc, n, sessions):
+    """
+    send_bulk çağrısı tek bir sonuç döndüğü için mesaj başına gecikme, her oturum thread'inin
+    bir sonraki mesajı istediği ana kadar geçen süre olarak ölçülür (MIME üretimi + gönderim).
+    """
+    last = {}
+    latencies = []
+    lock = threading.Lock()
+
+    def spec(i):
+        def make():
+            now = time.perf_counter()
+            tid = threading.get_ident()
+            with lock:
+                prev = last.get(tid)
+                if prev is not None:
+                    latencies.append(now - prev)
+                last[tid] = now
+            return {"to": f"user{i}@example.com", "subject": f"Duyuru {i}",
+                    "text": f"Merhaba user{i}, hesabında yeni bir bildirim var."}
+        return make
+
+    results = svc.send_bulk((spec(i) for i in range(n)), sessions=sessions)
+    end = time.perf_counter()
+    latencies.extend(end - t for t in last.values())
+    failed = [r for r in results if not r[1]]
+    if failed:
+        raise RuntimeError(f"{len(failed)} toplu gönderim başarısız: {failed[0][2]}")
+    return latencies
+
+
+CONTENT_CASES = [
+    # (ad, text, html, ekler)
+    ("text", "Merhaba ğüşiöç İĞÜŞ", None, []),
+    ("text+ek", "Merhaba ğüşiöç İĞÜŞ", None, [("rapor.txt", "ekteki ğüş".encode("utf-8"), "text/plain")]),
+    ("alt+ek", "Düz ğüş", "<p>HTML ğüş</p>", [("veri.bin", bytes(range(256)) * 64, "application/octet-stream")]),
+    ("html", None, "<p>Yalnızca HTML çöğüş</p>", []),
+]
+
+
+def _check_content(host):
+    """CONTENT_CASES'i keep=True bir sink'e gönderir; alınan gövde ve ekler gönderilenle aynı olmalı."""
+    errors = []
+    with SmtpSink(host, 0, keep=True) as sink:
+        svc = MailService(host, sink.port, use_tls=False, default_from=FROM, retries=0)
+        try:
+            for name, text, html, attachments in CONTENT_CASES:
+                sink.reset()
+                ok, info = svc.send_email(to="check@example.com", subject=f"İçerik {name}",
+                                          text=text, html=html, attachments=attachments)
+                if not ok or len(sink.messages) != 1:
+                    errors.append(f"{name}: gönderilemedi ({info})")
+                    continue
+                msg = email.message_from_bytes(sink.messages[0].data, policy=email_policy.default)
+                for subtype, expected in (("plain", text), ("html", html)):
+                    part = msg.get_body((subtype,))
+                    got = part.get_content().replace("\r\n", "\n").rstrip("\n") if part is not None else None
+                    if expected is not None and got != expected:
+                        errors.append(f"{name}: {subtype} gövde bozuk ({got!r})")
+                received = {p.get_filename(): p.get_payload(decode=True) for p in msg.iter_attachments()}
+                for filename, data, _ in attachments:
+                    if received.get(filename) != data:
+                        errors.append(f"{name}: {filename} eki bozuk")
+        finally:
+            svc.close()
+    if errors:
+        raise RuntimeError("İçerik kontrolü başarısız: " + "; ".join(errors))
+    print(f"içerik kontrolü: {len(CONTENT_CASES)} mesaj ok")
+
+
+def _measure(label, run, n, sink, with_memory):
+    if sink is not None:
+        sink.reset()
+    t0 = time.perf_counter()
+    latencies = run(n)
+    elapsed = time.perf_counter() - t0
+
+    peak = None
+    if with_memory:
+        tracemalloc.start()
+        run(n)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    res = {
+        "n": n,
+        "msgs_per_sec": n / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "peak_kb": peak / 1024 if peak is not None else None,
+    }
+    if sink is not None:
+        res["sink"] = sink.stats()
+    mem = f"{res['peak_kb']:>9.0f} KB" if peak is not None else "        -"
+    print(f"{label:<10} {res['msgs_per_sec']:>10,.0f} msj/sn   p50 {res['p50_ms']:>7.2f} ms"
+          f"   p99 {res['p99_ms']:>7.2f} ms   tepe bellek {mem}")
+    return res
+
+
+def _compare(results, baseline_path, tolerance):
+    """Baseline'a göre mesaj/sn düşüşü, p99 ya da bellek artışı tolerance'ı aşarsa False."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    ok = True
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        checks = [
+            ("msgs_per_sec", cur["msgs_per_sec"] < base["msgs_per_sec"] * (1 - tolerance)),
+            ("p99_ms", cur["p99_ms"] > base["p99_ms"] * (1 + tolerance)),
+        ]
+        if cur.get("peak_kb") and base.get("peak_kb"):
+            checks.append(("peak_kb", cur["peak_kb"] > base["peak_kb"] * (1 + tolerance)))
+        for metric, regressed in checks:
+            if regressed:
+                ok = False
+                print(f"⚠️ Gerileme: {name}.{metric} {base[metric]:.2f} -> {cur[metric]:.2f}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--sessions", type=int, default=2, help="bulk senaryosunda paralel oturum")
+    ap.add_argument("--latency", type=float, default=0.0, help="sink'in mesaj başına gecikmesi (saniye)")
+    ap.add_argument("--attach-kb", type=int, default=512)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=0, help="harici SMTP sunucusu (0: gömülü sink)")
+    ap.add_argument("--no-memory", action="store_true")
+    ap.add_argument("--json", help="sonuçları bu dosyaya yaz")
+    ap.add_argument("--baseline", help="bu sonuç dosyasıyla karşılaştır")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args()
+
+    sink = None
+    host, port = args.host, args.port
+    if not port:
+        sink = SmtpSink(host, 0, latency=args.latency).start()
+        port = sink.port
+
+    # mailer modül seviyesinde servis kurduğu için ortam import'tan önce ayarlanır
+    os.environ.update({
+        "SMTP_HOST": host, "SMTP_PORT": str(port), "SMTP_USE_TLS": "false", "SMTP_USE_SSL": "false",
+        "SMTP_FROM": FROM, "SMTP_POOL_SIZE": str(max(1, args.sessions)), "MAIL_QUEUE_ENABLED": "false",
+    })
+    from service import mailer
+
+    svc = MailService(host, port, use_tls=False, default_from=FROM, retries=0,
+                      pool_size=max(1, args.sessions), max_conn_messages=10 ** 9)
+
+    fd, attach_path = tempfile.mkstemp(suffix=".bin")
+    with os.fdopen(fd, "wb") as f:
+        f.write(os.urandom(args.attach_kb * 1024))
+
+    def single(n):
+        return _timed_calls(lambda i: svc.send_email(
+            to=f"user{i}@example.com", subject=f"Bildirim {i}", text=f"Merhaba user{i}")[0], n)
+
+    def bulk(n):
+        return _bulk_latencies(svc, n, args.sessions)
+
+    def templated(n):
+        return _timed_calls(lambda i: mailer.send_ticket_opened_email(
+            f"user{i}@example.com", str(1000 + i), f"Ekran sorunu {i}"), n)
+
+    def attach(n):
+        return _timed_calls(lambda i: svc.send_email(
+            to=f"user{i}@example.com", subject="Rapor", text="Ekte.", attachments=[attach_path])[0], n)
+
+    scenarios = [
+        ("single", single, args.n),
+        ("bulk", bulk, args.n),
+        ("templated", templated, args.n),
+        ("attach", attach, max(1, args.n // 20)),
+    ]
+
+    print(f"n={args.n} sessions={args.sessions} latency={args.latency}s sunucu={host}:{port}")
+    results = {}
+    try:
+        _check_content(args.host)
+        single(10)  # ısınma: bağlantı havuzu ve import'lar
+        for name, run, n in scenarios:
+            results[name] = _measure(name, run, n, sink, not args.no_memory)
+    finally:
+        svc.close()
+        mailer._svc.close()
+        os.unlink(attach_path)
+        if sink is not None:
+            sink.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and not _compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+bench_mail_templates.py
+-----------------------
+E-posta şablonu render hızı için mikro benchmark (SMTP gerekmez).
+
+Karşılaştırılanlar:
+- naive    : Şablonun tamamını her çağrıda regex ile yeniden doldurmak (markalı iskelet dahil)
+- compiled : mail_templates.CompiledTemplate ile yalnızca mesaja özel değişkenleri yerleştirmek
+- mime     : MailService._build_message (gövde önbelleği soğuk / sıcak)
+
+Çalıştırma:
+    python -m benchmarks.bench_mail_templates [--n 20000]
+"""
+
+import argparse
+import html
+import time
+
+from service import mailer
+from service.mail_service import MailService
+from service.mail_templates import TEMPLATES, _PLACEHOLDER
+
+
+def _bench(label, fn, n):
+    fn(0)  # ısınma
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    dt = time.perf_counter() - t0
+    print(f"{label:<34} {n / dt:>12,.0f} /sn   {dt / n * 1e6:>8.2f} µs/işlem")
+    return n / dt
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    n = ap.parse_args().n
+
+    brand = {f"brand.{k}": v for k, v in {
+        "name": mailer.BRAND_NAME, "primary": mailer.BRAND_PRIMARY, "text": mailer.BRAND_TEXT,
+        "bg": mailer.BRAND_BG, "card_bg": mailer.BRAND_CARD_BG, "border": mailer.BRAND_BORDER,
+        "logo_url": mailer.BRAND_LOGO_URL,
+    }.items()}
+    card = TEMPLATES["ticket_card.html"]
+
+    def naive(i):
+        values = dict(brand, heading="Talebin Alındı", ticket_no=str(i), title=f"Ekran sorunu {i}",
+                      status="OPEN", intro="...", cta="")
+        return _PLACEHOLDER.sub(lambda m: html.escape(str(values.get(m.group(1), ""))), card)
+
+    def compiled(i):
+        return mailer.render_ticket_opened(str(i), f"Ekran sorunu {i}")
+
+    print(f"n={n}")
+    base = _bench("naive (tam şablon her seferinde)", naive, n)
+    fast = _bench("compiled (render_ticket_opened)", compiled, n)
+    print(f"{'hızlanma':<34} {fast / base:>12.1f}x")
+
+    svc = MailService("localhost", 25, use_tls=False, default_from="bench@example.com")
+    subject, text, body = mailer.render_ticket_opened("42", "Ekran sorunu")
+
+    def build(i, text=text, body=body, unique=False):
+        return svc._build_message(
+            to=[f"user{i}@example.com"], subject=subject,
+            text=(text + str(i)) if unique else text, html=body,
+            cc=[], bcc=[], reply_to=None, attachments=[], headers={},
+            from_email="bench@example.com", from_name=None, message_id=None,
+        )
+
+    mn = max(1, n // 10)
+    _bench("mime build (gövde her seferinde yeni)", lambda i: build(i, unique=True), mn)
+    _bench("mime build (aynı gövde, önbellek)", build, mn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+smtp_sink.py
+------------
+Benchmark ve lokal geliştirme için gerçek teslimat yapmayan SMTP sunucusu.
+
+- EHLO/HELO, AUTH (PLAIN/LOGIN, her kimlik kabul edilir), MAIL, RCPT, DATA, RSET, NOOP, QUIT
+- PIPELINING, 8BITMIME ve SIZE ilan edilir (MailService'in pipelined yolu çalışır).
+  STARTTLS yoktur: istemci use_tls=False ile bağlanmalıdır.
+- Mesajlar sayılır; keep=True ise (zarf + ham içerik) bellekte tutulur.
+- latency: her DATA sonunda 250'den önce beklenecek süre (yavaş relay taklidi)
+- fail_rate: DATA'ların bu oranı 451 ile geçici hata alır (retry yollarını denemek için)
+
+Kullanım:
+    with SmtpSink(latency=0.005) as sink:
+        svc = MailService(sink.host, sink.port, use_tls=False, default_from="a@b.c")
+        ...
+        print(sink.stats())
+
+    python -m benchmarks.smtp_sink [--port 8025] [--keep] [--latency 0.01] [--fail-rate 0.05]
+"""
+
+import argparse
+import random
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+
+class SinkMessage(NamedTuple):
+    mail_from: str
+    rcpt_to: List[str]
+    data: bytes        # dot-stuffing çözülmüş ham mesaj (CRLF satır sonlarıyla)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        # Pipelined cevaplar küçük ayrı yazımlardır; Nagle + gecikmeli ACK 40ms ekler
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self) -> None:
+        sink = self.server.sink
+        sink._count("connections")
+        self.reply(f"220 {sink.hostname} ESMTP sink")
+        mail_from: Optional[str] = None
+        rcpts: List[str] = []
+
+        while True:
+            line = self.rfile.readline(65536)
+            if not line:
+                return
+            cmd, _, arg = line.decode("utf-8", "replace").rstrip("\r\n").partition(" ")
+            cmd = cmd.upper()
+
+            if cmd == "EHLO":
+                self.wfile.write((
+                    f"250-{sink.hostname}\r\n"
+                    "250-PIPELINING\r\n"
+                    "250-8BITMIME\r\n"
+                    "250-SIZE 0\r\n"
+                    "250 AUTH PLAIN LOGIN\r\n"
+                ).encode("ascii"))
+            elif cmd == "HELO":
+                self.reply(f"250 {sink.hostname}")
+            elif cmd == "AUTH":
+                self._auth(arg)
+            elif cmd == "MAIL":
+                mail_from, rcpts = _address(arg), []
+                self.reply("250 OK")
+            elif cmd == "RCPT":
+                if mail_from is None:
+                    self.reply("503 MAIL first")
+                    continue
+                rcpts.append(_address(arg))
+                self.reply("250 OK")
+            elif cmd == "DATA":
+                if mail_from is None or not rcpts:
+                    self.reply("503 RCPT first")
+                    continue
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_data(sink.keep)
+                if data is None:
+                    return
+                sink._delivered(mail_from, rcpts, data, self)
+                mail_from, rcpts = None, []
+            elif cmd == "RSET":
+                mail_from, rcpts = None, []
+                self.reply("250 OK")
+            elif cmd == "NOOP":
+                self.reply("250 OK")
+            elif cmd == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def _auth(self, arg: str) -> None:
+        mech, _, initial = arg.partition(" ")
+        # PLAIN: tek adım; LOGIN: kullanıcı + şifre (ilk cevap komutla gelmiş olabilir)
+        steps = 1 if mech.upper() == "PLAIN" else 2
+        if initial:
+            steps -= 1
+        for _ in range(steps):
+            self.reply("334 ")
+            if not self.rfile.readline(65536):
+                return
+        self.reply("235 Authentication successful")
+
+    def _read_data(self, keep: bool) -> Optional[bytes]:
+        """
+        DATA içeriğini <CRLF>.<CRLF>'ye kadar okur. Satır satır okumak (76 baytlık base64
+        satırları) sink'i istemciden yavaş yapar; bloklar peek ile taranır ve yalnızca
+        bitişe kadar olan kısım tüketilir (arkasından pipelined komutlar gelebilir).
+        """
+        buf = bytearray()
+        carry = b"\r\n"  # DATA satır başında başlar: boş mesaj da eşleşsin
+        total = 0
+        while True:
+            chunk = self.rfile.peek(1 << 16)
+            if not chunk:
+                return None
+            window = carry + chunk
+            i = window.find(b"\r\n.\r\n")
+            take = len(chunk) if i < 0 else i + 5 - len(carry)
+            part = self.rfile.read(take)
+            total += len(part)
+            if keep:
+                buf += part
+            if i >= 0:
+                break
+            carry = (carry + part)[-4:]
+
+        self.server.sink._count("bytes", total - 3)
+        if not keep:
+            return b""
+        data = bytes(buf[:-3])
+        if data.startswith(b".."):
+            data = data[1:]
+        return data.replace(b"\r\n..", b"\r\n.")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    sink: "SmtpSink"
+
+
+class SmtpSink:
+    """
+    Parametreler
+    ------------
+    host, port : dinlenecek adres (port=0 -> boş bir port seçilir)
+    keep : bool
+        Mesajları bellekte tut (messages); benchmark'ta kapalı kalmalı
+    latency : float
+        Her mesajın kabulünden önce bekleme (saniye)
+    fail_rate : float
+        0..1 arası; DATA sonunda 451 dönme olasılığı
+    seed : Optional[int]
+        fail_rate için tekrarlanabilir rastgelelik
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        keep: bool = False,
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.keep = keep
+        self.latency = max(0.0, latency)
+        self.fail_rate = min(1.0, max(0.0, fail_rate))
+        self.hostname = "sink.local"
+        self.messages: List[SinkMessage] = []
+
+        self._rand = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._server = _Server((host, port), _Handler, bind_and_activate=True)
+        self._server.sink = self
+        self._thread: Optional[threading.Thread] = None
+        self.reset()
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "SmtpSink":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, kwargs={"poll_interval": 0.1},
+                name="smtp-sink", daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = {"connections": 0, "messages": 0, "recipients": 0, "bytes": 0, "failed": 0}
+            self.messages = []
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def __enter__(self) -> "SmtpSink":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ------------- Handler'dan çağrılanlar -------------
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[key] += n
+
+    def _delivered(self, mail_from: str, rcpts: List[str], data: bytes, handler: _Handler) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.fail_rate and self._rand.random() < self.fail_rate:
+                self._counters["failed"] += 1
+                fail = True
+            else:
+                fail = False
+                self._counters["messages"] += 1
+                self._counters["recipients"] += len(rcpts)
+                if self.keep:
+                    self.messages.append(SinkMessage(mail_from, list(rcpts), data))
+        handler.reply("451 Requested action aborted: injected failure" if fail else "250 OK: queued")
+
+
+def _address(arg: str) -> str:
+    """'FROM:<a@b.c> SIZE=123' -> 'a@b.c'"""
+    _, _, rest = arg.partition(":")
+    rest = rest.strip()
+    if rest.startswith("<"):
+        return rest[1:rest.find(">")] if ">" in rest else rest[1:]
+    return rest.split(" ", 1)[0]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Teslimat yapmayan lokal SMTP sunucusu")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8025)
+    ap.add_argument("--keep", action="store_true", help="mesajları bellekte tut ve özetini yaz")
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args()
+
+    sink = SmtpSink(args.host, args.port, keep=args.keep, latency=args.latency, fail_rate=args.fail_rate)
+    print(f"SMTP sink {sink.host}:{sink.port} dinliyor (Ctrl+C ile çık)")
+    sink.start()
+    last = None
+    try:
+        while True:
+            time.sleep(5)
+            stats = sink.stats()
+            if stats != last:
+                print(stats)
+                last = stats
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.stop()
+        print(sink.stats())
+        for m in sink.messages[-5:]:
+            print(f"  {m.mail_from} -> {', '.join(m.rcpt_to)} ({len(m.data)} bayt)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response
 from service.auth import token_required
+from service.category_cache import CategoryCache
+from service.aes_service import AESService
+from service.ticket_stats import read_stats
 import pyodbc
 import os
 from datetime import datetime
@@ -11,6 +14,45 @@ category_controller = Blueprint('category_controller', __name__)
 CONNECTION_STRING = os.getenv("CONNECTION_STRING")
 
 
+def _category_rows(cursor, where, order_by):
+    cursor.execute(f"""
+        SELECT id, category_name, is_active, created_at 
+        FROM TblCategory
+        {where}
+        ORDER BY {order_by}
+    """)
+    return [{
+        'id': row.id,
+        'category_name': row.category_name,
+        'is_active': bool(row.is_active),
+        'created_at': str(row.created_at)
+    } for row in cursor.fetchall()]
+
+
+def _load_categories():
+    """Önbellek için iki listenin JSON gövdeleri (sıralama SQL collation'ına bırakılır)."""
+    with pyodbc.connect(CONNECTION_STRING) as conn:
+        cursor = conn.cursor()
+        all_rows = _category_rows(cursor, "", "created_at DESC")
+        active_rows = _category_rows(cursor, "WHERE is_active = 1", "category_name ASC")
+    return current_app.json.response(all_rows).get_data(), current_app.json.response(active_rows).get_data()
+
+
+category_cache = CategoryCache(_load_categories)
+
+
+def _cached_response(cached):
+    """If-None-Match eşleşirse 304; istemci her seferinde ETag ile doğrular (no-cache)."""
+    if request.if_none_match.contains(cached.etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(cached.body, mimetype='application/json')
+    resp.set_etag(cached.etag)
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
+
+
 @category_controller.route('/add', methods=['POST'])
 @token_required
 def add_category():
@@ -31,6 +73,7 @@ def add_category():
                 VALUES (?, ?, ?)
             """, (category_name, is_active, created_at))
             conn.commit()
+        category_cache.invalidate()
 
         return jsonify({'message': 'Kategori başarıyla eklendi'}), 201
 
@@ -42,25 +85,7 @@ def add_category():
 @token_required
 def list_categories():
     try:
-        with pyodbc.connect(CONNECTION_STRING) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, category_name, is_active, created_at 
-                FROM TblCategory
-                ORDER BY created_at DESC
-            """)
-            rows = cursor.fetchall()
-
-            result = []
-            for row in rows:
-                result.append({
-                    'id': row.id,
-                    'category_name': row.category_name,
-                    'is_active': bool(row.is_active),
-                    'created_at': str(row.created_at)
-                })
-
-        return jsonify(result), 200
+        return _cached_response(category_cache.get().all)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -70,26 +95,7 @@ def list_categories():
 @token_required
 def list_active_categories():
     try:
-        with pyodbc.connect(CONNECTION_STRING) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, category_name, is_active, created_at 
-                FROM TblCategory
-                WHERE is_active = 1
-                ORDER BY category_name ASC
-            """)
-            rows = cursor.fetchall()
-
-            result = []
-            for row in rows:
-                result.append({
-                    'id': row.id,
-                    'category_name': row.category_name,
-                    'is_active': bool(row.is_active),
-                    'created_at': str(row.created_at)
-                })
-
-        return jsonify(result), 200
+        return _cached_response(category_cache.get().active)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -114,6 +120,7 @@ def update_category(category_id):
                 WHERE id = ?
             """, (category_name, is_active, category_id))
             conn.commit()
+        category_cache.invalidate()
 
         return jsonify({'message': 'Kategori güncellendi'}), 200
 
@@ -129,8 +136,42 @@ def delete_category(category_id):
             cursor = conn.cursor()
             cursor.execute("DELETE FROM TblCategory WHERE id = ?", (category_id,))
             conn.commit()
+        category_cache.invalidate()
 
         return jsonify({'message': 'Kategori silindi'}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@category_controller.route('/stats', methods=['GET'])
+@token_required
+def category_stats():
+    """
+    Kategori + durum başına ticket sayıları (TblCategoryTicketStat; TblTicket taranmaz).
+    ?category_id=<id> opsiyonel.
+    """
+    try:
+        category_id = request.args.get('category_id', type=int)
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            rows = read_stats(conn.cursor(), category_id)
+
+        result, by_id = [], {}
+        for row in rows:
+            item = by_id.get(row.category_id)
+            if item is None:
+                item = by_id[row.category_id] = {
+                    'category_id': row.category_id,
+                    'category_name': row.category_name,
+                    'total': 0,
+                    'by_status': {}
+                }
+                result.append(item)
+            status = (AESService.decrypt(row.status) or '').upper()
+            item['by_status'][status] = item['by_status'].get(status, 0) + row.ticket_count
+            item['total'] += row.ticket_count
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,32 +1,72 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from service.auth import token_required
 from service.aes_service import AESService
 from datetime import datetime
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
-import uuid
-import os, requests, pyodbc, math, datetime
+import os, requests, pyodbc, math, datetime, mimetypes, base64, csv, io, json, hashlib, time
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 from flask import jsonify, request
 # ticket_controller.py (üst kısım)
 from service.mailer import send_ticket_opened_email
+from service.grispi_sync import GRISPI_SYNC_ENABLED, link_local_ticket
+from service.notification_digest import notify_ticket_event, snippet
+from service.attachment_storage import (
+    UploadTooLarge, store_upload, stage_uploads, discard_blobs, acquire_blob, acquire_blobs, sha_of_path, UPLOAD_FOLDER,
+    allowed_file,
+)
+from service.thumbnails import THUMBNAIL_SIZE, enqueue_thumbnail, is_thumbnailable, thumbnail_path
+from service.ticket_stats import ticket_created, ticket_changed
+from service.search_index import index_ticket, index_message, search as search_tickets
+from service import ticket_reports
+from service.ticket_cache import TICKET_CACHE_ENABLED, get_ticket_cache, invalidate_ticket
+from service.event_bus import QUEUE_TOPIC, get_event_bus, publish_ticket_event, ticket_topic
 load_dotenv()
 
 ticket_controller = Blueprint('ticket_controller', __name__)
 CONNECTION_STRING = os.getenv("CONNECTION_STRING")
 
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'docx', 'xlsx'}
-
 
 GRISPI_TOKEN  = os.getenv("GRISPI_TOKEN")
 GRISPI_TENANT = os.getenv("GRISPI_TENANT", "stajer")
 GRISPI_BASE   = "https://api.grispi.com/public/v1"
 
+# Dosyaları nginx servis etsin: internal location öneki (örn. /_uploads/). Boşsa Flask send_file.
+DOWNLOAD_ACCEL_PREFIX = os.getenv("DOWNLOAD_ACCEL_PREFIX", "")
+
+# Detay yanıtında gelen en yeni mesaj sayısı; öncekiler GET /<id>/messages?before=<cursor> ile
+DETAIL_MESSAGE_LIMIT  = int(os.getenv("DETAIL_MESSAGE_LIMIT", "20"))
+MESSAGE_PAGE_MAX      = int(os.getenv("MESSAGE_PAGE_MAX", "100"))
+# GETDATE() ile yazılan DATETIME kolonları zone bilgisi taşımaz; SQL Server'ın saat dilimi (IANA adı)
+DB_TIMEZONE           = ZoneInfo(os.getenv("DB_TIMEZONE", "UTC"))
+# /export: DB'den her seferde okunan satır (bellekte en fazla bu kadar deşifre satır tutulur)
+EXPORT_CHUNK_SIZE     = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+# SSE: boşta bağlantıya yorum satırı (proxy'ler kapatmasın); akış bu süre sonunda kapanır, istemci Last-Event-ID ile döner
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_STREAM_SECONDS = float(os.getenv("SSE_MAX_STREAM_SECONDS", "900"))
+SSE_RETRY_MS          = int(os.getenv("SSE_RETRY_MS", "3000"))
+
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def _ticket_changed(ticket_id, event=None, data=None, queue_changed=False):
+    """
+    Ticket'ı değiştiren her endpoint commit'ten sonra çağırır: detay önbelleği silinir,
+    SSE izleyicilerine event gider (queue_changed: açık/atanmamış kuyruğu da etkiler).
+    """
+    invalidate_ticket(ticket_id)
+    if event:
+        publish_ticket_event(ticket_id, event, data, queue_changed)
+
+
+def _notify_watchers(cur, ticket_id, describe, followers_only=False):
+    """CC/takipçilere bildirim (özet motoruna eklenir); hata isteği bozmaz."""
+    try:
+        notify_ticket_event(cur, ticket_id, request.user_id, describe, followers_only=followers_only)
+    except Exception as e:
+        print('notify err:', e)
 
 def to_e164_tr(raw):
     if not raw: return None
@@ -138,37 +178,50 @@ def create_ticket():
         enc_priority = AESService.encrypt(priority)
         enc_status = AESService.encrypt(status)
 
-        with pyodbc.connect(CONNECTION_STRING) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO TblTicket (
-                    user_id, assigned_user_id, subject, category_id, 
-                    description, priority, status, update_date, created_date
-                )
-                OUTPUT INSERTED.TicketId
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, assigned_user_id, enc_subject, category_id,
-                enc_description, enc_priority, enc_status, update_date, created_date
-            ))
-            ticket_id = cursor.fetchone()[0]
-
-            # Dosyaları lokalde sakla
-            for file in files:
-                if file and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    unique_filename = f"{uuid.uuid4().hex}_{filename}"
-                    filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-                    file.save(filepath)
-
-                    enc_filename = AESService.encrypt(filename)
-                    enc_filepath = AESService.encrypt(filepath)
-                    cursor.execute("""
+        # Dosyalar transaction açılmadan, paralel olarak diske: TblTicket kilitleri
+        # yalnızca metadata yazılırken tutulur
+        uploads = [(secure_filename(f.filename), f) for f in files if f and allowed_file(f.filename)]
+        blobs = stage_uploads([f for _, f in uploads])
+        stored = list(zip(blobs, [name for name, _ in uploads]))
+
+        try:
+            with pyodbc.connect(CONNECTION_STRING) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO TblTicket (
+                        user_id, assigned_user_id, subject, category_id, 
+                        description, priority, status, update_date, created_date
+                    )
+                    OUTPUT INSERTED.TicketId
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    user_id, assigned_user_id, enc_subject, category_id,
+                    enc_description, enc_priority, enc_status, update_date, created_date
+                ))
+                ticket_id = cursor.fetchone()[0]
+                ticket_created(cursor, category_id, enc_status)
+                index_ticket(cursor, ticket_id, subject, description)
+
+                # Ek metadata'sı tek batch (aynı dosya ikinci kez diske yazılmadı, ref_count artar)
+                if stored:
+                    acquire_blobs(cursor, blobs)
+                    cursor.fast_executemany = True
+                    cursor.executemany("""
                         INSERT INTO TblFolder (ticket_id, file_name, file_path, created_at)
                         VALUES (?, ?, ?, ?)
-                    """, (ticket_id, enc_filename, enc_filepath, created_date))
+                    """, [(ticket_id, AESService.encrypt(name), AESService.encrypt(blob.path), created_date)
+                          for blob, name in stored])
 
-            conn.commit()
+                conn.commit()
+        except Exception:
+            discard_blobs(blobs)
+            raise
+
+        for blob, filename in stored:
+            enqueue_thumbnail(blob.path, filename)
+        _ticket_changed(ticket_id, 'ticket.created',
+                        {'category_id': int(category_id), 'priority': str(priority).upper(), 'status': status},
+                        queue_changed=True)
 
         # --- İç helper: mail gönder (best-effort) ---
         def _notify_open(ticket_no: str):
@@ -220,6 +273,15 @@ def create_ticket():
                 gjson = g_resp.json()
                 grispi_ticket_key = gjson.get("key") or gjson.get("id")
 
+                # Webhook event'lerinin lokal ticket'a yazılabilmesi için eşleme
+                if grispi_ticket_key:
+                    try:
+                        with pyodbc.connect(CONNECTION_STRING) as conn_link:
+                            link_local_ticket(conn_link.cursor(), grispi_ticket_key, ticket_id)
+                            conn_link.commit()
+                    except Exception as ex:
+                        print("⚠️ Grispi ticket eşlemesi yazılamadı:", ex)
+
                 # -- Mail: Grispi + lokal başarılı
                 _notify_open(str(grispi_ticket_key or ticket_id))
 
@@ -249,10 +311,58 @@ def create_ticket():
                 'ticket_id': ticket_id
             }), 201
 
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _my_requests_from_mirror(grispi_user_id, page, per_page):
+    """
+    /my-requests cevabını TblGrispiTicket aynasından üretir (grispi_sync ile güncel tutulur).
+    Yalnızca istenen sayfadaki satırlar deşifre edilir.
+    """
+    if not grispi_user_id:
+        return jsonify({"data": [], "pagination": {
+            "total_items": 0, "page": page, "per_page": per_page, "total_pages": 0
+        }}), 200
+
+    offset = (page - 1) * per_page
+    with pyodbc.connect(CONNECTION_STRING) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM TblGrispiTicket WHERE requester_grispi_id = ?", (grispi_user_id,))
+        total_count = cur.fetchone()[0]
+
+        cur.execute("""
+            SELECT grispi_key, subject, status, priority, grispi_created_at, grispi_updated_at
+            FROM TblGrispiTicket
+            WHERE requester_grispi_id = ?
+            ORDER BY grispi_updated_at DESC, id DESC
+            OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+        """, (grispi_user_id, offset, per_page))
+        rows = cur.fetchall()
+
+    data = [{
+        "ticket_id": r.grispi_key or "",
+        "subject": (AESService.decrypt(r.subject) if r.subject else "") or "",
+        "priority": AESService.decrypt(r.priority) if r.priority else "",
+        "status": AESService.decrypt(r.status) if r.status else "",
+        "category": None,
+        "update_date": r.grispi_updated_at.strftime('%d.%m.%Y') if r.grispi_updated_at else None,
+        "created_date": r.grispi_created_at.strftime('%d.%m.%Y') if r.grispi_created_at else None
+    } for r in rows]
+
+    return jsonify({
+        "data": data,
+        "pagination": {
+            "total_items": total_count,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": math.ceil(total_count / per_page) if per_page else 1
+        }
+    }), 200
+
+
 @ticket_controller.route('/my-requests', methods=['GET'])
 @token_required
 def get_tickets_by_user():
@@ -266,6 +376,9 @@ def get_tickets_by_user():
         start = (page - 1) * per_page
         end   = start + per_page
 
+        # Senkron açıksa lokal aynadan (indeksli sorgu) cevap ver
+        if GRISPI_SYNC_ENABLED:
+            return _my_requests_from_mirror(grispi_user_id, page, per_page)
 
         # 2) Grispi’den talepleri çek
         headers = {
@@ -345,19 +458,294 @@ def get_tickets_by_user():
 
 
 
+@ticket_controller.route('/search', methods=['GET'])
+@token_required
+def search_ticket_list():
+    """
+    Konu, açıklama ve mesajlarda kelime araması (TblSearchToken üzerinden).
+    Tüm kelimeleri içeren ticket'lar skora göre döner; yalnızca dönen sayfa deşifre edilir.
+    ?q (zorunlu), ?page, ?per_page
+    """
+    try:
+        q = (request.args.get('q') or '').strip()
+        if not q:
+            return jsonify({'error': 'q zorunlu'}), 400
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            hits = search_tickets(cur, q, limit=per_page, offset=(page - 1) * per_page)
+            rows = {}
+            if hits:
+                ids = [h[0] for h in hits]
+                cur.execute(f"""
+                    SELECT t.TicketId, t.subject, t.category_id, t.priority, t.status,
+                           t.update_date, t.created_date, c.category_name
+                    FROM TblTicket t
+                    LEFT JOIN TblCategory c ON c.id = t.category_id
+                    WHERE t.TicketId IN ({','.join('?' * len(ids))})
+                """, ids)
+                rows = {r.TicketId: r for r in cur.fetchall()}
+
+        data = []
+        for ticket_id, score, message_id in hits:
+            r = rows.get(ticket_id)
+            if r is None:
+                continue
+            dec_priority = AESService.decrypt(r.priority) if r.priority else None
+            dec_status   = AESService.decrypt(r.status)   if r.status   else None
+            data.append({
+                'ticket_id': r.TicketId,
+                'subject': AESService.decrypt(r.subject) if r.subject else None,
+                'category_id': r.category_id,
+                'category_name': r.category_name,
+                'priority': dec_priority.upper() if dec_priority else None,
+                'status': dec_status.upper() if dec_status else None,
+                'score': score,
+                'matched_message_id': message_id,
+                'update_date': r.update_date,
+                'created_date': r.created_date
+            })
+
+        return jsonify({
+            'data': data,
+            'pagination': {'page': page, 'per_page': per_page, 'has_more': len(hits) == per_page}
+        }), 200
+
+    except Exception as e:
+        print("search err:", e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
+def _dec_safe(v):
+    try:
+        return AESService.decrypt(v) if v else None
+    except Exception:
+        # yanlış/çift şifreleme vs. durumlarında endpoint çökmesin
+        return v
+
+
+def _encode_cursor(created_at, message_id):
+    raw = f"{created_at.isoformat()}|{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """(created_at, id); bozuk cursor'da ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, mid = raw.split("|", 1)
+        return datetime.datetime.fromisoformat(ts), int(mid)
+    except Exception:
+        raise ValueError("Geçersiz cursor")
+
+
+def _message_page(cur, ticket_id, limit, before=None, after=None):
+    """
+    (created_at, id) üzerinde keyset sayfalama; sayfa her zaman eskiden yeniye sıralı döner.
+      before: bu mesajdan eski en yeni `limit` mesaj (varsayılan: en yeni mesajlar)
+      after : bu mesajdan yeni en eski `limit` mesaj
+    Dönüş: (mesaj satırları, o yönde devamı var mı)
+    Ekler tek sorguda (IN) alınır; satırlar 'attachments' listesiyle dict olarak döner.
+    """
+    # CAST: DATETIME kolonu ile datetime2 parametre karşılaştırmasında ms yuvarlaması kaymasın
+    if after is not None:
+        where = "AND (m.created_at > CAST(? AS DATETIME) OR (m.created_at = CAST(? AS DATETIME) AND m.id > ?))"
+        params = (after[0], after[0], after[1])
+        order = "m.created_at ASC, m.id ASC"
+    elif before is not None:
+        where = "AND (m.created_at < CAST(? AS DATETIME) OR (m.created_at = CAST(? AS DATETIME) AND m.id < ?))"
+        params = (before[0], before[0], before[1])
+        order = "m.created_at DESC, m.id DESC"
+    else:
+        where, params, order = "", (), "m.created_at DESC, m.id DESC"
+
+    cur.execute(f"""
+        SELECT TOP (?) m.id, m.sender_user_id, m.message_text, m.created_at, m.is_internal
+        FROM TblTicketMessage m
+        WHERE m.ticket_id = ? {where}
+        ORDER BY {order}
+    """, (limit + 1, ticket_id) + params)
+    rows = cur.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after is None:
+        rows.reverse()
+
+    messages = [{
+        'id': mr.id,
+        'sender_user_id': mr.sender_user_id,
+        'message_text': _dec_safe(mr.message_text),
+        'created_at': mr.created_at,
+        'is_internal': mr.is_internal,
+        'attachments': []
+    } for mr in rows]
+
+    if messages:
+        by_id = {m['id']: m for m in messages}
+        cur.execute(f"""
+            SELECT id, message_id, file_name, file_path, uploaded_at
+            FROM TblTicketMessageAttachment
+            WHERE message_id IN ({','.join('?' * len(by_id))})
+            ORDER BY id
+        """, list(by_id))
+        for a in cur.fetchall():
+            name = _dec_safe(a.file_name)
+            by_id[a.message_id]['attachments'].append({
+                'id': a.id,
+                'file_name': name,
+                'file_path': _dec_safe(a.file_path),
+                'download_url': f"/Ticket/attachments/{a.id}",
+                'thumbnail_url': f"/Ticket/attachments/{a.id}/thumbnail" if is_thumbnailable(name) else None,
+                'uploaded_at': a.uploaded_at
+            })
+
+    return messages, has_more, rows
+
+
+def _page_cursors(rows):
+    """Sayfanın iki ucu: older -> ilk (en eski) mesaj, newer -> son (en yeni) mesaj."""
+    if not rows:
+        return None, None
+    return _encode_cursor(rows[0].created_at, rows[0].id), _encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def _detail_validator(cur, ticket_id, message_limit):
+    """
+    Detay yanıtının doğrulayıcısı tek sorguda (hepsi index seek): ticket update_date + mesaj,
+    ek, CC ve takipçi tablolarının sayı / son id / son zamanı. Dönüş: (etag, last_modified) ya da None.
+    Deşifre yok; isim/kategori adı değişiklikleri doğrulayıcıya girmez.
+    """
+    cur.execute("""
+        SELECT t.update_date,
+               m.cnt, m.max_id, m.last_at,
+               a.max_id, a.last_at,
+               cc.cnt, cc.max_id,
+               f.cnt, f.max_id
+        FROM TblTicket t
+        OUTER APPLY (SELECT COUNT(*) AS cnt, MAX(id) AS max_id, MAX(created_at) AS last_at
+                     FROM TblTicketMessage WHERE ticket_id = t.TicketId) m
+        OUTER APPLY (SELECT MAX(x.id) AS max_id, MAX(x.uploaded_at) AS last_at
+                     FROM TblTicketMessageAttachment x
+                     JOIN TblTicketMessage xm ON xm.id = x.message_id
+                     WHERE xm.ticket_id = t.TicketId) a
+        OUTER APPLY (SELECT COUNT(*) AS cnt, MAX(id) AS max_id FROM TblTicketCC WHERE ticket_id = t.TicketId) cc
+        OUTER APPLY (SELECT COUNT(*) AS cnt, MAX(id) AS max_id FROM TblTicketFollower WHERE ticket_id = t.TicketId) f
+        WHERE t.TicketId = ?
+    """, (ticket_id,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    parts = [v.isoformat() if isinstance(v, datetime.datetime) else v for v in row]
+    etag = hashlib.sha1(repr((ticket_id, message_limit, parts)).encode()).hexdigest()
+    stamps = [v for v in (row[0], row[3], row[5]) if v is not None]
+    # astimezone() naive değeri app host'unun yerel saati sayardı; DB'nin dilimi açıkça verilir
+    last_modified = max(stamps).replace(tzinfo=DB_TIMEZONE).astimezone(datetime.timezone.utc) if stamps else None
+    return etag, last_modified
+
+
+def _detail_cache_headers(resp, etag, last_modified):
+    resp.set_etag(etag)
+    if last_modified:
+        resp.last_modified = last_modified
+    # Tarayıcı/proxy saklayabilir ama her kullanımda doğrulatır
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
+
+
+def _not_modified(etag, last_modified):
+    """If-None-Match öncelikli; yoksa If-Modified-Since (saniye hassasiyeti)."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    ims = request.if_modified_since
+    return bool(ims and last_modified and last_modified.replace(microsecond=0) <= ims)
+
+
+@ticket_controller.route('/cache/stats', methods=['GET'])
+@token_required
+def ticket_cache_stats():
+    """Detay önbelleği metrikleri (bu process): isabet oranı, boyut, atılan kayıtlar."""
+    return jsonify(get_ticket_cache().stats()), 200
+
+
+def _sse_frame(ev):
+    return f"id: {ev.id}\nevent: {ev.type}\ndata: {json.dumps(ev.data, ensure_ascii=False)}\n\n"
+
+
+def _event_stream(topics):
+    """
+    SSE yanıtı: Last-Event-ID (başlık ya da ?last_event_id) sonrası kaçırılanlar önce gönderilir.
+    Devam edilemiyorsa 'resync' event'i gider (istemci veriyi bir kez yeniden yükler).
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+    def generate():
+        # Abonelik gövde okunmaya başlayınca açılır: HEAD ya da ilk bayttan önce kopan istemci abone bırakmaz
+        sub, backlog, resync = get_event_bus().subscribe(topics, last_event_id)
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            if resync:
+                yield f"id: {sub.position}\nevent: resync\ndata: {{}}\n\n"
+            for ev in backlog:
+                yield _sse_frame(ev)
+            deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                # Kuyruk taştıysa kapat: yeniden bağlanınca eksikler tampondan gelir
+                if sub.overflow and sub.queue.empty():
+                    break
+                ev = sub.get(timeout=min(SSE_HEARTBEAT_SECONDS, max(0.0, deadline - time.monotonic())))
+                yield _sse_frame(ev) if ev else ": ping\n\n"
+        finally:
+            sub.close()
+
+    resp = Response(generate(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+@ticket_controller.route('/<int:ticket_id>/events', methods=['GET'])
+@token_required(allow_query_token=True)
+def ticket_events(ticket_id):
+    """Ticket'a ait canlı event'ler (SSE): message.created, ticket.updated, ticket.assigned, ticket.cc, ..."""
+    return _event_stream([ticket_topic(ticket_id)])
+
+
+@ticket_controller.route('/queue/events', methods=['GET'])
+@token_required(allow_query_token=True)
+def queue_events():
+    """Açık / atanmamış kuyruğu etkileyen event'ler (SSE): ticket.created, durum ve atama değişiklikleri."""
+    return _event_stream([QUEUE_TOPIC])
+
+
 @ticket_controller.route('/<int:ticket_id>/detail', methods=['GET'])
 @token_required
 def ticket_detail(ticket_id):
-    def dec(v):
-        try:
-            return AESService.decrypt(v) if v else None
-        except Exception:
-            # yanlış/çift şifreleme vs. durumlarında endpoint çökmesin
-            return v
+    dec = _dec_safe
 
     try:
+        limit = min(max(int(request.args.get('message_limit', DETAIL_MESSAGE_LIMIT)), 1), MESSAGE_PAGE_MAX)
         with pyodbc.connect(CONNECTION_STRING) as conn:
             cur = conn.cursor()
+
+            # Önce ucuz doğrulayıcı: değişmediyse yükleme/deşifre/serileştirme yapılmaz.
+            # Doğrulayıcı gövdeden önce okunur; arada gelen yazım en fazla bir fazladan 200'e yol açar.
+            validator = _detail_validator(cur, ticket_id, limit)
+            if validator is None:
+                return jsonify({'error': 'Ticket bulunamadı'}), 404
+            etag, last_modified = validator
+            if _not_modified(etag, last_modified):
+                resp = Response(status=304)
+                return _detail_cache_headers(resp, etag, last_modified)
+
+            # Aynı doğrulayıcıyla üretilmiş gövde önbellekteyse yükleme/deşifre yapılmaz
+            cache = get_ticket_cache() if TICKET_CACHE_ENABLED else None
+            body = cache.get(ticket_id, limit, etag) if cache else None
+            if body is not None:
+                return _detail_cache_headers(Response(body, mimetype='application/json'), etag, last_modified)
+
             cur.execute("""
                 SELECT t.TicketId, t.user_id, t.assigned_user_id,
                        t.subject, t.category_id, t.description,
@@ -422,43 +810,69 @@ def ticket_detail(ticket_id):
             followers = [{'user_id': r.user_id, 'name': dec(r.name), 'surname': dec(r.surname)}
                          for r in cur.fetchall()]
 
-            # Mesajlar + ekler (zaten şifre çözüyordun; helper’a da aldım)
-            cur.execute("""
-                SELECT m.id, m.sender_user_id, m.message_text, m.created_at, m.is_internal
-                FROM TblTicketMessage m
-                WHERE m.ticket_id = ?
-                ORDER BY m.created_at ASC
-            """, (ticket_id,))
-            messages = []
-            for mr in cur.fetchall():
-                msg = {
-                    'id': mr.id,
-                    'sender_user_id': mr.sender_user_id,
-                    'message_text': dec(mr.message_text),
-                    'created_at': mr.created_at,
-                    'is_internal': mr.is_internal
+            # Yalnızca en yeni mesajlar (+ ekleri tek sorguda); öncekiler cursor ile
+            messages, has_older, rows = _message_page(cur, ticket_id, limit)
+            older, newer = _page_cursors(rows)
+
+            resp = jsonify({
+                'ticket': ticket, 'ccs': ccs, 'followers': followers, 'messages': messages,
+                'messages_page': {
+                    'has_older': has_older,
+                    'older_cursor': older if has_older else None,
+                    'newer_cursor': newer
                 }
-                cur2 = conn.cursor()
-                cur2.execute("""
-                    SELECT id, file_name, file_path, uploaded_at
-                    FROM TblTicketMessageAttachment
-                    WHERE message_id = ?
-                """, (mr.id,))
-                msg['attachments'] = [{
-                    'id': a.id,
-                    'file_name': dec(a.file_name),
-                    'file_path': dec(a.file_path),
-                    'uploaded_at': a.uploaded_at
-                } for a in cur2.fetchall()]
-                messages.append(msg)
-
-            return jsonify({'ticket': ticket, 'ccs': ccs, 'followers': followers, 'messages': messages}), 200
+            })
+            if cache:
+                cache.put(ticket_id, limit, etag, resp.get_data())
+            return _detail_cache_headers(resp, etag, last_modified), 200
 
     except Exception as e:
         print('ticket_detail err:', e)
         return jsonify({'error': 'Sunucu hatası'}), 500
 
 
+@ticket_controller.route('/<int:ticket_id>/messages', methods=['GET'])
+@token_required
+def list_ticket_messages(ticket_id):
+    """
+    Mesaj zaman çizelgesi, (created_at, id) keyset sayfalama.
+    ?before=<cursor> daha eskiler, ?after=<cursor> daha yeniler (yeni mesaj yoklaması), ikisi de yoksa en yeniler.
+    ?limit (varsayılan DETAIL_MESSAGE_LIMIT, en fazla MESSAGE_PAGE_MAX)
+    """
+    try:
+        before, after = request.args.get('before'), request.args.get('after')
+        if before and after:
+            return jsonify({'error': 'before ve after birlikte kullanılamaz'}), 400
+        try:
+            before = _decode_cursor(before) if before else None
+            after = _decode_cursor(after) if after else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        limit = min(max(int(request.args.get('limit', DETAIL_MESSAGE_LIMIT)), 1), MESSAGE_PAGE_MAX)
+
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT 1 FROM TblTicket WHERE TicketId = ?", (ticket_id,))
+            if not cur.fetchone():
+                return jsonify({'error': 'Ticket bulunamadı'}), 404
+            messages, has_more, rows = _message_page(cur, ticket_id, limit, before=before, after=after)
+
+        older, newer = _page_cursors(rows)
+        if after is not None:
+            # Yeni mesaj yoksa istemci aynı cursor ile yoklamaya devam eder
+            page = {'has_older': True, 'has_newer': has_more,
+                    'older_cursor': older, 'newer_cursor': newer or request.args.get('after')}
+        else:
+            page = {'has_older': has_more, 'has_newer': before is not None and bool(rows),
+                    'older_cursor': older if has_more else None,
+                    'newer_cursor': newer or request.args.get('before')}
+        return jsonify({'data': messages, 'pagination': page}), 200
+
+    except Exception as e:
+        print('list_messages err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
 @ticket_controller.route('/<int:ticket_id>/messages', methods=['POST'])
 @token_required
 def add_ticket_message(ticket_id):
@@ -477,8 +891,16 @@ def add_ticket_message(ticket_id):
                 VALUES (?, ?, ?, GETDATE(), ?)
             """, (ticket_id, request.user_id, AESService.encrypt(message_text), is_internal))
             mid = cur.fetchone()[0]
+            index_message(cur, ticket_id, mid, message_text)
             cur.execute("UPDATE TblTicket SET update_date = GETDATE() WHERE TicketId = ?", (ticket_id,))
             conn.commit()
+            _ticket_changed(ticket_id, 'message.created',
+                            {'message_id': mid, 'sender_user_id': request.user_id, 'is_internal': bool(is_internal)})
+
+            # İç notlar yalnızca takipçilere gider
+            _notify_watchers(cur, ticket_id,
+                             lambda actor: f"{actor} yeni mesaj yazdı: {snippet(message_text)}",
+                             followers_only=bool(is_internal))
         return jsonify({'message_id': mid}), 201
     except Exception as e:
         print('add_message err:', e)
@@ -491,22 +913,39 @@ def add_ticket_message(ticket_id):
 def update_ticket(ticket_id):
     try:
         data = request.get_json()
-        sets, params = [], []
+        sets, params, changes = [], [], []
         if 'status' in data:
-            sets.append("status=?"); params.append(AESService.encrypt(str(data['status'])))
+            # Diğer yazım yolları gibi büyük harf: şifreli eşitlikle yapılan filtreler (rapor, export, kuyruk) harfe duyarlı
+            status = str(data['status']).strip().upper()
+            sets.append("status=?"); params.append(AESService.encrypt(status))
+            changes.append(f"durumu {status} yaptı")
         if 'priority' in data:
             sets.append("priority=?"); params.append(AESService.encrypt(str(data['priority'])))
+            changes.append(f"önceliği {str(data['priority']).upper()} yaptı")
         if 'assigned_user_id' in data:
             sets.append("assigned_user_id=?"); params.append(int(data['assigned_user_id']))
+            changes.append("atanan kişiyi değiştirdi")
         if not sets:
             return jsonify({'error': 'Güncellenecek alan yok'}), 400
 
         with pyodbc.connect(CONNECTION_STRING) as conn:
             cur = conn.cursor()
-            sql = f"UPDATE TblTicket SET {', '.join(sets)}, update_date=GETDATE() WHERE TicketId=?"
+            # Durum değişiyorsa eski/yeni değer aynı ifadeden okunur, sayaçlar aynı transaction'da
+            output = " OUTPUT DELETED.category_id, DELETED.status, INSERTED.status" if 'status' in data else ""
+            sql = f"UPDATE TblTicket SET {', '.join(sets)}, update_date=GETDATE(){output} WHERE TicketId=?"
             params.append(ticket_id)
             cur.execute(sql, tuple(params))
+            if output:
+                row = cur.fetchone()
+                if row:
+                    ticket_changed(cur, [(row[0], row[1], row[0], row[2])])
             conn.commit()
+            fields = {k: (str(data[k]).upper() if k != 'assigned_user_id' else int(data[k]))
+                      for k in ('status', 'priority', 'assigned_user_id') if k in data}
+            _ticket_changed(ticket_id, 'ticket.updated', fields,
+                            queue_changed='status' in data or 'assigned_user_id' in data)
+
+            _notify_watchers(cur, ticket_id, lambda actor: f"{actor} {', '.join(changes)}")
         return jsonify({'status': 'ok'}), 200
     except Exception as e:
         print('update_ticket err:', e)
@@ -526,8 +965,10 @@ def add_cc(ticket_id):
                   ON t.ticket_id=s.ticket_id AND t.user_id=s.user_id
                 WHEN NOT MATCHED THEN
                   INSERT (ticket_id, user_id, created_at) VALUES (s.ticket_id, s.user_id, GETDATE());
-            """, (ticket_id, uid))
+                IF @@ROWCOUNT > 0 UPDATE TblTicket SET update_date = GETDATE() WHERE TicketId = ?;
+            """, (ticket_id, uid, ticket_id))
             conn.commit()
+        _ticket_changed(ticket_id, 'ticket.cc', {'user_id': uid, 'action': 'added'})
         return jsonify({'status': 'ok'}), 201
     except Exception as e:
         print('add_cc err:', e); return jsonify({'error': 'Sunucu hatası'}), 500
@@ -538,8 +979,12 @@ def remove_cc(ticket_id, user_id):
     try:
         with pyodbc.connect(CONNECTION_STRING) as conn:
             cur = conn.cursor()
-            cur.execute("DELETE FROM TblTicketCC WHERE ticket_id=? AND user_id=?", (ticket_id, user_id))
+            cur.execute("""
+                DELETE FROM TblTicketCC WHERE ticket_id=? AND user_id=?;
+                IF @@ROWCOUNT > 0 UPDATE TblTicket SET update_date = GETDATE() WHERE TicketId = ?;
+            """, (ticket_id, user_id, ticket_id))
             conn.commit()
+        _ticket_changed(ticket_id, 'ticket.cc', {'user_id': user_id, 'action': 'removed'})
         return jsonify({'status': 'ok'}), 200
     except Exception as e:
         print('del_cc err:', e); return jsonify({'error': 'Sunucu hatası'}), 500
@@ -557,8 +1002,10 @@ def add_follower(ticket_id):
                   ON t.ticket_id=s.ticket_id AND t.user_id=s.user_id
                 WHEN NOT MATCHED THEN
                   INSERT (ticket_id, user_id, created_at) VALUES (s.ticket_id, s.user_id, GETDATE());
-            """, (ticket_id, uid))
+                IF @@ROWCOUNT > 0 UPDATE TblTicket SET update_date = GETDATE() WHERE TicketId = ?;
+            """, (ticket_id, uid, ticket_id))
             conn.commit()
+        _ticket_changed(ticket_id, 'ticket.followers', {'user_id': uid, 'action': 'added'})
         return jsonify({'status': 'ok'}), 201
     except Exception as e:
         print('add_follower err:', e); return jsonify({'error': 'Sunucu hatası'}), 500
@@ -569,8 +1016,12 @@ def remove_follower(ticket_id, user_id):
     try:
         with pyodbc.connect(CONNECTION_STRING) as conn:
             cur = conn.cursor()
-            cur.execute("DELETE FROM TblTicketFollower WHERE ticket_id=? AND user_id=?", (ticket_id, user_id))
+            cur.execute("""
+                DELETE FROM TblTicketFollower WHERE ticket_id=? AND user_id=?;
+                IF @@ROWCOUNT > 0 UPDATE TblTicket SET update_date = GETDATE() WHERE TicketId = ?;
+            """, (ticket_id, user_id, ticket_id))
             conn.commit()
+        _ticket_changed(ticket_id, 'ticket.followers', {'user_id': user_id, 'action': 'removed'})
         return jsonify({'status': 'ok'}), 200
     except Exception as e:
         print('del_follower err:', e); return jsonify({'error': 'Sunucu hatası'}), 500
@@ -586,23 +1037,184 @@ def upload_message_attachment(message_id):
         if not file or not allowed_file(file.filename):
             return jsonify({'error':'Geçersiz dosya'}), 400
         filename = secure_filename(file.filename)
-        unique = f"{uuid.uuid4().hex}_{filename}"
-        path = os.path.join(UPLOAD_FOLDER, unique)
-        file.save(path)
+        blob = store_upload(file)
 
-        with pyodbc.connect(CONNECTION_STRING) as conn:
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO TblTicketMessageAttachment (message_id, file_name, file_path, uploaded_at)
-                VALUES (?, ?, ?, GETDATE())
-            """, (message_id, AESService.encrypt(filename), AESService.encrypt(path)))
-            conn.commit()
+        try:
+            with pyodbc.connect(CONNECTION_STRING) as conn:
+                cur = conn.cursor()
+                acquire_blob(cur, blob)
+                cur.execute("""
+                    INSERT INTO TblTicketMessageAttachment (message_id, file_name, file_path, uploaded_at)
+                    VALUES (?, ?, ?, GETDATE())
+                """, (message_id, AESService.encrypt(filename), AESService.encrypt(blob.path)))
+                cur.execute("SELECT ticket_id FROM TblTicketMessage WHERE id = ?", (message_id,))
+                owner = cur.fetchone()
+                conn.commit()
+        except Exception:
+            discard_blobs([blob])
+            raise
+        _ticket_changed(owner[0] if owner else None, 'attachment.created', {'message_id': message_id})
+        enqueue_thumbnail(blob.path, filename)
         return jsonify({'status':'ok'}), 201
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
     except Exception as e:
         print('upload_att err:', e)
         return jsonify({'error':'Sunucu hatası'}), 500
 
 
+def _dec(v):
+    try:
+        return AESService.decrypt(v) if v else None
+    except Exception:
+        return None
+
+
+def _resolve_upload_path(enc_path):
+    """Şifreli file_path -> uploads altında var olan mutlak yol (dışarı taşan yollar reddedilir)."""
+    path = _dec(enc_path)
+    if not path:
+        return None
+    root = os.path.realpath(UPLOAD_FOLDER)
+    full = os.path.realpath(path)
+    if os.path.commonpath([root, full]) != root or not os.path.isfile(full):
+        return None
+    return full
+
+
+def _send_stored_file(enc_path, enc_name):
+    """
+    Dosyayı Python belleğine almadan gönderir.
+    - Blob'larda ETag = sha256 (güçlü, içerik değişmez -> immutable önbellek)
+    - Range / If-None-Match / If-Modified-Since: send_file(conditional=True) ya da nginx
+    - USE_X_SENDFILE ya da DOWNLOAD_ACCEL_PREFIX ile gövdeyi web sunucusu yazar
+    """
+    path = _resolve_upload_path(enc_path)
+    if not path:
+        return jsonify({'error': 'Dosya bulunamadı'}), 404
+
+    name = _dec(enc_name) or os.path.basename(path)
+    sha = sha_of_path(path)
+    as_attachment = request.args.get('download', '').lower() in ('1', 'true', 'yes')
+
+    if DOWNLOAD_ACCEL_PREFIX:
+        st = os.stat(path)
+        etag = sha or f"{int(st.st_mtime)}-{st.st_size}"
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            rel = os.path.relpath(path, os.path.realpath(UPLOAD_FOLDER)).replace(os.sep, '/')
+            resp = Response(status=200, mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+            resp.headers['X-Accel-Redirect'] = DOWNLOAD_ACCEL_PREFIX.rstrip('/') + '/' + rel
+            resp.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline', filename=name)
+        resp.set_etag(etag)
+    else:
+        resp = send_file(path, as_attachment=as_attachment, download_name=name,
+                         conditional=True, etag=sha or True)
+
+    resp.cache_control.no_cache = None
+    resp.cache_control.private = True
+    if sha:
+        resp.cache_control.max_age = 31536000
+        resp.cache_control.immutable = True
+    else:
+        resp.cache_control.no_cache = True   # eski dosyalar: ETag ile doğrula
+    return resp
+
+
+def _send_thumbnail(enc_path, enc_name):
+    """
+    Resim ekinin önizlemesi (JPEG, uzun kenar THUMBNAIL_SIZE).
+    Henüz üretilmemişse kuyruğa eklenir ve 202 + Retry-After döner.
+    """
+    path = _resolve_upload_path(enc_path)
+    sha = sha_of_path(path) if path else None
+    if not sha or not is_thumbnailable(_dec(enc_name)):
+        return jsonify({'error': 'Önizleme yok'}), 404
+
+    thumb = thumbnail_path(path)
+    if not os.path.isfile(thumb):
+        if not enqueue_thumbnail(path, _dec(enc_name)):
+            return jsonify({'error': 'Önizleme yok'}), 404
+        resp = jsonify({'status': 'pending'})
+        resp.status_code = 202
+        resp.headers['Retry-After'] = '2'
+        return resp
+
+    resp = send_file(thumb, mimetype='image/jpeg', conditional=True, etag=f"{sha}-t{THUMBNAIL_SIZE}")
+    resp.cache_control.no_cache = None
+    resp.cache_control.private = True
+    resp.cache_control.max_age = 31536000
+    resp.cache_control.immutable = True
+    return resp
+
+
+@ticket_controller.route('/files/<int:file_id>', methods=['GET'])
+@token_required
+def download_ticket_file(file_id):
+    """TblFolder (ticket açılışındaki ekler). ?download=1 -> Content-Disposition: attachment"""
+    try:
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT file_name, file_path FROM TblFolder WHERE id = ?", (file_id,))
+            row = cur.fetchone()
+        if not row:
+            return jsonify({'error': 'Dosya bulunamadı'}), 404
+        return _send_stored_file(row.file_path, row.file_name)
+    except Exception as e:
+        print('download_file err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
+@ticket_controller.route('/attachments/<int:attachment_id>', methods=['GET'])
+@token_required
+def download_message_attachment(attachment_id):
+    """TblTicketMessageAttachment (mesaj ekleri). ?download=1 -> Content-Disposition: attachment"""
+    try:
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT file_name, file_path FROM TblTicketMessageAttachment WHERE id = ?", (attachment_id,))
+            row = cur.fetchone()
+        if not row:
+            return jsonify({'error': 'Dosya bulunamadı'}), 404
+        return _send_stored_file(row.file_path, row.file_name)
+    except Exception as e:
+        print('download_att err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
+@ticket_controller.route('/files/<int:file_id>/thumbnail', methods=['GET'])
+@token_required
+def ticket_file_thumbnail(file_id):
+    try:
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT file_name, file_path FROM TblFolder WHERE id = ?", (file_id,))
+            row = cur.fetchone()
+        if not row:
+            return jsonify({'error': 'Dosya bulunamadı'}), 404
+        return _send_thumbnail(row.file_path, row.file_name)
+    except Exception as e:
+        print('file_thumb err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
+@ticket_controller.route('/attachments/<int:attachment_id>/thumbnail', methods=['GET'])
+@token_required
+def message_attachment_thumbnail(attachment_id):
+    try:
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT file_name, file_path FROM TblTicketMessageAttachment WHERE id = ?", (attachment_id,))
+            row = cur.fetchone()
+        if not row:
+            return jsonify({'error': 'Dosya bulunamadı'}), 404
+        return _send_thumbnail(row.file_path, row.file_name)
+    except Exception as e:
+        print('att_thumb err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
 @ticket_controller.route('/all-open', methods=['GET'])
 @token_required
 def list_all_open_or_unassigned():
@@ -694,6 +1306,206 @@ def list_all_open_or_unassigned():
         return jsonify({'error': 'Sunucu hatası'}), 500
 
 
+EXPORT_COLUMNS = [
+    'ticket_id', 'subject', 'description', 'category_id', 'category_name', 'priority', 'status',
+    'requester_id', 'requester_name', 'requester_surname', 'assignee_id', 'assignee_name', 'assignee_surname',
+    'update_date', 'created_date'
+]
+
+
+def _export_filters(args):
+    """Query string -> (WHERE parçası, parametreler). Hatalı değerde ValueError."""
+    where, params = [], []
+    if args.get('status'):
+        # status şifreli ama deterministik: şifreli değerle eşitlik yeterli. Eşitlik harfe duyarlı;
+        # eski kayıtlar istemcinin gönderdiği harfle yazılmış olabilir, bilinen halleri de aranır
+        variants = ticket_reports.status_variants(args['status'])
+        where.append(f"t.status IN ({','.join('?' * len(variants))})")
+        params.extend(AESService.encrypt(v) for v in variants)
+    for arg, col in (('category_id', 't.category_id'), ('user_id', 't.user_id'),
+                     ('assigned_user_id', 't.assigned_user_id')):
+        if args.get(arg):
+            where.append(f"{col} = ?")
+            params.append(int(args[arg]))
+    if args.get('created_from'):
+        where.append("t.created_date >= ?")
+        params.append(datetime.datetime.strptime(args['created_from'], '%Y-%m-%d'))
+    if args.get('created_to'):
+        where.append("t.created_date < ?")
+        params.append(datetime.datetime.strptime(args['created_to'], '%Y-%m-%d') + datetime.timedelta(days=1))
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+
+def _export_rows(where, params):
+    """Satırları EXPORT_CHUNK_SIZE'lık parçalar halinde okuyup deşifre eder (sabit bellek)."""
+    # Aynı şifreli değer (status, priority, isimler) tekrar tekrar çözülmesin; sınırlı önbellek
+    dec = lru_cache(maxsize=4096)(_dec_safe)
+
+    with pyodbc.connect(CONNECTION_STRING) as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT t.TicketId, t.subject, t.description, t.category_id, c.category_name,
+                   t.priority, t.status, t.user_id, ru.name AS requester_name, ru.surname AS requester_surname,
+                   t.assigned_user_id, au.name AS assignee_name, au.surname AS assignee_surname,
+                   t.update_date, t.created_date
+            FROM TblTicket t
+            LEFT JOIN TblUser ru ON ru.id = t.user_id
+            LEFT JOIN TblUser au ON au.id = t.assigned_user_id
+            LEFT JOIN TblCategory c ON c.id = t.category_id
+            {where}
+            ORDER BY t.TicketId
+        """, params)
+        while True:
+            rows = cur.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            chunk = []
+            for r in rows:
+                pr, st = dec(r.priority), dec(r.status)
+                chunk.append({
+                    'ticket_id': r.TicketId,
+                    'subject': dec(r.subject),
+                    'description': dec(r.description),
+                    'category_id': r.category_id,
+                    'category_name': dec(r.category_name),
+                    'priority': pr.upper() if pr else None,
+                    'status': st.upper() if st else None,
+                    'requester_id': r.user_id,
+                    'requester_name': dec(r.requester_name),
+                    'requester_surname': dec(r.requester_surname),
+                    'assignee_id': r.assigned_user_id,
+                    'assignee_name': dec(r.assignee_name),
+                    'assignee_surname': dec(r.assignee_surname),
+                    'update_date': r.update_date.isoformat() if r.update_date else None,
+                    'created_date': r.created_date.isoformat() if r.created_date else None
+                })
+            yield chunk
+
+
+def _export_ndjson(chunks):
+    for chunk in chunks:
+        yield "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in chunk)
+
+
+def _export_csv(chunks):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    # BOM: Excel Türkçe karakterleri UTF-8 olarak açsın
+    buf.write("\ufeff")
+    writer.writeheader()
+    yield buf.getvalue()
+    for chunk in chunks:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(chunk)
+        yield buf.getvalue()
+
+
+@ticket_controller.route('/export', methods=['GET'])
+@token_required
+def export_tickets():
+    """
+    Ticket'ları NDJSON (varsayılan) veya CSV olarak akış halinde döner.
+    Satırlar DB'den parça parça okunup deşifre edilir ve hemen yazılır; tüm sonuç bellekte tutulmaz.
+    ?format=ndjson|csv, ?status, ?category_id, ?user_id, ?assigned_user_id, ?created_from, ?created_to (YYYY-MM-DD)
+    """
+    fmt = (request.args.get('format') or 'ndjson').lower()
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format ndjson veya csv olmalı'}), 400
+    try:
+        where, params = _export_filters(request.args)
+    except ValueError:
+        return jsonify({'error': 'Geçersiz filtre'}), 400
+
+    def generate():
+        chunks = _export_rows(where, params)
+        try:
+            yield from (_export_csv(chunks) if fmt == 'csv' else _export_ndjson(chunks))
+        except Exception as e:
+            # Başlıklar gitti; yanıt yarıda kesilir, istemci eksik aktarım görür
+            print('export err:', e)
+            raise
+
+    filename = f"tickets-{datetime.datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    resp = Response(stream_with_context(generate()), mimetype=mimetype)
+    resp.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    resp.headers['Cache-Control'] = 'no-store'
+    # nginx arkasında tamponlanmadan aksın
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+def _report_args(args):
+    """?from, ?to (YYYY-MM-DD, varsayılan son 30 gün), ?category_id, ?assignee_id (0: atanmamış). Hatalıysa ValueError."""
+    today = datetime.date.today()
+    end = datetime.date.fromisoformat(args['to']) if args.get('to') else today
+    start = datetime.date.fromisoformat(args['from']) if args.get('from') else end - datetime.timedelta(days=29)
+    if start > end or (end - start).days >= ticket_reports.REPORT_MAX_DAYS:
+        raise ValueError("Geçersiz tarih aralığı")
+    category_id = int(args['category_id']) if args.get('category_id') else None
+    assignee_id = int(args['assignee_id']) if args.get('assignee_id') else None
+    return start, end, category_id, assignee_id
+
+
+def _report(build):
+    try:
+        try:
+            start, end, category_id, assignee_id = _report_args(request.args)
+        except ValueError:
+            return jsonify({'error': 'Geçersiz parametre (from/to: YYYY-MM-DD)'}), 400
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            data = build(conn.cursor(), start, end, category_id, assignee_id)
+        return jsonify({'from': start.isoformat(), 'to': end.isoformat(), 'data': data}), 200
+    except Exception as e:
+        print('report err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
+@ticket_controller.route('/reports/volume', methods=['GET'])
+@token_required
+def report_volume():
+    """Gün başına açılan / kapanan ticket (TblTicketDailyRollup)."""
+    return _report(ticket_reports.volume)
+
+
+@ticket_controller.route('/reports/backlog', methods=['GET'])
+@token_required
+def report_backlog():
+    """Gün sonunda açık ticket sayısı."""
+    return _report(ticket_reports.backlog)
+
+
+@ticket_controller.route('/reports/resolution', methods=['GET'])
+@token_required
+def report_resolution():
+    """Aralıkta kapananların ortalama çözüm süresi; ?group_by=category (varsayılan) | assignee"""
+    group_by = request.args.get('group_by', 'category')
+    if group_by not in ('category', 'assignee'):
+        return jsonify({'error': 'group_by category veya assignee olmalı'}), 400
+
+    def build(cur, start, end, category_id, assignee_id):
+        rows = ticket_reports.resolution(cur, start, end, group_by, category_id, assignee_id)
+        ids = [r[0] for r in rows if r[0]]
+        names = {}
+        if ids:
+            marks = ','.join('?' * len(ids))
+            if group_by == 'category':
+                cur.execute(f"SELECT id, category_name FROM TblCategory WHERE id IN ({marks})", ids)
+                names = {r.id: _dec_safe(r.category_name) for r in cur.fetchall()}
+            else:
+                cur.execute(f"SELECT id, name, surname FROM TblUser WHERE id IN ({marks})", ids)
+                names = {r.id: f"{_dec_safe(r.name) or ''} {_dec_safe(r.surname) or ''}".strip() for r in cur.fetchall()}
+        return [{
+            f'{group_by}_id': gid,
+            'name': names.get(gid),
+            'closed': closed,
+            'avg_resolution_hours': round(avg_seconds / 3600.0, 2)
+        } for gid, closed, avg_seconds in rows]
+
+    return _report(build)
+
+
 @ticket_controller.route('/<int:ticket_id>/assign', methods=['POST'])
 @token_required
 def assign_ticket(ticket_id):
@@ -716,6 +1528,9 @@ def assign_ticket(ticket_id):
                 WHERE TicketId = ?
             """, (assigned_user_id, ticket_id))
             conn.commit()
+            _ticket_changed(ticket_id, 'ticket.assigned', {'assigned_user_id': assigned_user_id}, queue_changed=True)
+
+            _notify_watchers(cur, ticket_id, lambda actor: f"{actor} talebi üstlendi")
 
         return jsonify({
             "message": "Ticket başarıyla atandı",
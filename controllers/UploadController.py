@@ -0,0 +1,307 @@
+from flask import Blueprint, request, jsonify
+from service.auth import token_required
+from service.aes_service import AESService
+from service.attachment_storage import UploadTooLarge, acquire_blob, adopt_file, discard_blobs, allowed_file
+from service.thumbnails import enqueue_thumbnail
+from service.ticket_cache import invalidate_ticket
+from service.event_bus import publish_ticket_event
+from service.upload_sessions import (
+    RESUMABLE_MAX_BYTES, UPLOAD_CHUNK_MAX_BYTES, new_session_id, expires_from_now,
+    receive_chunk, discard_chunk, append_chunk, snapshot_session_file, reset_session_file,
+)
+from werkzeug.utils import secure_filename
+from dotenv import load_dotenv
+import datetime
+import os
+import re
+import pyodbc
+
+load_dotenv()
+
+upload_controller = Blueprint('upload_controller', __name__)
+CONNECTION_STRING = os.getenv("CONNECTION_STRING")
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _session_json(row, chunks=None):
+    data = {
+        'session_id': row.id,
+        'file_name': AESService.decrypt(row.file_name),
+        'size': row.total_size,
+        'offset': row.received_size,
+        'status': row.status,
+        'chunk_size': UPLOAD_CHUNK_MAX_BYTES,
+        'upload_url': f"/Upload/sessions/{row.id}",
+        'expires_at': row.expires_at,
+    }
+    if chunks is not None:
+        data['chunks'] = [{'offset': c.chunk_offset, 'size': c.size, 'sha256': c.sha256} for c in chunks]
+    return data
+
+
+def _load_session(cur, session_id, lock=False):
+    cur.execute(f"""
+        SELECT id, user_id, file_name, total_size, received_size, sha256, status, expires_at
+        FROM TblUploadSession {'WITH (UPDLOCK, ROWLOCK)' if lock else ''}
+        WHERE id = ? AND user_id = ?
+    """, (session_id, request.user_id))
+    return cur.fetchone()
+
+
+def _session_error(row):
+    """Parça kabul edemeyecek oturum için (yanıt, kod); uygunsa None."""
+    if not row:
+        return jsonify({'error': 'Yükleme oturumu bulunamadı'}), 404
+    if row.status != 'PENDING':
+        return jsonify({'error': 'Yükleme oturumu tamamlanmış'}), 409
+    if row.expires_at < datetime.datetime.now():
+        return jsonify({'error': 'Yükleme oturumunun süresi dolmuş'}), 410
+    return None
+
+
+@upload_controller.route('/sessions', methods=['POST'])
+@token_required
+def create_upload_session():
+    """
+    Body: { "file_name": "rapor.pdf", "size": 52428800, "sha256": "<hex, opsiyonel>" }
+    Dönen upload_url'e parçalar PUT edilir.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        file_name = secure_filename(data.get('file_name') or '')
+        sha256 = (data.get('sha256') or '').lower() or None
+        try:
+            size = int(data.get('size'))
+        except (TypeError, ValueError):
+            size = 0
+
+        if not file_name or not allowed_file(file_name) or size <= 0:
+            return jsonify({'error': 'Geçersiz dosya'}), 400
+        if sha256 and not _SHA256_RE.match(sha256):
+            return jsonify({'error': 'Geçersiz sha256'}), 400
+        if size > RESUMABLE_MAX_BYTES:
+            return jsonify({'error': str(UploadTooLarge(RESUMABLE_MAX_BYTES))}), 413
+
+        session_id = new_session_id()
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO TblUploadSession
+                    (id, user_id, file_name, total_size, received_size, sha256, status, created_at, updated_at, expires_at)
+                VALUES (?, ?, ?, ?, 0, ?, 'PENDING', GETDATE(), GETDATE(), ?)
+            """, (session_id, request.user_id, AESService.encrypt(file_name), size, sha256, expires_from_now()))
+            conn.commit()
+            row = _load_session(cur, session_id)
+        return jsonify(_session_json(row)), 201
+    except Exception as e:
+        print('upload_session err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
+@upload_controller.route('/sessions/<session_id>', methods=['GET'])
+@token_required
+def get_upload_session(session_id):
+    """Kaldığı offset ve yazılmış parçalar (istemci bağlantı koptuktan sonra buradan devam eder)."""
+    try:
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            row = _load_session(cur, session_id)
+            if not row:
+                return jsonify({'error': 'Yükleme oturumu bulunamadı'}), 404
+            cur.execute("""
+                SELECT chunk_offset, size, sha256 FROM TblUploadChunk
+                WHERE session_id = ? ORDER BY chunk_offset
+            """, (session_id,))
+            chunks = cur.fetchall()
+        return jsonify(_session_json(row, chunks)), 200
+    except Exception as e:
+        print('upload_status err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
+@upload_controller.route('/sessions/<session_id>', methods=['PUT'])
+@token_required
+def put_upload_chunk(session_id):
+    """
+    Headers: Upload-Offset: <oturumun offset'i>, X-Chunk-Sha256: <parçanın hex sha256'sı>
+    Gövde: ham parça (en fazla chunk_size bayt).
+    409: offset uyuşmuyor (yanıttaki offset'ten devam edin), 400: parça özeti uyuşmuyor.
+    """
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.args.get('offset', '')))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset gerekli'}), 400
+    expected = (request.headers.get('X-Chunk-Sha256') or '').lower()
+
+    try:
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            row = _load_session(conn.cursor(), session_id)
+        err = _session_error(row)
+        if err:
+            return err
+        if offset != row.received_size:
+            return jsonify({'error': 'Offset uyuşmuyor', 'offset': row.received_size}), 409
+
+        # Parça transaction dışında okunur: yavaş istemci oturum satırını kilitlemez
+        limit = min(UPLOAD_CHUNK_MAX_BYTES, row.total_size - offset)
+        tmp_path, size, sha = receive_chunk(request.stream, limit)
+        if size == 0:
+            discard_chunk(tmp_path)
+            return jsonify({'error': 'Boş parça', 'offset': offset}), 400
+        if expected and expected != sha:
+            discard_chunk(tmp_path)
+            return jsonify({'error': 'Parça özeti uyuşmuyor', 'offset': offset, 'sha256': sha}), 400
+
+        try:
+            with pyodbc.connect(CONNECTION_STRING) as conn:
+                cur = conn.cursor()
+                row = _load_session(cur, session_id, lock=True)
+                err = _session_error(row)
+                if err:
+                    return err
+                if row.received_size != offset:
+                    # Aynı offset'e eşzamanlı iki PUT: ilki kazandı
+                    return jsonify({'error': 'Offset uyuşmuyor', 'offset': row.received_size}), 409
+
+                append_chunk(session_id, offset, tmp_path)
+                cur.execute("""
+                    INSERT INTO TblUploadChunk (session_id, chunk_offset, size, sha256, created_at)
+                    VALUES (?, ?, ?, ?, GETDATE())
+                """, (session_id, offset, size, sha))
+                cur.execute("""
+                    UPDATE TblUploadSession
+                    SET received_size = ?, updated_at = GETDATE(), expires_at = ?
+                    WHERE id = ?
+                """, (offset + size, expires_from_now(), session_id))
+                conn.commit()
+        finally:
+            discard_chunk(tmp_path)
+
+        return jsonify({
+            'offset': offset + size,
+            'size': row.total_size,
+            'sha256': sha,
+            'complete': offset + size >= row.total_size
+        }), 200
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except Exception as e:
+        print('upload_chunk err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
+@upload_controller.route('/sessions/<session_id>/finalize', methods=['POST'])
+@token_required
+def finalize_upload_session(session_id):
+    """
+    Body: { "ticket_id": 12 }  -> TblFolder
+       ya da { "message_id": 34 } -> TblTicketMessageAttachment
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        ticket_id, message_id = data.get('ticket_id'), data.get('message_id')
+        if bool(ticket_id) == bool(message_id):
+            return jsonify({'error': 'ticket_id ya da message_id gerekli'}), 400
+
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            row = _load_session(cur, session_id)
+            err = _session_error(row)
+            if err:
+                return err
+            if row.received_size < row.total_size:
+                return jsonify({'error': 'Yükleme tamamlanmadı', 'offset': row.received_size}), 409
+            if ticket_id:
+                cur.execute("SELECT TicketId FROM TblTicket WHERE TicketId = ?", (ticket_id,))
+            else:
+                cur.execute("SELECT ticket_id FROM TblTicketMessage WHERE id = ?", (message_id,))
+            owner = cur.fetchone()
+            if not owner:
+                return jsonify({'error': 'Ticket ya da mesaj bulunamadı'}), 404
+
+        # Hash + rename transaction dışında; oturum dosyasının link'i blob olur (kopyalanmaz)
+        try:
+            blob = adopt_file(snapshot_session_file(session_id))
+        except FileNotFoundError:
+            return jsonify({'error': 'Yükleme oturumu tamamlanmış'}), 409
+        if row.sha256 and blob.sha256 != row.sha256:
+            discard_blobs([blob])
+            reset_session_file(session_id)
+            with pyodbc.connect(CONNECTION_STRING) as conn:
+                cur = conn.cursor()
+                cur.execute("DELETE FROM TblUploadChunk WHERE session_id = ?", (session_id,))
+                cur.execute("""
+                    UPDATE TblUploadSession SET received_size = 0, updated_at = GETDATE() WHERE id = ?
+                """, (session_id,))
+                conn.commit()
+            return jsonify({'error': 'Dosya özeti uyuşmuyor, yükleme baştan yapılmalı', 'offset': 0}), 400
+
+        file_name = AESService.decrypt(row.file_name)
+        try:
+            with pyodbc.connect(CONNECTION_STRING) as conn:
+                cur = conn.cursor()
+                cur.execute("""
+                    UPDATE TblUploadSession SET status = 'COMPLETED', updated_at = GETDATE(), expires_at = ?
+                    WHERE id = ? AND status = 'PENDING'
+                """, (expires_from_now(), session_id))
+                if cur.rowcount != 1:
+                    discard_blobs([blob])
+                    return jsonify({'error': 'Yükleme oturumu tamamlanmış'}), 409
+
+                acquire_blob(cur, blob)
+                if ticket_id:
+                    cur.execute("""
+                        INSERT INTO TblFolder (ticket_id, file_name, file_path, created_at)
+                        OUTPUT INSERTED.id
+                        VALUES (?, ?, ?, GETDATE())
+                    """, (ticket_id, row.file_name, AESService.encrypt(blob.path)))
+                    attachment_id = cur.fetchone()[0]
+                    download_url = f"/Ticket/files/{attachment_id}"
+                else:
+                    cur.execute("""
+                        INSERT INTO TblTicketMessageAttachment (message_id, file_name, file_path, uploaded_at)
+                        OUTPUT INSERTED.id
+                        VALUES (?, ?, ?, GETDATE())
+                    """, (message_id, row.file_name, AESService.encrypt(blob.path)))
+                    attachment_id = cur.fetchone()[0]
+                    download_url = f"/Ticket/attachments/{attachment_id}"
+                conn.commit()
+        except Exception:
+            discard_blobs([blob])
+            raise
+
+        reset_session_file(session_id)
+        invalidate_ticket(owner[0])
+        publish_ticket_event(owner[0], 'attachment.created',
+                             {'message_id': message_id} if message_id else {'file_id': attachment_id})
+        enqueue_thumbnail(blob.path, file_name)
+        return jsonify({
+            'id': attachment_id,
+            'file_name': file_name,
+            'size': blob.size,
+            'sha256': blob.sha256,
+            'download_url': download_url
+        }), 201
+    except Exception as e:
+        print('upload_finalize err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
+
+
+@upload_controller.route('/sessions/<session_id>', methods=['DELETE'])
+@token_required
+def cancel_upload_session(session_id):
+    try:
+        with pyodbc.connect(CONNECTION_STRING) as conn:
+            cur = conn.cursor()
+            row = _load_session(cur, session_id, lock=True)
+            if not row:
+                return jsonify({'error': 'Yükleme oturumu bulunamadı'}), 404
+            cur.execute("DELETE FROM TblUploadChunk WHERE session_id = ?", (session_id,))
+            cur.execute("DELETE FROM TblUploadSession WHERE id = ?", (session_id,))
+            conn.commit()
+        reset_session_file(session_id)
+        return jsonify({'status': 'deleted'}), 200
+    except Exception as e:
+        print('upload_cancel err:', e)
+        return jsonify({'error': 'Sunucu hatası'}), 500
@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify
+from service.webhook_ingest import verify_signature, event_id_of, enqueue, ensure_writer, queue_size
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+webhook_controller = Blueprint('webhook_controller', __name__)
+
+# Grispi imza header'ı (HMAC-SHA256, hex)
+SIGNATURE_HEADER = os.getenv("GRISPI_WEBHOOK_SIGNATURE_HEADER", "X-Grispi-Signature")
+
+# Önceki çalıştırmadan spool'da kalan batch'ler ilk webhook'u beklemeden yazılsın
+webhook_controller.record_once(lambda state: ensure_writer())
+
+
+@webhook_controller.route('/grispi', methods=['POST'])
+def grispi_webhook():
+    """
+    Grispi ticket/comment event'lerini alır.
+    JWT yerine HMAC imzası ile doğrulanır; event kuyruğa konur ve hemen 202 döner.
+    Body tek event ya da event listesi olabilir.
+    """
+    raw = request.get_data(cache=False)
+    if not verify_signature(raw, request.headers.get(SIGNATURE_HEADER, "")):
+        return jsonify({'error': 'Geçersiz imza'}), 401
+
+    try:
+        payload = json.loads(raw)
+    except ValueError:
+        return jsonify({'error': 'Geçersiz JSON'}), 400
+
+    events = payload if isinstance(payload, list) else [payload]
+    accepted = 0
+    for ev in events:
+        if not isinstance(ev, dict):
+            continue
+        # Tek event'li isteklerde id yoksa ham body özeti kullanılır
+        eid = event_id_of(ev, raw if len(events) == 1 else b"")
+        if not enqueue(eid, ev):
+            # Kuyruk dolu: Grispi tekrar denesin
+            return jsonify({'error': 'Kuyruk dolu', 'accepted': accepted}), 503
+        accepted += 1
+
+    return jsonify({'status': 'queued', 'accepted': accepted, 'queue_size': queue_size()}), 202
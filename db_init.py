@@ -1,8 +1,45 @@
+"""
+db_init.py
+----------
+    python db_init.py             # eksik tabloları oluşturur (db.create_all)
+    python db_init.py --migrate   # + mevcut tablolarda eksik index'leri oluşturur,
+                                  #   sık çalışan sorguların planında hâlâ scan olanları raporlar
+
+create_all var olan tabloya dokunmaz; modellere sonradan eklenen index'ler --migrate ile gelir.
+İkisi de tekrar çalıştırılabilir (var olan tablo/index atlanır).
+"""
+import argparse
+import xml.etree.ElementTree as ET
+
 from app import app
-from config import db
+from config import db, DATABASE_URI
 import logging
+from sqlalchemy import inspect
 from sqlalchemy.exc import SQLAlchemyError
 
+# create_all'ın görmesi için modeller import edilmeli
+from models.TblUser import TblUser
+from models.TblAddress import TblAddress
+from models.TblPhone import TblPhone
+from models.TblEmail import TblEmail
+from models.TblCategory import TblCategory
+from models.TblTicket import TblTicket
+from models.TblTicketMessage import TblTicketMessage
+from models.TblTicketMessageAttachment import TblTicketMessageAttachment
+from models.TblTicketCC import TblTicketCC
+from models.TblTicketFollower import TblTicketFollower
+from models.TblFolder import TblFolder
+from models.TblGrispiTicket import TblGrispiTicket
+from models.TblSyncCheckpoint import TblSyncCheckpoint
+from models.TblWebhookEvent import TblWebhookEvent
+from models.TblBlob import TblBlob
+from models.TblUploadSession import TblUploadSession
+from models.TblUploadChunk import TblUploadChunk
+from models.TblCategoryTicketStat import TblCategoryTicketStat
+from models.TblSearchToken import TblSearchToken
+from models.TblTicketReportFact import TblTicketReportFact
+from models.TblTicketDailyRollup import TblTicketDailyRollup
+
 # Logging ayarları
 logging.basicConfig(
     level=logging.INFO,
@@ -11,20 +48,123 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
 
-try:
-    with app.app_context():
-        # Veritabanı bağlantısını test et
-        db.engine.connect()
-        logger.info("Veritabanı bağlantısı başarılı!")
+# app.py SQLAlchemy'yi bağlamıyor (API pyodbc kullanır); şema işlemleri için burada bağlanır
+if "sqlalchemy" not in app.extensions:
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', DATABASE_URI)
+    app.config.setdefault('SQLALCHEMY_TRACK_MODIFICATIONS', False)
+    db.init_app(app)
+
+# Sık çalışan sorgular (örnek değerlerle); --migrate planlarında scan arar
+HOT_QUERIES = [
+    ("ticket mesajları (detay / timeline)",
+     "SELECT TOP (21) id, created_at FROM TblTicketMessage WHERE ticket_id = 1 ORDER BY created_at DESC, id DESC"),
+    ("mesaj ekleri",
+     "SELECT id, file_name FROM TblTicketMessageAttachment WHERE message_id IN (1, 2, 3)"),
+    ("CC listesi",
+     "SELECT user_id FROM TblTicketCC WHERE ticket_id = 1"),
+    ("takipçi listesi",
+     "SELECT user_id FROM TblTicketFollower WHERE ticket_id = 1"),
+    ("atanan ticket'lar",
+     "SELECT TicketId FROM TblTicket WHERE assigned_user_id = 1"),
+    ("ticket listesi (created_date sırası)",
+     "SELECT TicketId FROM TblTicket ORDER BY created_date DESC, TicketId DESC OFFSET 0 ROWS FETCH NEXT 10 ROWS ONLY"),
+    ("all-open (status VEYA atanmamış)",
+     "SELECT TicketId FROM TblTicket WHERE status = 'x' OR assigned_user_id IS NULL "
+     "ORDER BY created_date DESC OFFSET 0 ROWS FETCH NEXT 10 ROWS ONLY"),
+    ("rapor job'u (update_date watermark)",
+     "SELECT TOP (1000) TicketId FROM TblTicket WHERE update_date > '2025-01-01' ORDER BY update_date, TicketId"),
+    ("kelime araması",
+     "SELECT ticket_id FROM TblSearchToken WHERE token = 'x'"),
+]
+
+_SHOWPLAN_NS = "{http://schemas.microsoft.com/sqlserver/2004/07/showplan}"
+_SCAN_OPS = {"Table Scan", "Clustered Index Scan", "Index Scan"}
+
+
+def ensure_indexes(conn):
+    """Modellerde tanımlı olup DB'de olmayan index'leri oluşturur. Dönüş: oluşturulan index adları."""
+    insp = inspect(conn)
+    existing_tables = set(insp.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables or not table.indexes:
+            continue
+        present = insp.get_indexes(table.name)
+        names = {ix["name"] for ix in present}
+        columns = {(tuple(ix["column_names"]), bool(ix.get("unique"))) for ix in present}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            key = (tuple(c.name for c in index.columns), bool(index.unique))
+            if index.name in names:
+                continue
+            if key in columns:
+                logger.info(f"{table.name}: {index.name} atlandı, aynı kolonlarda index zaten var")
+                continue
+            try:
+                index.create(bind=conn)
+                created.append(index.name)
+                logger.info(f"{table.name}: {index.name} oluşturuldu {list(key[0])}")
+            except SQLAlchemyError as e:
+                # Örn. unique index için mevcut tekrar eden satırlar; diğer index'ler devam etsin
+                logger.error(f"{table.name}: {index.name} oluşturulamadı: {e.__class__.__name__}: {e.orig if hasattr(e, 'orig') else e}")
+    return created
+
+
+def scanning_queries(conn):
+    """HOT_QUERIES'in tahmini planlarında scan yapılan tabloları döner: [(sorgu adı, tablo, operatör)]."""
+    findings = []
+    for name, sql in HOT_QUERIES:
+        conn.exec_driver_sql("SET SHOWPLAN_XML ON")
+        try:
+            plan = conn.exec_driver_sql(sql).scalar()
+        finally:
+            conn.exec_driver_sql("SET SHOWPLAN_XML OFF")
+        root = ET.fromstring(plan)
+        for relop in root.iter(f"{_SHOWPLAN_NS}RelOp"):
+            op = relop.get("PhysicalOp")
+            if op not in _SCAN_OPS:
+                continue
+            obj = next(relop.iter(f"{_SHOWPLAN_NS}Object"), None)
+            table = obj.get("Table", "?").strip("[]") if obj is not None else "?"
+            findings.append((name, table, op))
+    return findings
+
+
+def migrate():
+    with db.engine.connect() as conn:
+        created = ensure_indexes(conn)
+        conn.commit()
+        logger.info(f"Oluşturulan index: {len(created)}")
+
+        findings = scanning_queries(conn)
+    if findings:
+        logger.warning("Planında hâlâ scan olan sorgular (çok küçük tablolarda optimizer bilerek scan seçebilir):")
+        for name, table, op in findings:
+            logger.warning(f"  - {name}: {op} on {table}")
+    else:
+        logger.info("Sık çalışan sorguların hepsi index kullanıyor")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Şema kurulumu")
+    parser.add_argument("--migrate", action="store_true", help="eksik index'leri oluştur, scan yapan sorguları raporla")
+    args = parser.parse_args()
+
+    try:
+        with app.app_context():
+            # Veritabanı bağlantısını test et
+            db.engine.connect()
+            logger.info("Veritabanı bağlantısı başarılı!")
 
-        # Tabloları oluştur
-        db.create_all()
-        logger.info("Veritabanı tabloları başarıyla oluşturuldu!")
+            # Tabloları oluştur
+            db.create_all()
+            logger.info("Veritabanı tabloları başarıyla oluşturuldu!")
 
+            if args.migrate:
+                migrate()
 
-except SQLAlchemyError as e:
-    logger.error(f"Veritabanı hatası: {str(e)}")
-    raise
-except Exception as e:
-    logger.error(f"Beklenmeyen hata: {str(e)}")
-    raise
+    except SQLAlchemyError as e:
+        logger.error(f"Veritabanı hatası: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Beklenmeyen hata: {str(e)}")
+        raise
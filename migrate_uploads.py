@@ -0,0 +1,188 @@
+"""
+Eski (düz) upload düzenini katmanlı blob düzenine taşır.
+
+    uploads/<uuid>_<isim>        (file.save ile kaydedilmiş eski dosyalar)
+    uploads/blobs/<sha256>       (katmansız blob'lar)
+        -> uploads/blobs/ab/cd/<sha256>
+
+- TblFolder ve TblTicketMessageAttachment id sırasıyla (keyset) --batch-size'lık parçalarla
+  okunur; şifreli file_path'ler executemany ile güncellenir, her batch ayrı commit.
+- Dosya önce yeni yerine hard link (olmazsa kopya) ile konur, DB commit'inden sonra eskisi
+  silinir: yarıda kesilen çalıştırma kaybettirmez, tekrar çalıştırmak güvenlidir.
+- Eski uuid dosyaları hash'lenip blob olur; aynı içerikli eski dosyalar tek kopyaya iner
+  ve TblBlob.ref_count artırılır.
+
+Çalıştırma:
+    python migrate_uploads.py [--batch-size 500] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+
+import pyodbc
+from dotenv import load_dotenv
+
+from service.aes_service import AESService
+from service.attachment_storage import (
+    BLOB_FOLDER, UPLOAD_FOLDER, StoredBlob, acquire_blobs, blob_path, sha_of_path,
+)
+
+load_dotenv()
+
+CONNECTION_STRING = os.getenv("CONNECTION_STRING")
+
+TABLES = ("TblFolder", "TblTicketMessageAttachment")
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _dec(v):
+    try:
+        return AESService.decrypt(v) if v else None
+    except Exception:
+        return None
+
+
+def _hash_file(path):
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+            size += len(chunk)
+    return h.hexdigest(), size
+
+
+def _place(src, dst):
+    """src'yi dst'ye koyar (varsa dokunmaz); aynı diskte hard link, değilse kopya."""
+    if os.path.exists(dst):
+        return
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + ".migrating"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _plan_row(path):
+    """
+    Satır için (yeni_yol, yeni_referans_blob, silinecek_eski_yol) döner.
+    Zaten yeni düzendeyse None.
+    """
+    sha = sha_of_path(path)
+    if sha:
+        new = blob_path(sha)
+        if os.path.normpath(path) == os.path.normpath(new):
+            return None
+        # Katmansız blob: referans sayısı zaten doğru, aynı dosyayı başka satırlar da gösterebilir
+        return new, None, None
+
+    sha, size = _hash_file(path)
+    return blob_path(sha), StoredBlob(sha, size, blob_path(sha), False), path
+
+
+def migrate_table(conn, table, batch_size, dry_run, stats):
+    cur = conn.cursor()
+    last_id = 0
+    while True:
+        cur.execute(f"SELECT TOP (?) id, file_path FROM {table} WHERE id > ? ORDER BY id", (batch_size, last_id))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates, new_refs, to_delete = [], [], []
+        for r in rows:
+            path = _dec(r.file_path)
+            if not path:
+                continue
+            if not os.path.isfile(path):
+                stats["missing"] += 1
+                logger.warning(f"{table}#{r.id}: dosya yok ({path})")
+                continue
+            try:
+                plan = _plan_row(path)
+            except OSError as e:
+                stats["errors"] += 1
+                logger.warning(f"{table}#{r.id}: okunamadı ({path}): {e}")
+                continue
+            if plan is None:
+                stats["skipped"] += 1
+                continue
+
+            new, ref, old = plan
+            if not dry_run:
+                _place(path, new)
+            updates.append((AESService.encrypt(new), r.id))
+            if ref:
+                new_refs.append(ref)
+            if old:
+                to_delete.append(old)
+
+        if updates and not dry_run:
+            cur.fast_executemany = True
+            cur.executemany(f"UPDATE {table} SET file_path = ? WHERE id = ?", updates)
+            acquire_blobs(cur, new_refs)
+            conn.commit()
+            # DB yeni yolu gösterdikten sonra eski uuid dosyaları silinir
+            for old in to_delete:
+                try:
+                    os.unlink(old)
+                except FileNotFoundError:
+                    pass
+
+        stats["moved"] += len(updates)
+        logger.info(f"{table}: id <= {last_id} işlendi ({len(updates)} satır taşındı)")
+
+
+def sweep_flat_blobs(conn, dry_run, stats):
+    """Katmanlı kopyası olan ve hiçbir satırın göstermediği katmansız blob'ları siler."""
+    if not os.path.isdir(BLOB_FOLDER):
+        return
+    cur = conn.cursor()
+    for entry in os.scandir(BLOB_FOLDER):
+        if not entry.is_file() or not sha_of_path(entry.name):
+            continue
+        if not os.path.isfile(blob_path(entry.name)):
+            continue
+        # Deterministik AES: eski yolun şifreli hâli ile birebir arama yapılabilir
+        enc = AESService.encrypt(os.path.join(BLOB_FOLDER, entry.name))
+        referenced = False
+        for table in TABLES:
+            cur.execute(f"SELECT TOP 1 1 FROM {table} WHERE file_path = ?", (enc,))
+            if cur.fetchone():
+                referenced = True
+                break
+        if referenced:
+            continue
+        stats["swept"] += 1
+        if not dry_run:
+            os.unlink(entry.path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="uploads/ klasörünü katmanlı blob düzenine taşır")
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--dry-run", action="store_true", help="hiçbir şeyi değiştirmeden say")
+    args = ap.parse_args()
+
+    stats = {"moved": 0, "skipped": 0, "missing": 0, "errors": 0, "swept": 0}
+    logger.info(f"Kaynak: {os.path.abspath(UPLOAD_FOLDER)} {'(dry-run)' if args.dry_run else ''}")
+    with pyodbc.connect(CONNECTION_STRING) as conn:
+        for table in TABLES:
+            migrate_table(conn, table, max(1, args.batch_size), args.dry_run, stats)
+        sweep_flat_blobs(conn, args.dry_run, stats)
+    logger.info(f"Bitti: {stats}")
+
+
+if __name__ == "__main__":
+    main()
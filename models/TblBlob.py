@@ -0,0 +1,13 @@
+from config import db
+
+
+class TblBlob(db.Model):
+    """İçerik adresli dosya (uploads/blobs/<sha256>); aynı içerik tek kez saklanır."""
+    __tablename__ = "TblBlob"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)   # bu blob'u gösteren TblFolder/TblTicketMessageAttachment satırı
+
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -0,0 +1,11 @@
+from config import db
+
+
+class TblCategoryTicketStat(db.Model):
+    """Kategori + durum başına ticket sayacı (ticket yazan transaction'larda güncellenir)."""
+    __tablename__ = "TblCategoryTicketStat"
+
+    category_id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(128), primary_key=True)   # TblTicket.status ile aynı şifreli değer
+    ticket_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -0,0 +1,25 @@
+from config import db
+
+
+class TblGrispiTicket(db.Model):
+    """Grispi'deki ticket'ların lokal aynası (grispi_sync tarafından doldurulur)."""
+    __tablename__ = "TblGrispiTicket"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    grispi_key = db.Column(db.String(64), nullable=False, unique=True)  # örn: TICKET-1
+    requester_grispi_id = db.Column(db.BigInteger, nullable=True)
+    local_ticket_id = db.Column(db.Integer, db.ForeignKey("TblTicket.TicketId"), nullable=True, index=True)
+
+    subject = db.Column(db.String(1024), nullable=True)  # AES
+    status = db.Column(db.String(50), nullable=True)  # AES
+    priority = db.Column(db.String(50), nullable=True)  # AES
+
+    grispi_created_at = db.Column(db.DateTime, nullable=True)
+    grispi_updated_at = db.Column(db.DateTime, nullable=True)
+    synced_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    # /my-requests: WHERE requester_grispi_id = ? ORDER BY grispi_updated_at DESC
+    __table_args__ = (
+        db.Index("IX_TblGrispiTicket_requester_updated", "requester_grispi_id", "grispi_updated_at"),
+    )
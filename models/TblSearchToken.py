@@ -0,0 +1,20 @@
+from config import db
+
+
+class TblSearchToken(db.Model):
+    """
+    Şifreli ticket konusu/açıklaması ve mesajları için arama indeksi.
+    Kelimenin kendisi değil, anahtarlı HMAC özeti tutulur (SEARCH_INDEX_KEY).
+    """
+    __tablename__ = "TblSearchToken"
+    __table_args__ = (
+        db.Index("IX_TblSearchToken_token", "token", "ticket_id"),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+
+    token = db.Column(db.String(32), nullable=False)                  # HMAC-SHA256 (ilk 16 bayt, hex)
+    ticket_id = db.Column(db.Integer, db.ForeignKey("TblTicket.TicketId"), nullable=False, index=True)
+    message_id = db.Column(db.Integer, db.ForeignKey("TblTicketMessage.id"), nullable=True, index=True)
+    field = db.Column(db.String(1), nullable=False)                   # s: konu, d: açıklama, m: mesaj
+    hits = db.Column(db.SmallInteger, nullable=False, default=1)      # alandaki tekrar sayısı
@@ -0,0 +1,11 @@
+from config import db
+
+
+class TblSyncCheckpoint(db.Model):
+    """Arka plan senkron işlerinin kaldığı yer (watermark)."""
+    __tablename__ = "TblSyncCheckpoint"
+
+    name = db.Column(db.String(64), primary_key=True)  # örn: "grispi_tickets"
+    watermark = db.Column(db.BigInteger, nullable=False, default=0)  # epoch ms (Grispi updatedAt)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(),
+                           onupdate=db.func.current_timestamp())
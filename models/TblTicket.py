@@ -3,11 +3,15 @@ from config import db
 
 class TblTicket(db.Model):
     __tablename__ = "TblTicket"
+    __table_args__ = (
+        db.Index("IX_TblTicket_created", "created_date", "TicketId"),          # listeler: ORDER BY created_date DESC
+        db.Index("IX_TblTicket_updated", "update_date", "TicketId"),           # rapor job'u (update_date watermark)
+    )
 
     TicketId = db.Column(db.Integer, primary_key=True)
 
     user_id = db.Column(db.Integer, db.ForeignKey("TblUser.id"), nullable=False)
-    assigned_user_id = db.Column(db.Integer, db.ForeignKey("TblUser.id"), nullable=True)
+    assigned_user_id = db.Column(db.Integer, db.ForeignKey("TblUser.id"), nullable=True, index=True)
 
     subject = db.Column(db.String(1024), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey("TblCategory.id"), nullable=False)
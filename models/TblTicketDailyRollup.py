@@ -0,0 +1,14 @@
+from config import db
+
+
+class TblTicketDailyRollup(db.Model):
+    """Gün + kategori + atanan kişi başına açılan/kapanan ticket ve toplam çözüm süresi (/Ticket/reports/*)."""
+    __tablename__ = "TblTicketDailyRollup"
+
+    day = db.Column(db.Date, primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True)
+    assignee_id = db.Column(db.Integer, primary_key=True)           # 0: atanmamış
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    closed_count = db.Column(db.Integer, nullable=False, default=0)
+    resolution_seconds = db.Column(db.BigInteger, nullable=False, default=0)   # kapananların created -> kapanış toplamı
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -2,6 +2,10 @@ from config import db
 
 class TblTicketFollower(db.Model):
     __tablename__ = "TblTicketFollower"
+    __table_args__ = (
+        # Aynı kullanıcı bir ticket'a bir kez eklenir; ticket_id ile başlayan aramaları da karşılar
+        db.Index("UX_TblTicketFollower_ticket_user", "ticket_id", "user_id", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
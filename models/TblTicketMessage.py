@@ -3,6 +3,10 @@ from config import db
 
 class TblTicketMessage(db.Model):
     __tablename__ = "TblTicketMessage"
+    __table_args__ = (
+        # Mesaj zaman çizelgesi: WHERE ticket_id = ? ORDER BY created_at, id (keyset)
+        db.Index("IX_TblTicketMessage_ticket_created", "ticket_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
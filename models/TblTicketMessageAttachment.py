@@ -6,7 +6,7 @@ class TblTicketMessageAttachment(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
 
-    message_id = db.Column(db.Integer, db.ForeignKey("TblTicketMessage.id"), nullable=False)
+    message_id = db.Column(db.Integer, db.ForeignKey("TblTicketMessage.id"), nullable=False, index=True)
     file_name = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(512), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=db.func.current_timestamp())
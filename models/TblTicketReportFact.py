@@ -0,0 +1,16 @@
+from config import db
+
+
+class TblTicketReportFact(db.Model):
+    """
+    Rapor job'unun ticket başına son gördüğü durum (python -m service.ticket_reports).
+    Ticket değiştiğinde eski katkı TblTicketDailyRollup'tan düşülüp yenisi eklenir.
+    """
+    __tablename__ = "TblTicketReportFact"
+
+    ticket_id = db.Column(db.Integer, primary_key=True)
+    category_id = db.Column(db.Integer, nullable=False)
+    assignee_id = db.Column(db.Integer, nullable=False, default=0)   # 0: atanmamış
+    created_date = db.Column(db.DateTime, nullable=False)
+    closed_at = db.Column(db.DateTime, nullable=True)               # kapalı durumda ilk görüldüğü update_date
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -0,0 +1,14 @@
+from config import db
+
+
+class TblUploadChunk(db.Model):
+    """Yükleme oturumuna yazılmış parça (offset + sha256)."""
+    __tablename__ = "TblUploadChunk"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    session_id = db.Column(db.String(32), db.ForeignKey("TblUploadSession.id"), nullable=False, index=True)
+    chunk_offset = db.Column(db.BigInteger, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -0,0 +1,19 @@
+from config import db
+
+
+class TblUploadSession(db.Model):
+    """Parça parça (devam ettirilebilir) dosya yükleme oturumu."""
+    __tablename__ = "TblUploadSession"
+
+    id = db.Column(db.String(32), primary_key=True)   # uuid4 hex (istemciye verilen oturum kimliği)
+    user_id = db.Column(db.Integer, db.ForeignKey("TblUser.id"), nullable=False)
+
+    file_name = db.Column(db.String(255), nullable=False)              # AES
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received_size = db.Column(db.BigInteger, nullable=False, default=0)  # bir sonraki parçanın offset'i
+    sha256 = db.Column(db.String(64), nullable=True)                  # istemcinin bildirdiği tüm dosya özeti (opsiyonel)
+    status = db.Column(db.String(16), nullable=False, default="PENDING")  # PENDING / COMPLETED
+
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,11 @@
+from config import db
+
+
+class TblWebhookEvent(db.Model):
+    """İşlenmiş webhook event id'leri (tekrar gelen event'leri elemek için)."""
+    __tablename__ = "TblWebhookEvent"
+
+    event_id = db.Column(db.String(128), primary_key=True)
+    source = db.Column(db.String(32), nullable=False, default="grispi")
+    event_type = db.Column(db.String(64), nullable=True)
+    received_at = db.Column(db.DateTime, default=db.func.current_timestamp())
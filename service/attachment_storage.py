@@ -0,0 +1,353 @@
+"""
+attachment_storage.py
+---------------------
+Yüklenen dosyalar için içerik adresli (SHA-256) depolama.
+
+- Upload akışı parça parça (UPLOAD_CHUNK_SIZE) okunur, okunurken hash'lenir ve
+  MAX_UPLOAD_BYTES aşıldığı anda kesilir (UploadTooLarge).
+- UPLOAD_MEMORY_THRESHOLD altındaki dosyalar bellekte tutulur: aynı içerik zaten varsa
+  diske hiç yazılmaz. Büyük dosyalar geçici dosyaya akıtılır ve hash belli olunca
+  atomik rename ile yerine konur (içerik zaten varsa geçici dosya silinir).
+- Dosyalar uploads/blobs/ab/cd/<sha256> (UPLOAD_SHARD_DEPTH seviye, 2'şer karakter) altında
+  tek kopya durur; tek klasörde yüz binlerce dosya birikmez. TblBlob.ref_count onu kaç
+  ek satırının gösterdiğini tutar. Sayacı 0'a düşen (ya da hiç satırı olmayan) dosyalar
+  collect_garbage ile bekleme süresinden sonra silinir.
+
+Kullanım:
+    blob = store_upload(request.files["file"])       # diske yaz / var olanı kullan
+    acquire_blob(cur, blob)                           # ek satırıyla aynı transaction'da
+    ... INSERT TblFolder (..., file_path=AES(blob.path)) ...
+    conn.commit()
+
+Birden çok dosyada disk işi transaction'dan önce paralel yapılır, transaction yalnızca
+metadata yazar; transaction başarısız olursa bu istekte yeni yazılan dosyalar silinir:
+    blobs = stage_uploads(files)
+    try:
+        ... acquire_blobs(cur, blobs); executemany INSERT ...; conn.commit()
+    except Exception:
+        discard_blobs(blobs)
+        raise
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, List, NamedTuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+UPLOAD_FOLDER           = os.getenv("UPLOAD_FOLDER", "uploads")
+BLOB_FOLDER             = os.path.join(UPLOAD_FOLDER, "blobs")
+UPLOAD_TMP_FOLDER       = os.path.join(UPLOAD_FOLDER, "tmp")   # blob'larla aynı disk: rename atomik olsun
+
+MAX_UPLOAD_BYTES        = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE       = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+UPLOAD_MEMORY_THRESHOLD = int(os.getenv("UPLOAD_MEMORY_THRESHOLD", str(1024 * 1024)))
+BLOB_GC_GRACE_SECONDS   = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+UPLOAD_SHARD_DEPTH      = int(os.getenv("UPLOAD_SHARD_DEPTH", "2"))     # 2 -> 65536 klasör
+UPLOAD_STAGE_WORKERS    = int(os.getenv("UPLOAD_STAGE_WORKERS", "4"))   # istek başına paralel dosya yazımı
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'docx', 'xlsx'}
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+class UploadTooLarge(Exception):
+    """Dosya MAX_UPLOAD_BYTES sınırını aştı (controller 413 döner)."""
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(f"Dosya boyutu sınırı aşıldı ({limit // (1024 * 1024)} MB)")
+        self.limit = limit
+
+
+class StoredBlob(NamedTuple):
+    sha256: str
+    size: int
+    path: str         # DB'ye (şifreli) yazılan yol
+    created: bool     # bu çağrıda diske yeni yazıldı mı (False: içerik zaten vardı)
+    mtime: float = 0.0   # created ise yazıldığı andaki mtime (discard_blobs karşılaştırır)
+
+
+def blob_path(sha256: str) -> str:
+    """sha256 -> uploads/blobs/ab/cd/<sha256> (UPLOAD_SHARD_DEPTH=2)"""
+    shards = [sha256[i * 2:i * 2 + 2] for i in range(UPLOAD_SHARD_DEPTH)]
+    return os.path.join(BLOB_FOLDER, *shards, sha256)
+
+
+def _ensure_dirs() -> None:
+    os.makedirs(BLOB_FOLDER, exist_ok=True)
+    os.makedirs(UPLOAD_TMP_FOLDER, exist_ok=True)
+
+
+def _touch(path: str) -> bool:
+    """Blob varsa mtime'ını yeniler (collect_garbage yeni kullanılanı silmesin)."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _commit_tmp(tmp_path: str, final: str) -> bool:
+    """Geçici dosyayı blob olarak yerleştirir; içerik zaten varsa geçiciyi siler."""
+    if _touch(final):
+        os.unlink(tmp_path)
+        return False
+    # Aynı içerik aynı anda iki istekle gelse de rename atomik ve içerik aynı
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+    os.replace(tmp_path, final)
+    return True
+
+
+def store_stream(stream: BinaryIO, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredBlob:
+    """
+    Akışı okuyup blob olarak saklar.
+    Hata (UploadTooLarge, IO) durumunda diskte yarım dosya bırakmaz.
+    """
+    _ensure_dirs()
+    hasher = hashlib.sha256()
+    size = 0
+    buf: List[bytes] = []
+    tmp, tmp_path = None, None
+
+    try:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            hasher.update(chunk)
+
+            if tmp is not None:
+                tmp.write(chunk)
+                continue
+            buf.append(chunk)
+            if size > UPLOAD_MEMORY_THRESHOLD:
+                # Eşik aşıldı: o ana kadar okunanlarla geçici dosyaya geç
+                fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_TMP_FOLDER, suffix=".part")
+                tmp = os.fdopen(fd, "wb")
+                tmp.writelines(buf)
+                buf = []
+
+        sha = hasher.hexdigest()
+        final = blob_path(sha)
+
+        if tmp is None:
+            if _touch(final):
+                return StoredBlob(sha, size, final, False)
+            fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_TMP_FOLDER, suffix=".part")
+            tmp = os.fdopen(fd, "wb")
+            tmp.writelines(buf)
+
+        tmp.flush()
+        os.fsync(tmp.fileno())
+        tmp.close()
+        tmp = None
+        created = _commit_tmp(tmp_path, final)
+        tmp_path = None
+        return StoredBlob(sha, size, final, created, os.stat(final).st_mtime if created else 0.0)
+    finally:
+        if tmp is not None:
+            tmp.close()
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+def store_upload(file_storage, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredBlob:
+    """werkzeug FileStorage -> StoredBlob (file.save() yerine)."""
+    return store_stream(file_storage.stream, max_bytes)
+
+
+def adopt_file(path: str) -> StoredBlob:
+    """
+    Diskte hazır bir dosyayı (örn. parça parça yüklenmiş) blob yapar: hash'lenir ve
+    blob yerine taşınır (rename); içerik zaten varsa dosya silinir. path aynı diskte olmalı.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+            size += len(chunk)
+    sha = hasher.hexdigest()
+    final = blob_path(sha)
+    os.utime(path)   # eski tarihli dosya, referansı yazılmadan collect_garbage'a takılmasın
+    created = _commit_tmp(path, final)
+    return StoredBlob(sha, size, final, created, os.stat(final).st_mtime if created else 0.0)
+
+
+def stage_uploads(file_storages, max_bytes: int = MAX_UPLOAD_BYTES) -> List[StoredBlob]:
+    """
+    Dosyaları paralel saklar (hash + disk yazımı GIL dışında), sırayı korur.
+    Biri başarısız olursa (örn. UploadTooLarge) diğerlerinin yeni yazdıkları silinir
+    ve ilk hata yükselir.
+    """
+    if len(file_storages) <= 1:
+        return [store_upload(f, max_bytes) for f in file_storages]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(UPLOAD_STAGE_WORKERS, len(file_storages)))) as pool:
+        futures = [pool.submit(store_upload, f, max_bytes) for f in file_storages]
+    blobs, error = [], None
+    for fut in futures:
+        try:
+            blobs.append(fut.result())
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        discard_blobs(blobs)
+        raise error
+    return blobs
+
+
+def discard_blobs(blobs) -> int:
+    """
+    Transaction'ı geri alınan istekte diske yeni yazılmış blob'ları siler.
+    Bu arada aynı içerik başka bir istekle yeniden kullanıldıysa (mtime yenilendi) dosyaya
+    dokunulmaz; o durumda temizlik collect_garbage'a kalır.
+    """
+    removed = 0
+    for blob in {b.sha256: b for b in blobs if b.created}.values():
+        try:
+            if os.stat(blob.path).st_mtime == blob.mtime:
+                os.unlink(blob.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+# ---------------- Referans sayımı ----------------
+
+ACQUIRE_SQL = """
+    MERGE TblBlob WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS sha256, ? AS size) AS s
+      ON t.sha256 = s.sha256
+    WHEN MATCHED THEN UPDATE SET ref_count = t.ref_count + 1, updated_at = GETDATE()
+    WHEN NOT MATCHED THEN
+      INSERT (sha256, size, ref_count, created_at, updated_at) VALUES (s.sha256, s.size, 1, GETDATE(), GETDATE());
+"""
+
+
+def acquire_blob(cur, blob: StoredBlob) -> None:
+    """Blob'a bir referans ekler (ek satırını yazan transaction içinde çağrılmalı)."""
+    cur.execute(ACQUIRE_SQL, (blob.sha256, blob.size))
+
+
+def acquire_blobs(cur, blobs) -> None:
+    """Her blob için bir referans (aynı sha birden çok kez geçebilir); tek executemany."""
+    rows = [(b.sha256, b.size) for b in blobs]
+    if rows:
+        cur.fast_executemany = True
+        cur.executemany(ACQUIRE_SQL, rows)
+
+
+def release_blob(cur, sha256: str) -> int:
+    """
+    Blob'dan bir referans düşer; kalan referans sayısını döner.
+    Dosya burada silinmez: aynı anda aynı içerik yükleniyor olabilir, silme collect_garbage'da.
+    """
+    cur.execute("""
+        UPDATE TblBlob SET ref_count = ref_count - 1, updated_at = GETDATE()
+        OUTPUT INSERTED.ref_count
+        WHERE sha256 = ? AND ref_count > 0
+    """, (sha256,))
+    row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def sha_of_path(path: str):
+    """Kayıtlı file_path blob ise sha256'sını döner (eski uuid_isim dosyaları için None)."""
+    name = os.path.basename(path or "")
+    return name if len(name) == 64 and all(c in "0123456789abcdef" for c in name) else None
+
+
+def _derived_files(path: str) -> List[str]:
+    """Blob'un yanındaki türev dosyalar (<sha>.thumb.jpg gibi)."""
+    folder, sha = os.path.split(path)
+    try:
+        return [os.path.join(folder, n) for n in os.listdir(folder) if n.startswith(sha + ".")]
+    except FileNotFoundError:
+        return []
+
+
+def collect_garbage(conn, grace_seconds: int = BLOB_GC_GRACE_SECONDS) -> int:
+    """
+    Referansı kalmamış blob'ları siler (dosyası son grace_seconds içinde kullanılmamışsa):
+    - ref_count = 0 ve grace_seconds'tan eski TblBlob satırları (+ dosyaları)
+    - TblBlob satırı hiç oluşmamış (transaction'ı geri alınmış) eski dosyalar
+    - silinen blob'ların türev dosyaları (önizlemeler)
+    - yarım kalmış geçici upload dosyaları (uploads/tmp/*.part)
+    Dönüş: silinen dosya sayısı.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        DELETE FROM TblBlob
+        OUTPUT DELETED.sha256
+        WHERE ref_count <= 0 AND updated_at < DATEADD(second, ?, GETDATE())
+    """, (-grace_seconds,))
+    dead = {r[0] for r in cur.fetchall()}
+    conn.commit()
+
+    cutoff = time.time() - grace_seconds
+    candidates = []
+    orphans = []
+    for dirpath, _, names in os.walk(BLOB_FOLDER):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            if sha_of_path(name) and path == blob_path(name):
+                if name not in dead and os.stat(path).st_mtime < cutoff:
+                    candidates.append(name)
+            elif sha_of_path(name[:64]) and name[64:65] == "." and name[:64] not in names:
+                orphans.append(path)   # blob'u silinmiş türev dosya (örn. <sha>.thumb.jpg)
+    for i in range(0, len(candidates), 500):
+        chunk = candidates[i:i + 500]
+        cur.execute(
+            f"SELECT sha256 FROM TblBlob WHERE sha256 IN ({','.join('?' * len(chunk))})", chunk
+        )
+        known = {r[0] for r in cur.fetchall()}
+        dead.update(sha for sha in chunk if sha not in known)
+
+    removed = 0
+    for sha in dead:
+        path = blob_path(sha)
+        try:
+            # Bekleme süresinde aynı içerik tekrar yüklendiyse (mtime yenilendi) dokunma
+            if os.stat(path).st_mtime < cutoff:
+                os.unlink(path)
+                removed += 1
+                orphans.extend(_derived_files(path))
+        except FileNotFoundError:
+            pass
+    for path in orphans:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    if os.path.isdir(UPLOAD_TMP_FOLDER):
+        for entry in os.scandir(UPLOAD_TMP_FOLDER):
+            if entry.name.endswith(".part") and entry.stat().st_mtime < cutoff:
+                try:
+                    os.unlink(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+    return removed
+
+
+if __name__ == "__main__":
+    import pyodbc
+
+    with pyodbc.connect(os.getenv("CONNECTION_STRING")) as _conn:
+        print("Silinen blob:", collect_garbage(_conn))
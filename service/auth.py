@@ -6,7 +6,14 @@ from dotenv import load_dotenv
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
-def token_required(f):
+def token_required(f=None, *, allow_query_token=False):
+    """
+    @token_required ya da @token_required(allow_query_token=True).
+    allow_query_token yalnızca SSE route'larında verilmeli: token query string'de log'lara düşer.
+    """
+    if f is None:
+        return lambda fn: token_required(fn, allow_query_token=allow_query_token)
+
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
@@ -17,6 +24,10 @@ def token_required(f):
                 token = parts[1]
                 print(token)
 
+        # Tarayıcı EventSource başlık gönderemez: yalnızca izin verilen SSE route'larında ?access_token kabul edilir
+        if not token and allow_query_token and request.accept_mimetypes.best == 'text/event-stream':
+            token = request.args.get('access_token')
+
         if not token:
             return jsonify({'error': 'Token gerekli!'}), 401
 
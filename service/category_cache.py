@@ -0,0 +1,78 @@
+"""
+category_cache.py
+-----------------
+TblCategory'nin bellekteki anlık görüntüsü (/Category/list ve /Category/active_list).
+
+- Tablo ilk istekte bir kez okunur; iki liste hazır JSON gövdesi ve ETag'iyle saklanır.
+  Sonraki isteklerde DB'ye gidilmez, gövde yeniden serileştirilmez.
+- ETag gövdenin özetidir: farklı process'ler aynı veri için aynı ETag'i üretir,
+  If-None-Match eşleşirse controller 304 döner.
+- add/update/delete commit'ten sonra invalidate() çağırır; bir sonraki okuma tabloyu yeniden yükler.
+  Birden çok process'te diğer process'lerin kopyası en geç CATEGORY_CACHE_TTL_SECONDS sonra
+  yenilenir (0: yalnızca invalidate ile).
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CATEGORY_CACHE_TTL_SECONDS = float(os.getenv("CATEGORY_CACHE_TTL_SECONDS", "300"))
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class CategorySnapshot(NamedTuple):
+    all: CachedBody       # /list   (created_at DESC)
+    active: CachedBody    # /active_list (is_active = 1, category_name ASC)
+    loaded_at: float
+
+
+def _cached_body(body: bytes) -> CachedBody:
+    return CachedBody(body, hashlib.sha1(body).hexdigest())
+
+
+class CategoryCache:
+    """
+    Parametreler
+    ------------
+    loader : Callable[[], Tuple[bytes, bytes]]
+        Tabloyu okuyup (list, active_list) JSON gövdelerini üreten fonksiyon (controller verir)
+    ttl : float
+        Saniye; 0 ise görüntü yalnızca invalidate() ile yenilenir
+    """
+
+    def __init__(self, loader: Callable[[], Tuple[bytes, bytes]], ttl: float = CATEGORY_CACHE_TTL_SECONDS) -> None:
+        self.loader = loader
+        self.ttl = max(0.0, ttl)
+        self._snapshot: Optional[CategorySnapshot] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self) -> CategorySnapshot:
+        snap = self._snapshot
+        if snap is not None and (not self.ttl or time.monotonic() - snap.loaded_at < self.ttl):
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            if snap is not None and (not self.ttl or time.monotonic() - snap.loaded_at < self.ttl):
+                return snap
+            generation = self._generation
+            all_body, active_body = self.loader()
+            snap = CategorySnapshot(_cached_body(all_body), _cached_body(active_body), time.monotonic())
+            # Yükleme sürerken invalidate geldiyse bu (eski olabilecek) görüntü saklanmaz
+            if generation == self._generation:
+                self._snapshot = snap
+            return snap
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._snapshot = None
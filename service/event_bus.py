@@ -0,0 +1,148 @@
+"""
+event_bus.py
+------------
+Process içi yayın/abone (pub/sub) event hattı; SSE endpoint'lerini (/Ticket/<id>/events, /Ticket/queue/events) besler.
+
+- Yazan endpoint'ler commit'ten sonra publish eder; event'ler konuya göre dağıtılır:
+  "ticket:<id>" (ticket sayfası) ve "queue" (açık / atanmamış ticket kuyruğu).
+- Son EVENT_BUFFER_SIZE event halka tamponda tutulur: yeniden bağlanan istemci Last-Event-ID ile
+  kaçırdıklarını alır. Id'ler "<process>-<sıra>" biçimindedir; istemcinin id'si tamponda yoksa
+  (başka process, yeniden başlatma, tampon taştı) "resync" event'i gönderilir, istemci bir kez yeniden yükler.
+- Aboneler sınırlı kuyrukla tutulur; yavaş bir abonenin kuyruğu dolarsa akışı kapatılır, yayıncı hiç beklemez.
+  İstemci Last-Event-ID ile yeniden bağlanınca eksikler tampondan gelir.
+- Event'ler bu process'e özeldir: birden çok worker varsa bir worker'daki yazım diğerindeki izleyicilere
+  gitmez (istemci resync / yeniden bağlanma ile telafi eder).
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EVENT_BUFFER_SIZE       = int(os.getenv("EVENT_BUFFER_SIZE", "2000"))
+EVENT_SUBSCRIBER_QUEUE  = int(os.getenv("EVENT_SUBSCRIBER_QUEUE", "256"))
+
+QUEUE_TOPIC = "queue"
+
+
+def ticket_topic(ticket_id) -> str:
+    return f"ticket:{int(ticket_id)}"
+
+
+class Event(NamedTuple):
+    id: str
+    seq: int
+    topics: Tuple[str, ...]
+    type: str
+    data: dict
+    at: float
+
+
+class Subscription:
+    """Bir SSE bağlantısı: konular + sınırlı kuyruk. overflow olunca akış kapanır."""
+
+    def __init__(self, bus: "EventBus", topics: Iterable[str]) -> None:
+        self.bus = bus
+        self.topics = frozenset(topics)
+        self.queue: "queue.Queue[Event]" = queue.Queue(maxsize=EVENT_SUBSCRIBER_QUEUE)
+        self.overflow = False
+        self.position = ""   # abone olunduğu andaki son event id'si (resync sonrası devam noktası)
+
+    def get(self, timeout: float) -> Optional[Event]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE) -> None:
+        self.process_id = uuid.uuid4().hex[:8]
+        self._seq = itertools.count(1)
+        self._buffer: "deque[Event]" = deque(maxlen=max(1, buffer_size))
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def publish(self, topics: Iterable[str], event_type: str, data: Optional[dict] = None) -> Event:
+        with self._lock:
+            seq = next(self._seq)
+            ev = Event(f"{self.process_id}-{seq}", seq, tuple(topics), event_type, data or {}, time.time())
+            self._buffer.append(ev)
+            self.published += 1
+            targets = [s for s in self._subscribers if not s.overflow and s.topics.intersection(ev.topics)]
+        for sub in targets:
+            try:
+                sub.queue.put_nowait(ev)
+            except queue.Full:
+                sub.overflow = True
+        return ev
+
+    def subscribe(self, topics: Iterable[str], last_event_id: Optional[str] = None) -> Tuple[Subscription, List[Event], bool]:
+        """
+        Dönüş: (abonelik, Last-Event-ID'den sonra kaçırılan event'ler, resync gerekli mi).
+        Abonelik ve geçmiş aynı kilit altında alınır: arada yayınlanan event kaybolmaz, iki kez de gelmez.
+        """
+        sub = Subscription(self, topics)
+        with self._lock:
+            self._subscribers.append(sub)
+            sub.position = self._buffer[-1].id if self._buffer else f"{self.process_id}-0"
+            backlog, resync = [], False
+            if last_event_id:
+                seq = self._seq_of(last_event_id)
+                oldest = self._buffer[0].seq if self._buffer else None
+                if seq is None or (oldest is not None and seq < oldest - 1):
+                    resync = True
+                else:
+                    backlog = [e for e in self._buffer if e.seq > seq and sub.topics.intersection(e.topics)]
+        return sub, backlog, resync
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def _seq_of(self, event_id: str) -> Optional[int]:
+        pid, _, seq = event_id.partition("-")
+        if pid != self.process_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'buffered': len(self._buffer), 'published': self.published}
+
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = EventBus()
+    return _bus
+
+
+def publish_ticket_event(ticket_id, event_type: str, data: Optional[dict] = None, queue_changed: bool = False) -> None:
+    """Ticket sayfasına (ve kuyruğu etkiliyorsa kuyruğa) event yayınlar; hata yazımı bozmasın diye yutulur."""
+    if ticket_id is None:
+        return
+    try:
+        topics = [ticket_topic(ticket_id)] + ([QUEUE_TOPIC] if queue_changed else [])
+        get_event_bus().publish(topics, event_type, dict(data or {}, ticket_id=int(ticket_id)))
+    except Exception as e:
+        print(f"⚠️ event publish hatası: {e}")
@@ -0,0 +1,257 @@
+"""
+grispi_sync.py
+--------------
+Grispi ticket'larını lokal TblGrispiTicket tablosuna artımlı (incremental) aynalar.
+
+- Son senkronun `updatedAt` değeri TblSyncCheckpoint'te watermark olarak tutulur.
+- Her turda yalnızca watermark'tan sonra değişen ticket'lar çekilir (updatedAt ASC).
+- Kayıtlar batch halinde MERGE ile upsert edilir; checkpoint aynı transaction'da ilerler.
+  Yarıda kalan bir tur bir sonraki turda aynı noktadan devam eder.
+
+Kullanım:
+    from service.grispi_sync import start_grispi_sync
+    start_grispi_sync()          # daemon thread, GRISPI_SYNC_INTERVAL saniyede bir
+
+    python -m service.grispi_sync   # tek seferlik senkron (cron vb.)
+"""
+
+import os
+import datetime
+import threading
+import time
+
+import pyodbc
+import requests
+from dotenv import load_dotenv
+
+from service.aes_service import AESService
+
+load_dotenv()
+
+CONNECTION_STRING = os.getenv("CONNECTION_STRING")
+
+GRISPI_TOKEN  = os.getenv("GRISPI_TOKEN")
+GRISPI_TENANT = os.getenv("GRISPI_TENANT", "stajer")
+GRISPI_BASE   = "https://api.grispi.com/public/v1"
+
+# Değişen ticket'ları listeleyen uç ve parametre adı tenant'a göre değişebildiği için ENV ile ayarlanabilir
+GRISPI_SYNC_PATH        = os.getenv("GRISPI_SYNC_PATH", "/tickets/search")
+GRISPI_SYNC_SINCE_PARAM = os.getenv("GRISPI_SYNC_SINCE_PARAM", "updatedAtFrom")
+
+GRISPI_SYNC_ENABLED   = os.getenv("GRISPI_SYNC_ENABLED", "false").lower() in ("1", "true", "yes")
+GRISPI_SYNC_INTERVAL  = int(os.getenv("GRISPI_SYNC_INTERVAL", "60"))     # saniye
+GRISPI_SYNC_PAGE_SIZE = int(os.getenv("GRISPI_SYNC_PAGE_SIZE", "100"))
+
+CHECKPOINT_NAME = "grispi_tickets"
+
+_sync_thread = None
+_sync_lock = threading.Lock()
+
+
+# ---------------- Helpers ----------------
+
+def _headers():
+    return {
+        "Authorization": f"Bearer {GRISPI_TOKEN}",
+        "tenantId": GRISPI_TENANT,
+        "Content-Type": "application/json"
+    }
+
+
+def ms_to_date(ms):
+    try:
+        return datetime.datetime.utcfromtimestamp(int(ms) / 1000.0)
+    except Exception:
+        return None
+
+
+def safe_field(field_map, key, subkey="userFriendlyValue"):
+    try:
+        fm = field_map.get(key) or {}
+        return fm.get(subkey) or fm.get("value") or fm.get("serializedValue")
+    except Exception:
+        return None
+
+
+def _requester_id(t):
+    """Ticket JSON'undan talep sahibinin Grispi id'si (alan adı sürüme göre değişebiliyor)."""
+    requester = t.get("requester") or t.get("creator") or {}
+    rid = t.get("requesterId") or (requester.get("id") if isinstance(requester, dict) else None)
+    if not rid:
+        rid = safe_field(t.get("fieldMap") or {}, "ts.requester", "value")
+    try:
+        return int(rid) if rid is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _enc(v):
+    return AESService.encrypt(str(v)) if v else None
+
+
+def map_grispi_ticket(t):
+    """Grispi ticket JSON -> TblGrispiTicket MERGE parametreleri (None: key yoksa)."""
+    key = t.get("key") or (str(t["id"]) if t.get("id") is not None else None)
+    if not key:
+        return None
+
+    field_map = t.get("fieldMap") or {}
+    subject  = safe_field(field_map, "ts.subject") or t.get("subject")
+    status   = safe_field(field_map, "ts.status") or t.get("status")
+    priority = safe_field(field_map, "ts.priority") or t.get("priority")
+
+    return (
+        key,
+        _requester_id(t),
+        _enc(subject),
+        _enc(str(status).upper() if status else None),
+        _enc(str(priority).upper() if priority else None),
+        ms_to_date(t.get("createdAt")),
+        ms_to_date(t.get("updatedAt")),
+    )
+
+
+# MERGE: eski bir sayfa yeni veriyi ezmesin diye updated_at kontrolü yapılır
+UPSERT_SQL = """
+    MERGE TblGrispiTicket WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS grispi_key, ? AS requester_grispi_id, ? AS subject, ? AS status,
+                  ? AS priority, ? AS grispi_created_at, ? AS grispi_updated_at) AS s
+      ON t.grispi_key = s.grispi_key
+    WHEN MATCHED AND (t.grispi_updated_at IS NULL OR s.grispi_updated_at IS NULL
+                      OR t.grispi_updated_at <= s.grispi_updated_at) THEN
+      UPDATE SET requester_grispi_id = COALESCE(s.requester_grispi_id, t.requester_grispi_id),
+                 subject = s.subject, status = s.status, priority = s.priority,
+                 grispi_created_at = s.grispi_created_at, grispi_updated_at = s.grispi_updated_at,
+                 synced_at = GETDATE()
+    WHEN NOT MATCHED THEN
+      INSERT (grispi_key, requester_grispi_id, subject, status, priority,
+              grispi_created_at, grispi_updated_at, synced_at)
+      VALUES (s.grispi_key, s.requester_grispi_id, s.subject, s.status, s.priority,
+              s.grispi_created_at, s.grispi_updated_at, GETDATE());
+"""
+
+
+def upsert_grispi_tickets(cur, tickets):
+    """Verilen Grispi ticket JSON listesini tek executemany ile aynaya yazar."""
+    rows = [r for r in (map_grispi_ticket(t) for t in tickets) if r]
+    if rows:
+        cur.fast_executemany = True
+        cur.executemany(UPSERT_SQL, rows)
+    return len(rows)
+
+
+def link_local_ticket(cur, grispi_key, local_ticket_id):
+    """Lokal TblTicket kaydını Grispi key'i ile eşler (webhook event'leri bu eşlemeyle yazılır)."""
+    cur.execute("""
+        MERGE TblGrispiTicket WITH (HOLDLOCK) AS t
+        USING (SELECT ? AS grispi_key, ? AS local_ticket_id) AS s
+          ON t.grispi_key = s.grispi_key
+        WHEN MATCHED THEN UPDATE SET local_ticket_id = s.local_ticket_id
+        WHEN NOT MATCHED THEN
+          INSERT (grispi_key, local_ticket_id, synced_at) VALUES (s.grispi_key, s.local_ticket_id, GETDATE());
+    """, (str(grispi_key), local_ticket_id))
+
+
+def get_watermark(cur, name=CHECKPOINT_NAME):
+    cur.execute("SELECT watermark FROM TblSyncCheckpoint WHERE name = ?", (name,))
+    row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def set_watermark(cur, watermark, name=CHECKPOINT_NAME):
+    cur.execute("""
+        MERGE TblSyncCheckpoint WITH (HOLDLOCK) AS t
+        USING (SELECT ? AS name, ? AS watermark) AS s
+          ON t.name = s.name
+        WHEN MATCHED THEN UPDATE SET watermark = s.watermark, updated_at = GETDATE()
+        WHEN NOT MATCHED THEN INSERT (name, watermark, updated_at) VALUES (s.name, s.watermark, GETDATE());
+    """, (name, int(watermark)))
+
+
+def _fetch_changed(since_ms, page):
+    resp = requests.get(
+        f"{GRISPI_BASE}{GRISPI_SYNC_PATH}",
+        headers=_headers(),
+        params={
+            GRISPI_SYNC_SINCE_PARAM: since_ms,
+            "sort": "updatedAt,asc",
+            "page": page,
+            "size": GRISPI_SYNC_PAGE_SIZE,
+        },
+        timeout=30
+    )
+    if resp.status_code != 200:
+        raise RuntimeError(f"Grispi senkron isteği başarısız ({resp.status_code}): {resp.text[:200]}")
+    js = resp.json()
+    return js if isinstance(js, list) else js.get("content", [])
+
+
+# ---------------- Sync ----------------
+
+def sync_once():
+    """
+    Watermark'tan itibaren değişen tüm ticket'ları çeker ve aynaya yazar.
+    Dönüş: upsert edilen kayıt sayısı.
+    """
+    if not GRISPI_TOKEN:
+        print("⚠️ GRISPI_TOKEN yok; Grispi senkronu atlanıyor.")
+        return 0
+
+    total = 0
+    page = 0
+    with pyodbc.connect(CONNECTION_STRING) as conn:
+        cur = conn.cursor()
+        watermark = get_watermark(cur)
+
+        while True:
+            tickets = _fetch_changed(watermark, page)
+            if not tickets:
+                break
+
+            total += upsert_grispi_tickets(cur, tickets)
+
+            new_watermark = max([int(t.get("updatedAt") or 0) for t in tickets] + [watermark])
+            set_watermark(cur, new_watermark)
+            conn.commit()  # batch + checkpoint birlikte
+
+            if len(tickets) < GRISPI_SYNC_PAGE_SIZE:
+                break
+            # Filtre ">= watermark" olduğundan sınırdaki kayıtlar tekrar gelir (upsert idempotent).
+            # Aynı ms'de sayfa boyundan fazla kayıt varsa watermark ilerlemez; o zaman sayfayı kaydır.
+            if new_watermark == watermark:
+                page += 1
+            else:
+                watermark, page = new_watermark, 0
+
+    if total:
+        print(f"🔄 Grispi senkron: {total} ticket güncellendi")
+    return total
+
+
+def _sync_loop(interval):
+    while True:
+        try:
+            sync_once()
+        except Exception as e:
+            print("⚠️ Grispi senkron hatası:", e)
+        time.sleep(interval)
+
+
+def start_grispi_sync(interval=None):
+    """Senkron döngüsünü daemon thread olarak başlatır (process başına bir kez)."""
+    global _sync_thread
+    with _sync_lock:
+        if _sync_thread and _sync_thread.is_alive():
+            return _sync_thread
+        _sync_thread = threading.Thread(
+            target=_sync_loop,
+            args=(interval or GRISPI_SYNC_INTERVAL,),
+            name="grispi-sync",
+            daemon=True
+        )
+        _sync_thread.start()
+        return _sync_thread
+
+
+if __name__ == "__main__":
+    print("Senkronlanan ticket:", sync_once())
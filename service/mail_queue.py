@@ -0,0 +1,269 @@
+"""
+mail_queue.py
+-------------
+HTTP isteklerini SMTP'den bağımsız kılmak için kalıcı (disk) e-posta kuyruğu.
+
+- enqueue() işi spool klasörüne JSON olarak yazar ve hemen döner.
+- İşçi thread'ler zamanı gelen işleri alır, MailService ile tek deneme yapar
+  (MailService içindeki time.sleep'li retry kullanılmaz).
+- Başarısız işler üstel geri çekilme ile yeniden planlanır; MAIL_QUEUE_MAX_ATTEMPTS
+  dolunca dead-letter dosyasına (JSON satırı) yazılıp spool'dan silinir.
+- Process yeniden başladığında spool'daki işler kaldığı yerden devam eder.
+  Birden fazla process aynı spool'u paylaşabilir: işler atomik rename ile sahiplenilir.
+
+Spool düzeni:
+    <spool>/<job_id>.json                 -> bekleyen iş
+    <spool>/<job_id>.<pid>.inflight       -> o anda bir process tarafından gönderiliyor
+    <spool>/dead_letter.jsonl             -> vazgeçilen işler
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .mail_service import MailService, recipients_of
+
+
+class MailQueue:
+    """
+    Parametreler
+    ------------
+    svc : MailService
+        Gönderimde kullanılacak servis (bağlantı havuzu paylaşılır)
+    spool_dir : str
+        İşlerin diske yazıldığı klasör
+    workers : int
+        İşçi thread sayısı
+    max_attempts : int
+        Bir iş için en fazla gönderim denemesi
+    retry_delay : float
+        İlk yeniden deneme gecikmesi (saniye)
+    backoff : float
+        Yeniden denemeler arası çarpan (örn. 2 => 30s, 60s, 120s ...)
+    """
+
+    def __init__(
+        self,
+        svc: MailService,
+        spool_dir: str,
+        *,
+        workers: int = 2,
+        max_attempts: int = 6,
+        retry_delay: float = 30.0,
+        backoff: float = 2.0,
+    ) -> None:
+        self.svc = svc
+        self.spool = Path(spool_dir)
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.backoff = max(1.0, backoff)
+        self.dead_letter_path = self.spool / "dead_letter.jsonl"
+
+        self._heap: List[Tuple[float, str]] = []
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._dead_lock = threading.Lock()
+
+    # ------------- Public API -------------
+
+    def start(self) -> "MailQueue":
+        """Spool'u tarar, yarım kalan işleri geri alır ve işçileri başlatır."""
+        if self._threads:
+            return self
+        self.spool.mkdir(parents=True, exist_ok=True)
+        self._recover_inflight()
+        self._scan()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"mail-queue-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def enqueue(self, **email_kwargs: Any) -> str:
+        """
+        MailService.send_email argümanlarını (JSON'a çevrilebilir olmalı) kuyruğa yazar.
+        Dönüş: job id
+        """
+        return self._add_job({"email": email_kwargs})
+
+    def enqueue_bulk(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        Birden çok mesajı tek iş olarak kuyruğa yazar; MailService.send_bulk ile
+        az sayıda oturumda gönderilir. Hiçbir alıcısına ulaşılamayan mesajlar yeniden denenir.
+        """
+        return self._add_job({"bulk": list(messages)})
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    # ------------- Internal helpers -------------
+
+    def _add_job(self, payload: Dict[str, Any]) -> str:
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            **payload,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            "last_error": None,
+        }
+        self._write_job(self._job_path(job["id"]), job)
+        self._schedule(job["next_attempt_at"], job["id"])
+        return job["id"]
+
+    def _job_path(self, job_id: str) -> Path:
+        return self.spool / f"{job_id}.json"
+
+    def _inflight_path(self, job_id: str) -> Path:
+        return self.spool / f"{job_id}.{os.getpid()}.inflight"
+
+    @staticmethod
+    def _write_job(path: Path, job: Dict[str, Any]) -> None:
+        # Yarım yazılmış dosya kalmasın: tmp + atomik replace
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _schedule(self, when: float, job_id: str) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (when, job_id))
+            self._cond.notify()
+
+    def _scan(self) -> None:
+        for p in self.spool.glob("*.json"):
+            try:
+                with open(p, encoding="utf-8") as f:
+                    job = json.load(f)
+                self._schedule(float(job.get("next_attempt_at") or 0), job["id"])
+            except Exception as e:
+                print(f"📧 Spool dosyası okunamadı ({p.name}): {e}")
+
+    def _recover_inflight(self) -> None:
+        """Ölü process'lerin yarıda bıraktığı işleri tekrar bekleyen duruma alır."""
+        for p in self.spool.glob("*.inflight"):
+            try:
+                job_id, pid, _ = p.name.split(".")
+                if int(pid) != os.getpid() and _pid_alive(int(pid)):
+                    continue
+                os.replace(p, self._job_path(job_id))
+            except Exception as e:
+                print(f"📧 Yarım kalan iş geri alınamadı ({p.name}): {e}")
+
+    def _next_due(self) -> Optional[str]:
+        with self._cond:
+            while not self._stopping:
+                if self._heap:
+                    when, job_id = self._heap[0]
+                    wait = when - time.time()
+                    if wait <= 0:
+                        heapq.heappop(self._heap)
+                        return job_id
+                    self._cond.wait(timeout=wait)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _worker(self) -> None:
+        while True:
+            job_id = self._next_due()
+            if job_id is None:
+                return
+            try:
+                self._process(job_id)
+            except Exception as e:
+                print(f"📧 Kuyruk işi işlenemedi ({job_id}): {e}")
+
+    def _process(self, job_id: str) -> None:
+        inflight = self._inflight_path(job_id)
+        try:
+            # Sahiplen: başka bir process aldıysa dosya yoktur
+            os.replace(self._job_path(job_id), inflight)
+        except FileNotFoundError:
+            return
+
+        with open(inflight, encoding="utf-8") as f:
+            job = json.load(f)
+
+        job["attempts"] += 1
+        if "bulk" in job:
+            ok, info = self._send_bulk_job(job)
+        else:
+            try:
+                ok, info = self.svc.send_email(retries=0, **job["email"])
+            except Exception as exc:  # ValueError vb. (kalıcı hata)
+                ok, info = False, str(exc)
+                job["attempts"] = self.max_attempts
+
+        if ok:
+            inflight.unlink(missing_ok=True)
+            return
+
+        job["last_error"] = info
+        if job["attempts"] >= self.max_attempts:
+            self._dead_letter(job)
+            inflight.unlink(missing_ok=True)
+            print(f"📧 E-posta dead-letter'a taşındı ({job_id}): {info}")
+            return
+
+        delay = self.retry_delay * (self.backoff ** (job["attempts"] - 1))
+        job["next_attempt_at"] = time.time() + delay
+        self._write_job(self._job_path(job_id), job)
+        inflight.unlink(missing_ok=True)
+        self._schedule(job["next_attempt_at"], job_id)
+
+    def _send_bulk_job(self, job: Dict[str, Any]) -> Tuple[bool, str]:
+        """Toplu işi gönderir; job["bulk"] yalnızca yeniden denenecek mesajlarla güncellenir."""
+        messages = job["bulk"]
+        results = self.svc.send_bulk(messages, sessions=self.svc.pool_size)
+
+        retry, errors, pos = [], [], 0
+        for m in messages:
+            n = len(recipients_of(m)) or 1
+            chunk = results[pos:pos + n]
+            pos += n
+            if not any(ok for _, ok, _ in chunk):
+                retry.append(m)
+                errors.append(chunk[0][2] if chunk else "Sonuç yok")
+
+        job["bulk"] = retry
+        if not retry:
+            return True, ""
+        return False, f"{len(retry)}/{len(messages)} mesaj gönderilemedi: {errors[0]}"
+
+    def _dead_letter(self, job: Dict[str, Any]) -> None:
+        job["dead_at"] = time.time()
+        with self._dead_lock:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(job, ensure_ascii=False) + "\n")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -7,8 +7,10 @@ Basit ama üretim ortamına uygun bir SMTP e‑posta servis sınıfı.
 - TLS/SSL desteği
 - HTML + düz metin (multipart/alternative)
 - CC / BCC / Reply-To
-- Dosya eki (path ya da (filename, bytes, mime_type))
+- Dosya eki (path ya da (filename, bytes, mime_type)); ekler parça parça base64'lenip sokete akıtılır
 - Zaman aşımı, yeniden deneme (retry) ve üstel geri çekilme (exponential backoff)
+- Kalıcı SMTP bağlantı havuzu (NOOP ile sağlık kontrolü, yaş/mesaj sayısı ile yenileme)
+- Toplu gönderim (send_bulk): tembel mesaj üretimi, az sayıda oturum, PIPELINING ile MAIL/RCPT
 - Tip ipuçları ve ayrıntılı dokümantasyon
 
 Kullanım
@@ -37,19 +39,37 @@ Ortam değişkenleri ile örnek kullanım için dosyanın en altındaki __main__
 
 from __future__ import annotations
 
+import base64
+import io
 import os
+import re
+import uuid
+from collections import OrderedDict
 import smtplib
 import ssl
+import threading
 import time
 import mimetypes
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence, Tuple, Union, Dict
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, Dict
 
-from email.message import EmailMessage
-from email.utils import formatdate, make_msgid
+from email import policy as email_policy
+from email.generator import BytesGenerator
+from email.message import EmailMessage, MIMEPart
+from email.utils import formatdate, make_msgid, parseaddr
 
 
 AttachmentType = Union[str, Path, Tuple[str, bytes, str]]  # path  veya (filename, bytes, mime_type)
+BulkItem = Union[Dict[str, Any], Callable[[], Dict[str, Any]]]  # send_email kwargs ya da onu üreten fonksiyon
+BulkResult = Tuple[str, bool, str]  # (alıcı, başarılı_mı, message_id_veya_hata)
+
+_BODY_CACHE_SIZE = 32
+
+# 57 bayt girdi = 76 karakterlik bir base64 satırı; okuma boyu bunun katı olmalı
+_B64_READ_SIZE = 57 * 1024
+
+# DATA akışında sokete tek seferde yazılacak en küçük blok
+_SEND_BUFFER_SIZE = 64 * 1024
 
 
 class MailService:
@@ -80,6 +100,19 @@ class MailService:
         Başarısız denemelerde yeniden deneme sayısı
     backoff : float
         Yeniden denemeler arası çarpan (örn. 1.5 => 1s, 1.5s, 2.25s)
+    pool_size : int
+        Aynı anda açık tutulacak en fazla oturum açmış SMTP bağlantısı
+    max_conn_age : float
+        Bir bağlantının yeniden kullanılabileceği en uzun süre (saniye); sonra yenilenir
+    max_conn_messages : int
+        Bir bağlantı üzerinden gönderilecek en fazla mesaj; sonra yenilenir
+    noop_after : float
+        Bu kadar saniye boşta kalan bağlantı kullanılmadan önce NOOP ile kontrol edilir
+    attachment_cache_bytes : int
+        Kodlanmış (base64) eklerin bellekte tutulacağı toplam üst sınır; aynı dosya çok
+        alıcıya giderken yeniden kodlanmaz. 0 önbelleği kapatır.
+    attachment_cache_max_item : int
+        Bundan büyük ekler önbelleğe alınmaz, her gönderimde diskten akıtılır
     """
 
     def __init__(
@@ -96,6 +129,12 @@ class MailService:
         default_from_name: Optional[str] = None,
         retries: int = 2,
         backoff: float = 1.5,
+        pool_size: int = 2,
+        max_conn_age: float = 300.0,
+        max_conn_messages: int = 100,
+        noop_after: float = 15.0,
+        attachment_cache_bytes: int = 16 * 1024 * 1024,
+        attachment_cache_max_item: int = 4 * 1024 * 1024,
     ) -> None:
         if use_tls and use_ssl:
             raise ValueError("use_tls ve use_ssl aynı anda True olamaz.")
@@ -110,6 +149,21 @@ class MailService:
         self.default_from_name = default_from_name
         self.retries = max(0, retries)
         self.backoff = max(1.0, backoff)
+        self.pool_size = max(1, pool_size)
+        self.max_conn_age = max_conn_age
+        self.max_conn_messages = max(1, max_conn_messages)
+        self.noop_after = noop_after
+
+        # Boştaki bağlantılar (LIFO: en son kullanılan en sıcak bağlantıdır)
+        self._idle: List[_PooledConnection] = []
+        self._pool_lock = threading.Lock()
+        self._pool_slots = threading.BoundedSemaphore(self.pool_size)
+
+        # Kodlanmış gövde önbelleği (aynı içerik çok alıcıya giderken)
+        self._body_cache: "OrderedDict[Tuple[Optional[str], Optional[str]], EmailMessage]" = OrderedDict()
+        self._body_lock = threading.Lock()
+
+        self._attachment_cache = _EncodedAttachmentCache(attachment_cache_bytes, attachment_cache_max_item)
 
     # ------------- Public API -------------
 
@@ -128,10 +182,14 @@ class MailService:
         from_email: Optional[str] = None,
         from_name: Optional[str] = None,
         message_id: Optional[str] = None,
+        retries: Optional[int] = None,
     ) -> Tuple[bool, str]:
         """
         E‑posta gönderir.
 
+        retries verilirse bu çağrı için self.retries yerine kullanılır
+        (örn. kendi yeniden deneme planı olan kuyruk işçileri 0 verir).
+
         Dönüş
         -----
         (success, message_id_or_error) : Tuple[bool, str]
@@ -158,26 +216,182 @@ class MailService:
             message_id=message_id,
         )
 
+        max_retries = self.retries if retries is None else max(0, retries)
         attempt = 0
         delay = 1.0
         last_error = None
 
-        while attempt <= self.retries:
+        while attempt <= max_retries:
             try:
                 self._send_via_smtp(msg, recipients)
                 return True, msg["Message-Id"]
             except Exception as exc:  # geniş tut: farklı SMTPException tipleri olabilir
                 last_error = str(exc)
                 attempt += 1
-                if attempt > self.retries:
+                if attempt > max_retries:
                     break
                 time.sleep(delay)
                 delay *= self.backoff
 
         return False, last_error or "Bilinmeyen hata"
 
+    def send_bulk(self, messages: Iterable[BulkItem], *, sessions: int = 1) -> List[BulkResult]:
+        """
+        Çok sayıda kişiselleştirilmiş e‑postayı az sayıda SMTP oturumu üzerinden gönderir.
+
+        messages : send_email ile aynı anahtarları taşıyan dict'ler ya da bu dict'i üreten
+                   fonksiyonlar. Mesajlar iterasyon sırasında (tembel) üretilir; tüm liste
+                   bellekte MIME olarak tutulmaz.
+        sessions : Paralel kullanılacak oturum sayısı (pool_size ile sınırlı)
+
+        Sunucu PIPELINING destekliyorsa MAIL FROM ve tüm RCPT TO komutları tek seferde
+        yazılır, cevaplar topluca okunur. Hatalı bir mesaj diğerlerini durdurmaz.
+
+        Dönüş: her alıcı için (alıcı, başarılı_mı, message_id_veya_hata); mesaj sırasıyla.
+        """
+        source = enumerate(iter(messages))
+        source_lock = threading.Lock()
+        results: Dict[int, List[BulkResult]] = {}
+        abort: List[str] = []  # sunucuya hiç bağlanılamıyorsa kalan mesajlar beklemeden düşer
+
+        def next_item() -> Optional[Tuple[int, BulkItem]]:
+            with source_lock:
+                return next(source, None)
+
+        def run() -> None:
+            conn: Optional[_PooledConnection] = None
+            try:
+                while True:
+                    item = next_item()
+                    if item is None:
+                        return
+                    idx, spec = item
+                    kwargs: Dict[str, Any] = {}
+                    try:
+                        kwargs = spec() if callable(spec) else dict(spec)
+                        msg, envelope_from, recipients = self._prepare(kwargs)
+                    except Exception as exc:
+                        # Mesaj üretilemedi / geçersiz: yalnızca bu mesajın alıcıları başarısız
+                        failed = recipients_of(kwargs) or ["?"]
+                        results[idx] = [(r, False, str(exc)) for r in failed]
+                        continue
+
+                    if abort:
+                        results[idx] = [(r, False, abort[0]) for r in recipients]
+                        continue
+
+                    for attempt in (1, 2):
+                        connecting = False
+                        try:
+                            if conn is None or self._is_expired(conn):
+                                if conn is not None:
+                                    self._release(conn, True)
+                                    conn = None
+                                connecting = True
+                                conn, _ = self._acquire()
+                                connecting = False
+                            results[idx] = self._send_pipelined(conn, msg, envelope_from, recipients)
+                            break
+                        except OSError as exc:  # SMTPException, bağlantı hataları, zaman aşımı
+                            # Oturum düştü ya da açılamadı: bir kez yeni bağlantıyla dene
+                            if conn is not None:
+                                self._release(conn, False)
+                                conn = None
+                            if attempt == 2:
+                                results[idx] = [(r, False, str(exc)) for r in recipients]
+                                if connecting:
+                                    abort.append(str(exc))
+            finally:
+                if conn is not None:
+                    self._release(conn, True)
+
+        workers = max(1, min(sessions, self.pool_size))
+        if workers == 1:
+            run()
+        else:
+            threads = [threading.Thread(target=run, name=f"mail-bulk-{i}") for i in range(workers)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        return [r for idx in sorted(results) for r in results[idx]]
+
+    def close(self) -> None:
+        """Havuzdaki boşta bekleyen tüm SMTP bağlantılarını kapatır."""
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            _quit_quietly(conn.server)
+
     # ------------- Internal helpers -------------
 
+    def _prepare(self, kwargs: Dict[str, Any]) -> Tuple["OutgoingMessage", str, List[str]]:
+        """send_email kwargs -> (mesaj, zarf göndericisi, tekil alıcı listesi)."""
+        if not (kwargs.get("text") or kwargs.get("html")):
+            raise ValueError("En azından 'text' veya 'html' içeriği sağlamalısınız.")
+        to, cc, bcc = _as_list(kwargs.get("to")), _as_list(kwargs.get("cc")), _as_list(kwargs.get("bcc"))
+        recipients = recipients_of(kwargs)
+        if not recipients:
+            raise ValueError("'to/cc/bcc' alanlarından en az biri gerekli.")
+
+        from_email = kwargs.get("from_email") or self.default_from or self.username
+        msg = self._build_message(
+            to=to,
+            subject=kwargs.get("subject") or "",
+            text=kwargs.get("text"),
+            html=kwargs.get("html"),
+            cc=cc,
+            bcc=bcc,
+            reply_to=kwargs.get("reply_to"),
+            attachments=kwargs.get("attachments") or [],
+            headers=kwargs.get("headers") or {},
+            from_email=from_email,
+            from_name=kwargs.get("from_name") or self.default_from_name,
+            message_id=kwargs.get("message_id"),
+        )
+        return msg, from_email, recipients
+
+    def _send_pipelined(
+        self,
+        conn: "_PooledConnection",
+        msg: "OutgoingMessage",
+        envelope_from: str,
+        recipients: Sequence[str],
+    ) -> List[BulkResult]:
+        """Tek mesajı açık oturum üzerinden gönderir; alıcı bazında sonuç döner."""
+        server = conn.server
+        msg_id = msg["Message-Id"]
+
+        if server.does_esmtp and server.has_extn("pipelining") and _is_ascii(envelope_from, *recipients):
+            cmds = [f"MAIL FROM:<{envelope_from}>"] + [f"RCPT TO:<{r}>" for r in recipients]
+            server.send(("\r\n".join(cmds) + "\r\n").encode("ascii"))
+            replies = [server.getreply() for _ in cmds]
+            mail_reply, rcpt_replies = replies[0], replies[1:]
+        else:
+            mail_reply = server.mail(envelope_from)
+            rcpt_replies = [server.rcpt(r) for r in recipients] if mail_reply[0] == 250 else []
+
+        if mail_reply[0] != 250:
+            server.rset()
+            err = _reply_text(mail_reply)
+            return [(r, False, err) for r in recipients]
+
+        accepted = [r for r, (code, _) in zip(recipients, rcpt_replies) if code in (250, 251)]
+        refused = {r: _reply_text(rep) for r, rep in zip(recipients, rcpt_replies) if rep[0] not in (250, 251)}
+        if not accepted:
+            server.rset()
+            return [(r, False, refused.get(r, "Reddedildi")) for r in recipients]
+
+        code, resp = _send_data(server, msg)
+        if code != 250:
+            server.rset()
+            err = _reply_text((code, resp))
+            return [(r, False, refused.get(r, err)) for r in recipients]
+
+        conn.sent += 1
+        return [(r, r not in refused, refused.get(r, msg_id)) for r in recipients]
+
     def _build_message(
         self,
         *,
@@ -193,7 +407,7 @@ class MailService:
         from_email: Optional[str],
         from_name: Optional[str],
         message_id: Optional[str],
-    ) -> EmailMessage:
+    ) -> "OutgoingMessage":
         msg = EmailMessage()
 
         # From
@@ -224,40 +438,61 @@ class MailService:
                 continue
             msg[k] = v
 
-        # Body (multipart/alternative)
+        # Body (multipart/alternative) — aynı gövde (toplu gönderim) yeniden kodlanmaz
+        body = self._encoded_body(text, html)
+        for k, v in body.items():
+            msg[k] = v
+        msg.set_payload(_raw_payload(body))
+
+        # BCC as a header'a eklenmez; SMTP envelope içinde gönderilecektir
+
+        # Ekler mesaja gömülmez: gönderim sırasında parça parça kodlanıp sokete yazılır
+        if attachments:
+            return _StreamedMessage(msg, [self._attachment_source(a) for a in attachments],
+                                    self._attachment_cache)
+        return msg
+
+    def _encoded_body(self, text: Optional[str], html: Optional[str]) -> EmailMessage:
+        """
+        Gövdeyi (text/html) MIME olarak kodlar ve küçük bir önbellekte tutar.
+        Dönen nesne paylaşılır; çağıran yalnızca header'ları ve payload listesini kopyalar.
+        """
+        key = (text, html)
+        with self._body_lock:
+            body = self._body_cache.get(key)
+            if body is not None:
+                self._body_cache.move_to_end(key)
+                return body
+
+        body = EmailMessage()
         if html and text:
-            msg.set_content(text)
-            msg.add_alternative(html, subtype="html")
+            body.set_content(text)
+            body.add_alternative(html, subtype="html")
         elif html:
             # HTML varsa düz metin fallback de eklemek iyi bir pratik
-            msg.set_content(_html_to_plain_fallback(html))
-            msg.add_alternative(html, subtype="html")
+            body.set_content(_html_to_plain_fallback(html))
+            body.add_alternative(html, subtype="html")
         else:
-            msg.set_content(text or "")
-
-        # Attachments
-        for att in attachments:
-            self._attach(msg, att)
+            body.set_content(text or "")
 
-        # BCC as a header'a eklenmez; SMTP envelope içinde gönderilecektir
-        return msg
+        with self._body_lock:
+            self._body_cache[key] = body
+            if len(self._body_cache) > _BODY_CACHE_SIZE:
+                self._body_cache.popitem(last=False)
+        return body
 
-    def _attach(self, msg: EmailMessage, att: AttachmentType) -> None:
+    def _attachment_source(self, att: AttachmentType) -> "_Attachment":
         if isinstance(att, (str, Path)):
             p = Path(att)
             if not p.exists() or not p.is_file():
                 raise FileNotFoundError(f"Eki bulamadım: {p}")
             ctype, encoding = mimetypes.guess_type(str(p))
-            maintype, subtype = (ctype or "application/octet-stream").split("/", 1)
-            with open(p, "rb") as f:
-                data = f.read()
-            msg.add_attachment(data, maintype=maintype, subtype=subtype, filename=p.name)
-        else:
-            filename, data, mime = att
-            maintype, subtype = (mime or "application/octet-stream").split("/", 1)
-            msg.add_attachment(data, maintype=maintype, subtype=subtype, filename=filename)
+            return _Attachment(p.name, ctype or "application/octet-stream", path=p)
+        filename, data, mime = att
+        return _Attachment(filename, mime or "application/octet-stream", data=data)
 
-    def _send_via_smtp(self, msg: EmailMessage, recipients: Sequence[str]) -> None:
+    def _connect(self) -> smtplib.SMTP:
+        """Yeni bağlantı: ehlo + (starttls + ehlo) + login."""
         context = ssl.create_default_context()
         if self.use_ssl:
             server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
@@ -272,14 +507,230 @@ class MailService:
 
             if self.username and self.password:
                 server.login(self.username, self.password)
+        except Exception:
+            _quit_quietly(server)
+            raise
+        return server
+
+    def _is_expired(self, conn: "_PooledConnection") -> bool:
+        return (
+            conn.sent >= self.max_conn_messages
+            or time.monotonic() - conn.created_at >= self.max_conn_age
+        )
 
-            server.send_message(msg, to_addrs=list(dict.fromkeys(recipients)))  # uniq yap
+    def _acquire(self, fresh: bool = False) -> Tuple["_PooledConnection", bool]:
+        """
+        Havuzdan sağlıklı bir bağlantı alır, yoksa (ya da fresh=True ise) yenisini açar.
+        Dönüş: (bağlantı, yeniden_kullanıldı_mı)
+        """
+        if not self._pool_slots.acquire(timeout=self.timeout):
+            raise TimeoutError("SMTP bağlantı havuzunda boş yer bekleme süresi doldu.")
+
+        try:
+            while not fresh:
+                with self._pool_lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    break
+                if self._is_expired(conn):
+                    _quit_quietly(conn.server)
+                    continue
+                if time.monotonic() - conn.last_used >= self.noop_after:
+                    try:
+                        code, _ = conn.server.noop()
+                        if code != 250:
+                            raise smtplib.SMTPServerDisconnected(f"NOOP {code}")
+                    except Exception:
+                        _quit_quietly(conn.server)
+                        continue
+                return conn, True
+
+            return _PooledConnection(self._connect()), False
+        except Exception:
+            self._pool_slots.release()
+            raise
+
+    def _release(self, conn: "_PooledConnection", healthy: bool) -> None:
+        try:
+            conn.last_used = time.monotonic()
+            if healthy and not self._is_expired(conn):
+                with self._pool_lock:
+                    self._idle.append(conn)
+            else:
+                _quit_quietly(conn.server)
         finally:
+            self._pool_slots.release()
+
+    def _send_via_smtp(self, msg: "OutgoingMessage", recipients: Sequence[str]) -> None:
+        to_addrs = list(dict.fromkeys(recipients))  # uniq yap
+
+        for attempt in (1, 2):
+            conn, reused = self._acquire(fresh=attempt == 2)
+            healthy = False
             try:
-                server.quit()
-            except Exception:
-                # Bağlantı zaten kapanmış olabilir
-                pass
+                self._transmit(conn, msg, to_addrs)
+                healthy = True
+                return
+            except smtplib.SMTPServerDisconnected:
+                # Havuzdan gelen bağlantı sunucu tarafından kapatılmış olabilir; bir kez taze bağlantıyla dene
+                if not reused:
+                    raise
+            finally:
+                self._release(conn, healthy)
+
+    def _transmit(self, conn: "_PooledConnection", msg: "OutgoingMessage", to_addrs: List[str]) -> None:
+        if isinstance(msg, _StreamedMessage):
+            envelope_from = parseaddr(msg["Sender"] or msg["From"])[1]
+            results = self._send_pipelined(conn, msg, envelope_from, to_addrs)
+            if not any(ok for _, ok, _ in results):
+                raise smtplib.SMTPRecipientsRefused({r: (0, info.encode()) for r, _, info in results})
+        else:
+            conn.server.send_message(msg, to_addrs=to_addrs)
+            conn.sent += 1
+
+
+class _Attachment:
+    """Gönderim anında kodlanacak ek: diskteki dosya ya da bellekteki bayt."""
+
+    __slots__ = ("filename", "mime", "path", "data")
+
+    def __init__(self, filename: str, mime: str, *, path: Optional[Path] = None,
+                 data: Optional[bytes] = None) -> None:
+        self.filename = filename
+        self.mime = mime
+        self.path = path
+        self.data = data
+
+    def headers(self) -> bytes:
+        part = MIMEPart(policy=_SMTP_POLICY)
+        maintype, subtype = (self.mime or "application/octet-stream").split("/", 1)
+        part["Content-Type"] = f"{maintype}/{subtype}"
+        part["Content-Transfer-Encoding"] = "base64"
+        part.add_header("Content-Disposition", "attachment", filename=self.filename)
+        return b"".join(_SMTP_POLICY.fold_binary(k, v) for k, v in part.items()) + b"\r\n"
+
+    def cache_key(self) -> Optional[Tuple[str, int, int]]:
+        if self.path is None:
+            return None
+        st = self.path.stat()
+        return str(self.path.resolve()), st.st_size, st.st_mtime_ns
+
+    def size(self) -> int:
+        return self.path.stat().st_size if self.path is not None else len(self.data or b"")
+
+    def iter_base64(self) -> Iterator[bytes]:
+        """76 karakterlik CRLF satırlar halinde base64; bellekte en fazla bir okuma bloğu tutulur."""
+        if self.path is None:
+            data = memoryview(self.data or b"")
+            for i in range(0, len(data), _B64_READ_SIZE):
+                yield _b64_lines(data[i:i + _B64_READ_SIZE])
+            return
+        with open(self.path, "rb") as f:
+            while True:
+                block = f.read(_B64_READ_SIZE)
+                if not block:
+                    break
+                yield _b64_lines(block)
+
+
+class _EncodedAttachmentCache:
+    """Kodlanmış ek gövdeleri için toplam boyutla sınırlı LRU (dosya yolu + boyut + mtime anahtarlı)."""
+
+    def __init__(self, max_bytes: int, max_item: int) -> None:
+        self.max_bytes = max(0, max_bytes)
+        self.max_item = max(0, max_item)
+        self._items: "OrderedDict[Tuple[str, int, int], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def encoded(self, att: _Attachment) -> Iterator[bytes]:
+        key = att.cache_key() if self.max_bytes else None
+        if key is None or att.size() > self.max_item:
+            yield from att.iter_base64()
+            return
+
+        with self._lock:
+            cached = self._items.get(key)
+            if cached is not None:
+                self._items.move_to_end(key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        for chunk in att.iter_base64():
+            chunks.append(chunk)
+            yield chunk
+        self._put(key, b"".join(chunks))
+
+    def _put(self, key: Tuple[str, int, int], value: bytes) -> None:
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes and self._items:
+                _, old = self._items.popitem(last=False)
+                self._size -= len(old)
+
+
+class _StreamedMessage:
+    """
+    Başlıklar ve gövde bellekte hazır; ekler gönderim sırasında parça parça kodlanır.
+    Tüm MIME mesajı hiçbir zaman tek bir bayt dizisi olarak oluşturulmaz.
+    """
+
+    def __init__(self, msg: EmailMessage, attachments: List[_Attachment],
+                 cache: _EncodedAttachmentCache) -> None:
+        self.msg = msg
+        self.attachments = attachments
+        self.cache = cache
+        self.boundary = "===============" + uuid.uuid4().hex + "=="
+
+    def __getitem__(self, name: str) -> Optional[str]:
+        return self.msg[name]
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        """DATA aşamasında sokete yazılacak (nokta-doldurulmuş, CRLF) bayt parçaları."""
+        content_headers = {"content-type", "content-transfer-encoding", "mime-version"}
+        head = b"".join(
+            _SMTP_POLICY.fold_binary(k, v) for k, v in self.msg.items() if k.lower() not in content_headers
+        )
+        head += b"MIME-Version: 1.0\r\n"
+        head += f'Content-Type: multipart/mixed; boundary="{self.boundary}"\r\n\r\n'.encode("ascii")
+
+        # Gövde (text / alternative) kendi Content-* başlıklarıyla ilk parça olur
+        body = MIMEPart(policy=_SMTP_POLICY)
+        for k, v in self.msg.items():
+            if k.lower() in ("content-type", "content-transfer-encoding"):
+                body[k] = v
+        body.set_payload(_raw_payload(self.msg))
+
+        delim = f"--{self.boundary}\r\n".encode("ascii")
+        yield _dot_stuff(head + delim + _flatten(body) + b"\r\n")
+
+        for att in self.attachments:
+            yield delim + att.headers()
+            # base64 satırları '.' ile başlamaz; nokta doldurma gerekmez
+            yield from self.cache.encoded(att)
+            yield b"\r\n"
+
+        yield f"--{self.boundary}--\r\n".encode("ascii")
+
+
+OutgoingMessage = Union[EmailMessage, _StreamedMessage]
+
+
+class _PooledConnection:
+    """Havuzdaki tek bir SMTP oturumu ve kullanım sayaçları."""
+
+    __slots__ = ("server", "created_at", "last_used", "sent")
+
+    def __init__(self, server: smtplib.SMTP) -> None:
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.sent = 0
 
 
 # ------------- Utilities -------------
@@ -293,6 +744,90 @@ def _as_list(value: Optional[Union[str, Iterable[str]]]) -> List[str]:
     return [v.strip() for v in value if v and v.strip()]
 
 
+def recipients_of(kwargs: Dict[str, Any]) -> List[str]:
+    """send_email kwargs'ındaki tekil zarf alıcıları (send_bulk sonuçları bu sırayla döner)."""
+    return list(dict.fromkeys(_as_list(kwargs.get("to")) + _as_list(kwargs.get("cc")) + _as_list(kwargs.get("bcc"))))
+
+
+_SMTP_POLICY = email_policy.SMTP
+
+
+def _b64_lines(block: bytes) -> bytes:
+    return base64.encodebytes(block).replace(b"\n", b"\r\n")
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    return re.sub(rb"(?m)^\.", b"..", data)
+
+
+def _send_data(server: smtplib.SMTP, msg: "OutgoingMessage") -> Tuple[int, bytes]:
+    """DATA komutu: akış mesajlarında parçalar doğrudan sokete yazılır."""
+    if not isinstance(msg, _StreamedMessage):
+        return server.data(_flatten(msg))
+
+    server.putcmd("data")
+    code, repl = server.getreply()
+    if code != 354:
+        raise smtplib.SMTPDataError(code, repl)
+    # Küçük parçalar (header, gövde, bitiş işareti) birleştirilip yazılır: art arda küçük
+    # yazımlar Nagle + gecikmeli ACK yüzünden mesaj başına ~40ms bekleyebilir
+    pending = bytearray()
+    try:
+        for chunk in msg.iter_chunks():
+            pending += chunk
+            if len(pending) >= _SEND_BUFFER_SIZE:
+                server.send(bytes(pending))
+                pending.clear()
+    except BaseException:
+        # DATA yarıda kaldı: QUIT gönderilse mesaj gövdesine yazılır; bağlantı doğrudan kapatılır
+        server.close()
+        raise
+    if not pending.endswith(b"\r\n"):
+        pending += b"\r\n"
+    server.send(bytes(pending) + b".\r\n")
+    return server.getreply()
+
+
+def _raw_payload(part: EmailMessage) -> Union[list, str, bytes]:
+    """
+    Başka bir mesaja set_payload ile aynen taşınabilecek payload (alt parça listesinin kopyası / str / bytes).
+    get_payload() 8bit gövdede surrogate'ları çözer; ASCII dışı metin flatten sırasında kodlanamaz.
+    8bit/binary için decode=True ham baytları döndürür, set_payload bunları olduğu gibi geri yükler.
+    """
+    if part.is_multipart():
+        return list(part.get_payload())
+    if str(part.get("content-transfer-encoding", "")).lower() in ("8bit", "binary"):
+        return part.get_payload(decode=True)
+    return part.get_payload()
+
+
+def _flatten(msg: EmailMessage) -> bytes:
+    """SMTP için CRLF satır sonlu bayt gövde (send_message ile aynı üretim)."""
+    with io.BytesIO() as buf:
+        BytesGenerator(buf, policy=msg.policy.clone(linesep="\r\n")).flatten(msg, linesep="\r\n")
+        return buf.getvalue()
+
+
+def _reply_text(reply: Tuple[int, bytes]) -> str:
+    code, resp = reply
+    return f"{code} {resp.decode('utf-8', 'replace') if isinstance(resp, bytes) else resp}"
+
+
+def _is_ascii(*values: str) -> bool:
+    return all(v.isascii() for v in values)
+
+
+def _quit_quietly(server: smtplib.SMTP) -> None:
+    try:
+        server.quit()
+    except Exception:
+        # Bağlantı zaten kapanmış olabilir
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
 def _extract_domain(email_addr: str) -> str:
     try:
         return email_addr.split("@", 1)[1]
@@ -344,3 +879,4 @@ if __name__ == "__main__":
     )
 
     print("Gönderim sonucu:", ok, "| Message-ID/Hata:", info)
+    svc.close()
@@ -0,0 +1,295 @@
+"""
+mail_templates.py
+-----------------
+E-posta gövdeleri için derlenmiş (precompiled) şablonlar.
+
+- Şablon kaynağı bir kez ayrıştırılır: sabit metin parçaları + değişken adları.
+- Marka değerleri (BRAND_*) derleme anında gömülür; markalı HTML iskeleti her
+  gönderimde yeniden kurulmaz.
+- render() yalnızca mesaja özel değişkenleri yerleştirip parçaları birleştirir.
+
+Yer tutucular:
+    {{name}}       -> HTML şablonlarında html.escape ile, text şablonlarında olduğu gibi
+    {{name|raw}}   -> kaçışsız (önceden üretilmiş HTML parçaları için)
+    {{brand.x}}    -> derleme anında marka sözlüğünden doldurulur
+
+Kullanım:
+    reg = TemplateRegistry({"name": "Grispi", "primary": "#6B3DF0", ...})
+    html = reg.render("welcome.html", name="Ömer")
+"""
+
+from __future__ import annotations
+
+import html as _html
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+_PLACEHOLDER = re.compile(r"\{\{\s*([\w.]+)(\|raw)?\s*\}\}")
+
+
+class CompiledTemplate:
+    """Ayrıştırılmış şablon: literal parçalar ve (değişken, kaçış) çiftleri sırayla tutulur."""
+
+    __slots__ = ("name", "_literals", "_slots", "_autoescape")
+
+    def __init__(self, name: str, source: str, static: Dict[str, Any], *, autoescape: bool) -> None:
+        self.name = name
+        self._autoescape = autoescape
+
+        literals: List[str] = []
+        slots: List[Tuple[str, bool]] = []
+        buf: List[str] = []
+        pos = 0
+        for m in _PLACEHOLDER.finditer(source):
+            buf.append(source[pos:m.start()])
+            pos = m.end()
+            key, raw = m.group(1), bool(m.group(2))
+            if key in static:
+                # Sabit değer: komşu literal ile birleştir
+                value = str(static[key])
+                buf.append(value if raw or not autoescape else _html.escape(value))
+                continue
+            literals.append("".join(buf))
+            buf = []
+            slots.append((key, raw))
+        buf.append(source[pos:])
+        literals.append("".join(buf))
+
+        self._literals = literals
+        self._slots = slots
+
+    @property
+    def variables(self) -> List[str]:
+        return [k for k, _ in self._slots]
+
+    def render(self, **values: Any) -> str:
+        lits = self._literals
+        out = [lits[0]]
+        esc = self._autoescape
+        for i, (key, raw) in enumerate(self._slots, 1):
+            v = values.get(key)
+            v = "" if v is None else str(v)
+            out.append(v if raw or not esc else _html.escape(v))
+            out.append(lits[i])
+        return "".join(out)
+
+
+class TemplateRegistry:
+    """
+    İsimle şablon derler ve önbellekte tutar.
+    ".html" ile biten şablonlarda değişkenler HTML kaçışlıdır.
+    """
+
+    def __init__(self, brand: Dict[str, Any], sources: Optional[Dict[str, str]] = None) -> None:
+        self._static = {f"brand.{k}": v for k, v in brand.items()}
+        self._sources = dict(TEMPLATES if sources is None else sources)
+        self._compiled: Dict[str, CompiledTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CompiledTemplate:
+        tpl = self._compiled.get(name)
+        if tpl is None:
+            with self._lock:
+                tpl = self._compiled.get(name)
+                if tpl is None:
+                    tpl = CompiledTemplate(name, self._sources[name], self._static,
+                                           autoescape=name.endswith(".html"))
+                    self._compiled[name] = tpl
+        return tpl
+
+    def render(self, name: str, **values: Any) -> str:
+        return self.get(name).render(**values)
+
+
+# ---------------- Şablonlar ----------------
+
+_TICKET_CARD_HTML = """
+<!DOCTYPE html>
+<html lang="tr">
+  <body style="margin:0;padding:0;background:{{brand.bg}};">
+    <table width="100%" cellpadding="0" cellspacing="0" role="presentation" style="background:{{brand.bg}};padding:24px 0;">
+      <tr>
+        <td align="center">
+          <!-- Card -->
+          <table width="640" cellpadding="0" cellspacing="0" role="presentation"
+                 style="max-width:640px;width:100%;background:{{brand.card_bg}};border:1px solid {{brand.border}};
+                        border-radius:16px;font-family:Segoe UI,Roboto,Helvetica,Arial,sans-serif;color:{{brand.text}}">
+            <!-- Header / Logo -->
+            <tr>
+              <td align="center" style="padding:28px 24px 8px 24px;">
+                <img src="{{brand.logo_url}}" width="48" height="48" alt="{{brand.name}} logo"
+                     style="display:block;border:0;outline:none;"/>
+                <div style="font-size:14px;color:#6b7280;margin-top:8px;letter-spacing:.4px">{{brand.name}}</div>
+              </td>
+            </tr>
+
+            <!-- Title -->
+            <tr>
+              <td style="padding:8px 32px 0 32px;">
+                <h1 style="margin:0;font-size:20px;line-height:28px;color:{{brand.text}};">
+                  {{heading}} <span style="color:{{brand.primary}}">#{{ticket_no}}</span>
+                </h1>
+              </td>
+            </tr>
+
+            <!-- Intro text -->
+            <tr>
+              <td style="padding:12px 32px 8px 32px;font-size:14px;line-height:22px;color:{{brand.text}}">
+                Merhaba,<br/>
+                {{intro|raw}}
+              </td>
+            </tr>
+
+            <!-- Details -->
+            <tr>
+              <td style="padding:8px 32px 16px 32px;">
+                <table width="100%" cellpadding="0" cellspacing="0" role="presentation"
+                       style="border-collapse:separate;border-spacing:0 8px;">
+                  <tr>
+                    <td width="140" style="font-size:12px;color:#6b7280;">Talep No</td>
+                    <td style="font-size:14px;color:{{brand.text}};font-weight:600;">#{{ticket_no}}</td>
+                  </tr>
+                  <tr>
+                    <td width="140" style="font-size:12px;color:#6b7280;">Başlık</td>
+                    <td style="font-size:14px;color:{{brand.text}};">{{title}}</td>
+                  </tr>
+                  <tr>
+                    <td width="140" style="font-size:12px;color:#6b7280;">Durum</td>
+                    <td style="font-size:14px;color:{{brand.text}};">{{status}}</td>
+                  </tr>
+                </table>
+              </td>
+            </tr>
+
+            <!-- CTA -->
+            {{cta|raw}}
+
+            <!-- Footer -->
+            <tr>
+              <td style="padding:20px 32px 28px 32px;font-size:12px;color:#6b7280;border-top:1px solid {{brand.border}}">
+                Bu e-posta {{brand.name}} tarafından gönderildi. Bu mesajı beklemiyor muydun? Lütfen destek ekibiyle iletişime geç.
+              </td>
+            </tr>
+          </table>
+          <!-- /Card -->
+        </td>
+      </tr>
+    </table>
+  </body>
+</html>
+    """
+
+_CTA_HTML = """<tr><td align='left' style='padding:8px 32px 24px 32px;'><a href="{{portal_href}}" target="_blank"
+            style="background:{{brand.primary}};color:#fff;text-decoration:none;
+                   display:inline-block;padding:12px 20px;border-radius:8px;
+                   font-weight:600">Talebi Görüntüle</a></td></tr>"""
+
+_DIGEST_HTML = """
+<!DOCTYPE html>
+<html lang="tr">
+  <body style="margin:0;padding:0;background:{{brand.bg}};">
+    <table width="100%" cellpadding="0" cellspacing="0" role="presentation" style="background:{{brand.bg}};padding:24px 0;">
+      <tr>
+        <td align="center">
+          <table width="640" cellpadding="0" cellspacing="0" role="presentation"
+                 style="max-width:640px;width:100%;background:{{brand.card_bg}};border:1px solid {{brand.border}};
+                        border-radius:16px;font-family:Segoe UI,Roboto,Helvetica,Arial,sans-serif;color:{{brand.text}}">
+            <tr>
+              <td align="center" style="padding:28px 24px 8px 24px;">
+                <img src="{{brand.logo_url}}" width="48" height="48" alt="{{brand.name}} logo"
+                     style="display:block;border:0;outline:none;"/>
+                <div style="font-size:14px;color:#6b7280;margin-top:8px;letter-spacing:.4px">{{brand.name}}</div>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:8px 32px 0 32px;">
+                <h1 style="margin:0;font-size:20px;line-height:28px;color:{{brand.text}};">{{heading}}</h1>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 32px 8px 32px;font-size:14px;line-height:22px;color:{{brand.text}}">
+                Merhaba,<br/>
+                Takip ettiğin taleplerde son güncellemeler aşağıda.
+              </td>
+            </tr>
+            {{items|raw}}
+            <tr>
+              <td style="padding:20px 32px 28px 32px;font-size:12px;color:#6b7280;border-top:1px solid {{brand.border}}">
+                Bu e-posta {{brand.name}} tarafından gönderildi. Bu mesajı beklemiyor muydun? Lütfen destek ekibiyle iletişime geç.
+              </td>
+            </tr>
+          </table>
+        </td>
+      </tr>
+    </table>
+  </body>
+</html>
+    """
+
+_DIGEST_ITEM_HTML = """<tr><td style="padding:8px 32px 16px 32px;">
+              <div style="font-size:15px;font-weight:600;color:{{brand.text}};">
+                <a href="{{portal_href}}" style="color:{{brand.primary}};text-decoration:none">#{{ticket_no}}</a> {{title}}
+                <span style="font-size:12px;color:#6b7280;font-weight:400">{{status}}</span>
+              </div>
+              <ul style="margin:8px 0 0 0;padding-left:18px;font-size:14px;line-height:22px;color:{{brand.text}}">{{events|raw}}</ul>
+            </td></tr>"""
+
+TEMPLATES: Dict[str, str] = {
+    "ticket_card.html": _TICKET_CARD_HTML,
+    "ticket_cta.html": _CTA_HTML,
+    "ticket_opened_intro.html": (
+        "<strong>“{{title}}”</strong> başlıklı talebin başarıyla oluşturuldu.\n"
+        "                En kısa sürede dönüş yapacağız."
+    ),
+    "ticket_update_intro.html": (
+        "<strong>“{{title}}”</strong> başlıklı talepte güncelleme var:<br/>\n"
+        "                {{note}}"
+    ),
+    "ticket_opened.txt": (
+        "Merhaba,\n\n"
+        "#{{ticket_no}} numaralı '{{title}}' başlıklı talebin alındı.\n"
+        "En kısa sürede dönüş yapacağız.\n"
+        "{{portal_line}}"
+        "\n— {{brand.name}}"
+    ),
+    "ticket_update.txt": (
+        "Merhaba,\n\n"
+        "#{{ticket_no}} numaralı '{{title}}' başlıklı talepte güncelleme var:\n"
+        "{{note}}\n"
+        "{{portal_line}}"
+        "\n— {{brand.name}}"
+    ),
+    "ticket_digest.html": _DIGEST_HTML,
+    "ticket_digest_item.html": _DIGEST_ITEM_HTML,
+    "ticket_digest_event.html": "<li>{{at}} · {{text}}</li>",
+    "ticket_digest_item.txt": "#{{ticket_no}} {{title}} ({{status}})\n{{events}}{{portal_line}}",
+    "ticket_digest.txt": (
+        "Merhaba,\n\n"
+        "Takip ettiğin taleplerde son güncellemeler:\n\n"
+        "{{items}}"
+        "\n— {{brand.name}}"
+    ),
+    "welcome.html": """
+    <h2>Merhaba {{name}},</h2>
+    <p>Aramıza <b>hoş geldin</b>! Hesabın başarıyla oluşturuldu.</p>
+    <p>İyi kullanımlar.</p>
+    """,
+    "welcome.txt": "Merhaba {{name}},\n\nAramıza hoş geldin. Hesabın başarıyla oluşturuldu.\nİyi kullanımlar!",
+    "password_reset.html": """
+    <h3>Şifre Sıfırlama</h3>
+    <p>Aşağıdaki bağlantıya tıklayarak şifreni sıfırlayabilirsin:</p>
+    <p><a href="{{reset_link}}">{{reset_link}}</a></p>
+    <p>Bu talebi sen yapmadıysan yok sayabilirsin.</p>
+    """,
+    "password_reset.txt": (
+        "Merhaba,\n\nŞifre sıfırlamak için aşağıdaki bağlantıyı kullan:\n"
+        "{{reset_link}}\n\nBu talebi sen yapmadıysan bu e-postayı yok sayabilirsin."
+    ),
+    "otp.html": """
+    <h3>Doğrulama Kodun</h3>
+    <p><b>{{otp_code}}</b></p>
+    <p>Bu kod {{minutes_valid}} dakika boyunca geçerlidir.</p>
+    """,
+    "otp.txt": "Merhaba,\n\nDoğrulama kodun: {{otp_code}}\nBu kod {{minutes_valid}} dakika boyunca geçerlidir.",
+}
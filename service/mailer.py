@@ -4,6 +4,9 @@ mailer.py
 Basit kullanım için fonksiyon odaklı e-posta yardımcıları.
 mail_service.MailService üzerine ince bir sarmalayıcı.
 
+MAIL_QUEUE_ENABLED açıkken (varsayılan) yardımcılar SMTP'yi beklemez: iş kalıcı
+kuyruğa (mail_queue.MailQueue) yazılır ve True döner (= kuyruğa alındı).
+
 Kurulum:
 - Ortam değişkenlerini ayarlayın (ya da SMTP_* sabitlerini düzenleyin).
 - Projende `from mailer import send_welcome_email` gibi kullan.
@@ -13,8 +16,12 @@ send_welcome_email("kullanici@ornek.com", "Ömer")
 """
 
 import os
-from typing import Optional, Sequence
+import atexit
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
 from .mail_service import MailService
+from .mail_queue import MailQueue
+from .mail_templates import TemplateRegistry
 
 # ---- SMTP Ayarları (ENV ile veya sabitle) ----
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.example.com")
@@ -26,6 +33,18 @@ SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "false").lower() in ("1", "true", "yes"
 SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USERNAME)
 SMTP_FROM_NAME = os.getenv("SMTP_FROM_NAME", "Bildirim Botu")
 
+# ---- Bağlantı havuzu ----
+SMTP_POOL_SIZE         = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_POOL_MAX_AGE      = float(os.getenv("SMTP_POOL_MAX_AGE", "300"))       # saniye
+SMTP_POOL_MAX_MESSAGES = int(os.getenv("SMTP_POOL_MAX_MESSAGES", "100"))
+
+# ---- Arka plan kuyruğu ----
+MAIL_QUEUE_ENABLED      = os.getenv("MAIL_QUEUE_ENABLED", "true").lower() in ("1", "true", "yes")
+MAIL_QUEUE_WORKERS      = int(os.getenv("MAIL_QUEUE_WORKERS", "2"))
+MAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv("MAIL_QUEUE_MAX_ATTEMPTS", "6"))
+MAIL_QUEUE_RETRY_DELAY  = float(os.getenv("MAIL_QUEUE_RETRY_DELAY", "30"))  # saniye, her denemede 2 katına çıkar
+MAIL_SPOOL_DIR          = os.getenv("MAIL_SPOOL_DIR", os.path.join("spool", "mail"))
+
 # ---- Marka ayarları (ENV ile override edilebilir) ----
 BRAND_NAME       = os.getenv("BRAND_NAME", "Grispi")
 BRAND_PRIMARY    = os.getenv("BRAND_PRIMARY", "#6B3DF0")   # mor
@@ -36,6 +55,17 @@ BRAND_BORDER     = os.getenv("BRAND_BORDER", "#ECECF1")
 BRAND_LOGO_URL   = os.getenv("BRAND_LOGO_URL", "https://i.hizliresim.com/2lg5ymb.jpg")
 TICKET_PORTAL_URL= os.getenv("TICKET_PORTAL_URL", "https://grispi.com/tr/")     # örn: https://portal.domain.com/tickets/{ticket_no}
 
+# Marka değerleri şablonlara derleme anında gömülür (her gönderimde yeniden okunmaz)
+templates = TemplateRegistry({
+    "name": BRAND_NAME,
+    "primary": BRAND_PRIMARY,
+    "text": BRAND_TEXT,
+    "bg": BRAND_BG,
+    "card_bg": BRAND_CARD_BG,
+    "border": BRAND_BORDER,
+    "logo_url": BRAND_LOGO_URL,
+})
+
 
 # Tek seferlik servis nesnesi
 _svc = MailService(
@@ -48,10 +78,38 @@ _svc = MailService(
     default_from=SMTP_FROM,
     default_from_name=SMTP_FROM_NAME,
     retries=1,
+    pool_size=SMTP_POOL_SIZE,
+    max_conn_age=SMTP_POOL_MAX_AGE,
+    max_conn_messages=SMTP_POOL_MAX_MESSAGES,
 )
+atexit.register(_svc.close)
+
+_queue: Optional[MailQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_mail_queue() -> MailQueue:
+    """Kuyruğu ilk kullanımda başlatır (spool'da bekleyen işler de devralınır)."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = MailQueue(
+                    _svc,
+                    MAIL_SPOOL_DIR,
+                    workers=MAIL_QUEUE_WORKERS,
+                    max_attempts=MAIL_QUEUE_MAX_ATTEMPTS,
+                    retry_delay=MAIL_QUEUE_RETRY_DELAY,
+                ).start()
+    return _queue
 
 
 def _send(to: Sequence[str] | str, subject: str, text: str, html: Optional[str] = None) -> bool:
+    if MAIL_QUEUE_ENABLED:
+        job_id = get_mail_queue().enqueue(to=to, subject=subject, text=text, html=html)
+        print(f"📧 E-posta kuyruğa alındı: {job_id}")
+        return True
+
     ok, info = _svc.send_email(
         to=to,
         subject=subject,
@@ -63,6 +121,22 @@ def _send(to: Sequence[str] | str, subject: str, text: str, html: Optional[str]
     return ok
 
 
+def _send_bulk(messages: List[Dict]) -> bool:
+    """Çok alıcılı bildirimler: kuyruk açıksa tek iş, değilse doğrudan send_bulk."""
+    if not messages:
+        return True
+    if MAIL_QUEUE_ENABLED:
+        job_id = get_mail_queue().enqueue_bulk(messages)
+        print(f"📧 Toplu e-posta kuyruğa alındı: {job_id} ({len(messages)} mesaj)")
+        return True
+
+    results = _svc.send_bulk(messages, sessions=SMTP_POOL_SIZE)
+    failed = [(r, info) for r, ok, info in results if not ok]
+    for r, info in failed:
+        print(f"E-posta gönderilemedi ({r}): {info}")
+    return not failed
+
+
 # ---------------- Hazır Fonksiyonlar ----------------
 
 def send_welcome_email(email: str, name: str) -> bool:
@@ -70,12 +144,8 @@ def send_welcome_email(email: str, name: str) -> bool:
     Basit hoş geldin e-postası.
     """
     subject = "Aramıza Hoş Geldin!"
-    text = f"Merhaba {name},\n\nAramıza hoş geldin. Hesabın başarıyla oluşturuldu.\nİyi kullanımlar!"
-    html = f"""
-    <h2>Merhaba {name},</h2>
-    <p>Aramıza <b>hoş geldin</b>! Hesabın başarıyla oluşturuldu.</p>
-    <p>İyi kullanımlar.</p>
-    """
+    text = templates.render("welcome.txt", name=name)
+    html = templates.render("welcome.html", name=name)
     try:
         return _send(email, subject, text, html)
     except Exception as e:
@@ -83,109 +153,68 @@ def send_welcome_email(email: str, name: str) -> bool:
         return False
 
 
+def _portal_href(ticket_no: str) -> str:
+    return TICKET_PORTAL_URL.format(ticket_no=ticket_no) if TICKET_PORTAL_URL else ""
 
-def send_ticket_opened_email(email: str, ticket_no: str, title: str) -> bool:
-    """
-    Destek talebi oluşturuldu bildirimi (tasarımlı HTML şablon).
-    """
-    subject = f"Talebin Alındı #{ticket_no}"
 
-    # Düz metin fallback (tüm istemcilerde güvenli)
-    text = (
-        f"Merhaba,\n\n"
-        f"#{ticket_no} numaralı '{title}' başlıklı talebin alındı.\n"
-        f"En kısa sürede dönüş yapacağız.\n"
-        + (f"\nTalebi görüntüle: {TICKET_PORTAL_URL.format(ticket_no=ticket_no)}\n" if TICKET_PORTAL_URL else "")
-        + "\n— {brand}".format(brand=BRAND_NAME)
+def _ticket_card(ticket_no: str, title: str, *, heading: str, intro: str, status: str) -> str:
+    """Markalı ticket kartı (HTML). intro önceden kaçışlanmış HTML olmalı."""
+    href = _portal_href(ticket_no)
+    return templates.render(
+        "ticket_card.html",
+        heading=heading,
+        ticket_no=ticket_no,
+        title=title,
+        status=status,
+        intro=intro,
+        cta=templates.render("ticket_cta.html", portal_href=href) if href else "",
     )
 
-    # HTML şablon (inline CSS — e-posta uyumlu)
-    portal_href = (TICKET_PORTAL_URL or "").format(ticket_no=ticket_no) if TICKET_PORTAL_URL else ""
-    cta_html = (
-        f'''<a href="{portal_href}" target="_blank"
-            style="background:{BRAND_PRIMARY};color:#fff;text-decoration:none;
-                   display:inline-block;padding:12px 20px;border-radius:8px;
-                   font-weight:600">Talebi Görüntüle</a>'''
-        if portal_href else ""
+
+def render_ticket_opened(ticket_no: str, title: str) -> tuple:
+    """Talep açıldı bildirimi için (subject, text, html)."""
+    href = _portal_href(ticket_no)
+    subject = f"Talebin Alındı #{ticket_no}"
+    text = templates.render(
+        "ticket_opened.txt",
+        ticket_no=ticket_no,
+        title=title,
+        portal_line=f"\nTalebi görüntüle: {href}\n" if href else "",
+    )
+    html = _ticket_card(
+        ticket_no, title,
+        heading="Talebin Alındı",
+        intro=templates.render("ticket_opened_intro.html", title=title),
+        status="OPEN",
+    )
+    return subject, text, html
+
+
+def render_ticket_update(ticket_no: str, title: str, note: str, status: str = "") -> tuple:
+    """Ticket güncelleme bildirimi için (subject, text, html)."""
+    href = _portal_href(ticket_no)
+    subject = f"Talebin Güncellendi #{ticket_no}"
+    text = templates.render(
+        "ticket_update.txt",
+        ticket_no=ticket_no,
+        title=title,
+        note=note,
+        portal_line=f"\nTalebi görüntüle: {href}\n" if href else "",
     )
+    html = _ticket_card(
+        ticket_no, title,
+        heading="Talebin Güncellendi",
+        intro=templates.render("ticket_update_intro.html", title=title, note=note),
+        status=status,
+    )
+    return subject, text, html
 
-    html = f"""
-<!DOCTYPE html>
-<html lang="tr">
-  <body style="margin:0;padding:0;background:{BRAND_BG};">
-    <table width="100%" cellpadding="0" cellspacing="0" role="presentation" style="background:{BRAND_BG};padding:24px 0;">
-      <tr>
-        <td align="center">
-          <!-- Card -->
-          <table width="640" cellpadding="0" cellspacing="0" role="presentation"
-                 style="max-width:640px;width:100%;background:{BRAND_CARD_BG};border:1px solid {BRAND_BORDER};
-                        border-radius:16px;font-family:Segoe UI,Roboto,Helvetica,Arial,sans-serif;color:{BRAND_TEXT}">
-            <!-- Header / Logo -->
-            <tr>
-              <td align="center" style="padding:28px 24px 8px 24px;">
-                <img src="{BRAND_LOGO_URL}" width="48" height="48" alt="{BRAND_NAME} logo"
-                     style="display:block;border:0;outline:none;"/>
-                <div style="font-size:14px;color:#6b7280;margin-top:8px;letter-spacing:.4px">{BRAND_NAME}</div>
-              </td>
-            </tr>
-
-            <!-- Title -->
-            <tr>
-              <td style="padding:8px 32px 0 32px;">
-                <h1 style="margin:0;font-size:20px;line-height:28px;color:{BRAND_TEXT};">
-                  Talebin Alındı <span style="color:{BRAND_PRIMARY}">#{ticket_no}</span>
-                </h1>
-              </td>
-            </tr>
-
-            <!-- Intro text -->
-            <tr>
-              <td style="padding:12px 32px 8px 32px;font-size:14px;line-height:22px;color:{BRAND_TEXT}">
-                Merhaba,<br/>
-                <strong>“{title}”</strong> başlıklı talebin başarıyla oluşturuldu.
-                En kısa sürede dönüş yapacağız.
-              </td>
-            </tr>
-
-            <!-- Details -->
-            <tr>
-              <td style="padding:8px 32px 16px 32px;">
-                <table width="100%" cellpadding="0" cellspacing="0" role="presentation"
-                       style="border-collapse:separate;border-spacing:0 8px;">
-                  <tr>
-                    <td width="140" style="font-size:12px;color:#6b7280;">Talep No</td>
-                    <td style="font-size:14px;color:{BRAND_TEXT};font-weight:600;">#{ticket_no}</td>
-                  </tr>
-                  <tr>
-                    <td width="140" style="font-size:12px;color:#6b7280;">Başlık</td>
-                    <td style="font-size:14px;color:{BRAND_TEXT};">{title}</td>
-                  </tr>
-                  <tr>
-                    <td width="140" style="font-size:12px;color:#6b7280;">Durum</td>
-                    <td style="font-size:14px;color:{BRAND_TEXT};">OPEN</td>
-                  </tr>
-                </table>
-              </td>
-            </tr>
-
-            <!-- CTA -->
-            {"<tr><td align='left' style='padding:8px 32px 24px 32px;'>"+cta_html+"</td></tr>" if cta_html else ""}
-
-            <!-- Footer -->
-            <tr>
-              <td style="padding:20px 32px 28px 32px;font-size:12px;color:#6b7280;border-top:1px solid {BRAND_BORDER}">
-                Bu e-posta {BRAND_NAME} tarafından gönderildi. Bu mesajı beklemiyor muydun? Lütfen destek ekibiyle iletişime geç.
-              </td>
-            </tr>
-          </table>
-          <!-- /Card -->
-        </td>
-      </tr>
-    </table>
-  </body>
-</html>
-    """
 
+def send_ticket_opened_email(email: str, ticket_no: str, title: str) -> bool:
+    """
+    Destek talebi oluşturuldu bildirimi (tasarımlı HTML şablon).
+    """
+    subject, text, html = render_ticket_opened(ticket_no, title)
     try:
         return _send(email, subject, text, html)
     except Exception as e:
@@ -198,16 +227,8 @@ def send_password_reset_email(email: str, reset_link: str) -> bool:
     Şifre sıfırlama bağlantısı.
     """
     subject = "Şifre Sıfırlama Talebin"
-    text = (
-        "Merhaba,\n\nŞifre sıfırlamak için aşağıdaki bağlantıyı kullan:\n"
-        f"{reset_link}\n\nBu talebi sen yapmadıysan bu e-postayı yok sayabilirsin."
-    )
-    html = f"""
-    <h3>Şifre Sıfırlama</h3>
-    <p>Aşağıdaki bağlantıya tıklayarak şifreni sıfırlayabilirsin:</p>
-    <p><a href="{reset_link}">{reset_link}</a></p>
-    <p>Bu talebi sen yapmadıysan yok sayabilirsin.</p>
-    """
+    text = templates.render("password_reset.txt", reset_link=reset_link)
+    html = templates.render("password_reset.html", reset_link=reset_link)
     try:
         return _send(email, subject, text, html)
     except Exception as e:
@@ -220,15 +241,8 @@ def send_otp_email(email: str, otp_code: str, minutes_valid: int = 5) -> bool:
     Tek kullanımlık doğrulama kodu.
     """
     subject = "Doğrulama Kodun"
-    text = (
-        f"Merhaba,\n\nDoğrulama kodun: {otp_code}\n"
-        f"Bu kod {minutes_valid} dakika boyunca geçerlidir."
-    )
-    html = f"""
-    <h3>Doğrulama Kodun</h3>
-    <p><b>{otp_code}</b></p>
-    <p>Bu kod {minutes_valid} dakika boyunca geçerlidir.</p>
-    """
+    text = templates.render("otp.txt", otp_code=otp_code, minutes_valid=minutes_valid)
+    html = templates.render("otp.html", otp_code=otp_code, minutes_valid=minutes_valid)
     try:
         return _send(email, subject, text, html)
     except Exception as e:
@@ -236,6 +250,92 @@ def send_otp_email(email: str, otp_code: str, minutes_valid: int = 5) -> bool:
         return False
 
 
+def send_ticket_update_emails(emails: Iterable[str], ticket_no: str, title: str, note: str) -> bool:
+    """
+    Ticket'taki bir değişikliği (yeni mesaj, durum vb.) CC/takipçilere toplu bildirir.
+    Her alıcıya ayrı (kişisel) mesaj gider; gönderim az sayıda SMTP oturumunda yapılır.
+    """
+    # Gövde tüm alıcılar için aynı: bir kez render edilir
+    subject, text, html = render_ticket_update(ticket_no, title, note)
+    messages = [
+        {"to": email, "subject": subject, "text": text, "html": html}
+        for email in dict.fromkeys(e for e in emails if e)
+    ]
+    try:
+        return _send_bulk(messages)
+    except Exception as e:
+        print(f"Ticket güncelleme mailleri gönderilemedi: {e}")
+        return False
+
+
+def render_ticket_digest(items: Sequence[Dict]) -> tuple:
+    """
+    Birden çok ticket olayını tek e-postada toplar; (subject, text, html) döner.
+    items: {"ticket_no", "title", "status", "events": [(saat, metin), ...], "more": int}
+    """
+    html_items, text_items = [], []
+    total = 0
+    for it in items:
+        ticket_no = str(it["ticket_no"])
+        events = list(it.get("events") or [])
+        more = int(it.get("more") or 0)
+        total += len(events) + more
+        href = _portal_href(ticket_no)
+
+        ev_html = "".join(templates.render("ticket_digest_event.html", at=at, text=txt) for at, txt in events)
+        ev_text = "".join(f"  - {at} {txt}\n" for at, txt in events)
+        if more:
+            ev_html += templates.render("ticket_digest_event.html", at="", text=f"+{more} güncelleme daha")
+            ev_text += f"  - +{more} güncelleme daha\n"
+
+        html_items.append(templates.render(
+            "ticket_digest_item.html",
+            ticket_no=ticket_no, title=it.get("title") or "", status=it.get("status") or "",
+            portal_href=href, events=ev_html,
+        ))
+        text_items.append(templates.render(
+            "ticket_digest_item.txt",
+            ticket_no=ticket_no, title=it.get("title") or "", status=it.get("status") or "-",
+            events=ev_text, portal_line=f"  Talebi görüntüle: {href}\n" if href else "",
+        ) + "\n")
+
+    if len(items) == 1:
+        subject = f"Talebin Güncellendi #{items[0]['ticket_no']} ({total} güncelleme)"
+    else:
+        subject = f"{len(items)} talepte {total} güncelleme"
+    text = templates.render("ticket_digest.txt", items="".join(text_items))
+    html = templates.render("ticket_digest.html", heading=subject, items="".join(html_items))
+    return subject, text, html
+
+
+def send_ticket_digests(digests: Dict[str, Sequence[Dict]]) -> bool:
+    """
+    Alıcı -> ticket olayları eşlemesinden her alıcıya tek özet e-posta gönderir (tek toplu iş).
+    """
+    messages = []
+    for email, items in digests.items():
+        if not email or not items:
+            continue
+        subject, text, html = render_ticket_digest(items)
+        messages.append({"to": email, "subject": subject, "text": text, "html": html})
+    try:
+        return _send_bulk(messages)
+    except Exception as e:
+        print(f"Özet e-postaları gönderilemedi: {e}")
+        return False
+
+
+def send_bulk_emails(messages: Sequence[Dict]) -> bool:
+    """
+    Kişiselleştirilmiş mesaj listesi (her biri MailService.send_email kwargs'ı) için toplu gönderim.
+    """
+    try:
+        return _send_bulk(list(messages))
+    except Exception as e:
+        print(f"Toplu e-posta gönderilemedi: {e}")
+        return False
+
+
 def send_generic_email(email: str, subject: str, text: str, html: Optional[str] = None) -> bool:
     """
     Her türlü basit gönderim için genel fonksiyon.
@@ -0,0 +1,227 @@
+"""
+notification_digest.py
+----------------------
+Ticket hareketlerini (yeni mesaj, durum/öncelik değişikliği, atama) CC ve takipçilere
+alıcı bazında toplayıp pencere sonunda tek özet e-posta olarak gönderir.
+
+- Bir alıcının ilk olayı bir pencere (DIGEST_WINDOW_SECONDS) açar; pencere boyunca gelen
+  tüm olaylar (farklı ticket'lar dahil) o alıcının özetine eklenir.
+- Pencere dolunca flush thread'i zamanı gelen tüm alıcıları tek toplu iş olarak
+  (mailer.send_ticket_digests -> MailQueue/send_bulk) gönderir.
+  Giden e-posta sayısı olay sayısıyla değil alıcı sayısıyla büyür.
+- Olaylar bellekte tutulur; process kapanırken (atexit) bekleyenler hemen gönderilir.
+  Birden çok process'te her process kendi özetini gönderir.
+
+DIGEST_ENABLED=false ise her olay eskisi gibi anında (send_ticket_update_emails) gönderilir.
+
+Kullanım (controller, commit'ten sonra):
+    notify_ticket_event(cur, ticket_id, request.user_id, lambda actor: f"{actor} yeni mesaj yazdı")
+"""
+
+import atexit
+import datetime
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from service.aes_service import AESService
+from service.mailer import send_ticket_digests, send_ticket_update_emails
+
+load_dotenv()
+
+DIGEST_ENABLED           = os.getenv("DIGEST_ENABLED", "true").lower() in ("1", "true", "yes")
+DIGEST_WINDOW_SECONDS    = float(os.getenv("DIGEST_WINDOW_SECONDS", "300"))
+DIGEST_MAX_EVENTS        = int(os.getenv("DIGEST_MAX_EVENTS", "20"))   # ticket başına özette gösterilen olay
+
+
+class _Digest:
+    __slots__ = ("due", "tickets")
+
+    def __init__(self, due: float) -> None:
+        self.due = due
+        self.tickets: "OrderedDict[int, Dict]" = OrderedDict()
+
+
+class DigestEngine:
+    """
+    Parametreler
+    ------------
+    window : float
+        Alıcı başına toplama penceresi (saniye)
+    send : Callable[[Dict[str, List[Dict]]], bool]
+        alıcı -> ticket özetleri eşlemesini gönderen fonksiyon
+    max_events : int
+        Bir ticket için özette listelenecek en fazla olay; fazlası "+N güncelleme daha" olur
+    """
+
+    def __init__(self, window: float, send: Callable[[Dict[str, List[Dict]]], bool], *, max_events: int = 20) -> None:
+        self.window = max(0.0, window)
+        self.send = send
+        self.max_events = max(1, max_events)
+
+        self._pending: Dict[str, _Digest] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # ------------- Public API -------------
+
+    def start(self) -> "DigestEngine":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="notification-digest", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Döngüyü durdurur ve bekleyen tüm özetleri gönderir."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush(force=True)
+
+    def add(self, emails, ticket_id: int, title: str, status: str, text: str) -> None:
+        """Olayı verilen alıcıların özetlerine ekler."""
+        at = datetime.datetime.now().strftime("%H:%M")
+        with self._cond:
+            for email in dict.fromkeys(e for e in emails if e):
+                digest = self._pending.get(email)
+                if digest is None:
+                    digest = self._pending[email] = _Digest(time.monotonic() + self.window)
+                    heapq.heappush(self._heap, (digest.due, email))
+                    self._cond.notify()
+
+                item = digest.tickets.get(ticket_id)
+                if item is None:
+                    item = digest.tickets[ticket_id] = {
+                        "ticket_no": ticket_id, "title": title, "status": status, "events": [], "more": 0,
+                    }
+                # Başlık/durum en son hâliyle gösterilir
+                item["title"], item["status"] = title or item["title"], status or item["status"]
+                if len(item["events"]) < self.max_events:
+                    item["events"].append((at, text))
+                else:
+                    item["more"] += 1
+
+    def flush(self, force: bool = False) -> int:
+        """Penceresi dolan (force=True ise tüm) özetleri gönderir. Dönüş: gönderilen alıcı sayısı."""
+        now = time.monotonic()
+        due: Dict[str, List[Dict]] = {}
+        with self._cond:
+            while self._heap and (force or self._heap[0][0] <= now):
+                _, email = heapq.heappop(self._heap)
+                digest = self._pending.pop(email, None)
+                if digest is not None:
+                    due[email] = list(digest.tickets.values())
+        if due:
+            try:
+                self.send(due)
+            except Exception as e:
+                print(f"📧 Bildirim özetleri gönderilemedi ({len(due)} alıcı): {e}")
+        return len(due)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    # ------------- Internal helpers -------------
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    wait = self._heap[0][0] - time.monotonic() if self._heap else None
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(timeout=wait)
+                if self._stopping:
+                    return
+            self.flush()
+
+
+_engine: Optional[DigestEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_digest_engine() -> DigestEngine:
+    """Özet motorunu ilk kullanımda başlatır."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = DigestEngine(DIGEST_WINDOW_SECONDS, send_ticket_digests,
+                                       max_events=DIGEST_MAX_EVENTS).start()
+                atexit.register(_engine.stop)
+    return _engine
+
+
+# ---------------- Controller yardımcıları ----------------
+
+def _dec(v):
+    try:
+        return AESService.decrypt(v) if v else None
+    except Exception:
+        return None
+
+
+def ticket_audience(cur, ticket_id: int, actor_id: int, *, followers_only: bool = False):
+    """
+    Ticket'ın bildirim alacak kişileri: CC + takipçiler (olayı yapan hariç), deşifreli e-postalarıyla.
+    followers_only=True -> yalnızca takipçiler (iç notlar CC'lere gitmez).
+    Dönüş: (başlık, durum, olayı_yapanın_adı, [e-posta, ...]); ticket yoksa None.
+    """
+    cur.execute("""
+        SELECT t.subject, t.status, a.name, a.surname
+        FROM TblTicket t
+        LEFT JOIN TblUser a ON a.id = ?
+        WHERE t.TicketId = ?
+    """, (actor_id, ticket_id))
+    t = cur.fetchone()
+    if not t:
+        return None
+
+    cc_sql = "" if followers_only else "SELECT user_id FROM TblTicketCC WHERE ticket_id = ? UNION "
+    params = (ticket_id, ticket_id, actor_id) if not followers_only else (ticket_id, actor_id)
+    cur.execute(f"""
+        SELECT u.preliminary_email
+        FROM ({cc_sql}SELECT user_id FROM TblTicketFollower WHERE ticket_id = ?) w
+        JOIN TblUser u ON u.id = w.user_id
+        WHERE u.id <> ? AND u.is_active = 1 AND u.preliminary_email IS NOT NULL
+    """, params)
+    emails = [e for e in (_dec(r[0]) for r in cur.fetchall()) if e]
+
+    actor = " ".join(p for p in (_dec(t[2]), _dec(t[3])) if p) or "Bir kullanıcı"
+    status = (_dec(t[1]) or "").upper()
+    return _dec(t[0]) or "", status, actor, emails
+
+
+def notify_ticket_event(cur, ticket_id: int, actor_id: int, describe: Callable[[str], str],
+                        *, followers_only: bool = False) -> int:
+    """
+    Ticket olayını CC/takipçilere iletir: DIGEST_ENABLED ise özete eklenir, değilse anında gönderilir.
+    describe(olayı_yapanın_adı) -> olay metni. Dönüş: alıcı sayısı.
+    """
+    audience = ticket_audience(cur, ticket_id, actor_id, followers_only=followers_only)
+    if not audience or not audience[3]:
+        return 0
+    title, status, actor, emails = audience
+    text = describe(actor)
+
+    if DIGEST_ENABLED:
+        get_digest_engine().add(emails, ticket_id, title, status, text)
+    else:
+        send_ticket_update_emails(emails, str(ticket_id), title, text)
+    return len(emails)
+
+
+def snippet(text: str, limit: int = 200) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
@@ -0,0 +1,235 @@
+"""
+search_index.py
+---------------
+AES ile şifreli ticket konusu / açıklaması ve mesaj metinleri için kelime indeksi.
+
+- Metin kelimelere ayrılır (küçük harf, Türkçe karakterler sadeleştirilir: "Yazıcı" = "yazici"),
+  her kelimenin anahtarlı HMAC'i TblSearchToken'a yazılır. Düz metin ve tersine çevrilebilir
+  bir değer saklanmaz; anahtar olmadan indeksten kelime çıkarılamaz.
+- Türkçe ekler için her kelimenin ilk SEARCH_STEM_LENGTH harfi de ayrı (daha düşük ağırlıklı)
+  token olarak yazılır: "yazıcım", "yazıcıya", "yazıcının" aramada birbirini bulur.
+- Arama: sorgu kelimeleri aynı şekilde HMAC'lenir; eşleşme tamamen indeks üzerinde yapılır,
+  tüm kelimeleri içeren ticket'lar alan ağırlığı × tekrar ile sıralanır. Yalnızca dönen
+  sayfadaki ticket'lar deşifre edilir.
+- create_ticket ve add_ticket_message indeksi yazdıkları transaction içinde günceller.
+  Diğer yollar (webhook yorumları, eski kayıtlar) backfill ile indekslenir; TblSyncCheckpoint'te
+  kalınan id tutulur, tekrar çalıştırmak güvenlidir:
+      python -m service.search_index [--rebuild]
+"""
+
+import hashlib
+import hmac
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SEARCH_STEM_LENGTH  = int(os.getenv("SEARCH_STEM_LENGTH", "5"))
+SEARCH_MAX_TERMS    = int(os.getenv("SEARCH_MAX_TERMS", "8"))
+SEARCH_BATCH_SIZE   = int(os.getenv("SEARCH_BATCH_SIZE", "500"))
+
+
+def _index_key() -> bytes:
+    key = os.getenv("SEARCH_INDEX_KEY")
+    if key:
+        return key.encode()
+    # Ayrı anahtar verilmediyse AES anahtarından türetilir (AES anahtarının kendisi kullanılmaz)
+    return hmac.new(os.environ["AES_SECRET_KEY"].encode(), b"search-index", hashlib.sha256).digest()
+
+
+_KEY = _index_key()
+
+FIELD_SUBJECT, FIELD_DESCRIPTION, FIELD_MESSAGE = "s", "d", "m"
+FIELD_WEIGHTS = {FIELD_SUBJECT: 5, FIELD_DESCRIPTION: 3, FIELD_MESSAGE: 1}
+EXACT_WEIGHT, STEM_WEIGHT = 2, 1
+
+_FOLD = str.maketrans({"ı": "i", "İ": "i", "I": "i", "ş": "s", "Ş": "s", "ğ": "g", "Ğ": "g",
+                       "ç": "c", "Ç": "c", "ö": "o", "Ö": "o", "ü": "u", "Ü": "u"})
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"ve", "ile", "bir", "bu", "da", "de", "mi", "mu", "icin", "ama", "veya", "cok", "gibi",
+              "daha", "en", "ne", "o", "su", "the", "and", "or", "of", "to", "in", "is"}
+
+
+def normalize(text: str) -> str:
+    text = (text or "").translate(_FOLD).lower()
+    # Kalan aksanlar (é, â ...) harften ayrılıp atılır
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def words(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(normalize(text)) if len(w) > 1 and w not in _STOPWORDS]
+
+
+def token_hash(term: str) -> str:
+    return hmac.new(_KEY, term.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _terms(word: str) -> List[Tuple[str, int]]:
+    """Kelime -> [(token, ağırlık)]: tam kelime + (uzunsa) kök."""
+    out = [(token_hash("w:" + word), EXACT_WEIGHT)]
+    if len(word) > SEARCH_STEM_LENGTH:
+        out.append((token_hash("p:" + word[:SEARCH_STEM_LENGTH]), STEM_WEIGHT))
+    elif len(word) == SEARCH_STEM_LENGTH:
+        out.append((token_hash("p:" + word), STEM_WEIGHT))
+    return out
+
+
+def document_tokens(text: str) -> Dict[str, int]:
+    """Metin -> {token: tekrar}. Kök token'ı, kısa kelimeler için de yazılır ki 'yazic' sorgusu eşleşsin."""
+    counts: Counter = Counter()
+    for w in words(text):
+        counts["w:" + w] += 1
+        counts["p:" + w[:SEARCH_STEM_LENGTH]] += 1
+    return {token_hash(t): min(n, 32767) for t, n in counts.items()}
+
+
+# ---------------- İndeks yazımı ----------------
+
+_INSERT_SQL = """
+    INSERT INTO TblSearchToken (token, ticket_id, message_id, field, hits)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def _insert(cur, rows) -> None:
+    if rows:
+        cur.fast_executemany = True
+        cur.executemany(_INSERT_SQL, rows)
+
+
+def index_ticket(cur, ticket_id: int, subject: Optional[str], description: Optional[str]) -> None:
+    """Ticket konusu + açıklaması (ticket'ı yazan transaction içinde)."""
+    rows = [(tok, ticket_id, None, FIELD_SUBJECT, n) for tok, n in document_tokens(subject).items()]
+    rows += [(tok, ticket_id, None, FIELD_DESCRIPTION, n) for tok, n in document_tokens(description).items()]
+    _insert(cur, rows)
+
+
+def index_message(cur, ticket_id: int, message_id: int, text: Optional[str]) -> None:
+    _insert(cur, [(tok, ticket_id, message_id, FIELD_MESSAGE, n) for tok, n in document_tokens(text).items()])
+
+
+# ---------------- Arama ----------------
+
+def query_terms(q: str) -> List[List[Tuple[str, int]]]:
+    """Sorgu -> her kelime için [(token, ağırlık)] (tekrarlar atılır, en fazla SEARCH_MAX_TERMS)."""
+    seen, out = set(), []
+    for w in words(q):
+        if w not in seen:
+            seen.add(w)
+            out.append(_terms(w))
+    return out[:SEARCH_MAX_TERMS]
+
+
+def search(cur, q: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, int, Optional[int]]]:
+    """
+    Tüm kelimeleri (tam ya da kök olarak) içeren ticket'lar, skora göre.
+    Dönüş: [(ticket_id, skor, eşleşen_son_mesaj_id)]
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+    values, params = [], []
+    for i, variants in enumerate(terms):
+        for tok, w in variants:
+            values.append("(?, ?, ?)")
+            params += [tok, i, w]
+    field_score = " ".join(f"WHEN '{f}' THEN {w}" for f, w in FIELD_WEIGHTS.items())
+    cur.execute(f"""
+        SELECT t.ticket_id,
+               SUM(t.hits * q.w * CASE t.field {field_score} ELSE 1 END) AS score,
+               MAX(t.message_id) AS message_id
+        FROM TblSearchToken t
+        JOIN (VALUES {', '.join(values)}) AS q(token, term, w) ON q.token = t.token
+        GROUP BY t.ticket_id
+        HAVING COUNT(DISTINCT q.term) = ?
+        ORDER BY score DESC, t.ticket_id DESC
+        OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+    """, params + [len(terms), max(0, offset), max(1, limit)])
+    return [(r[0], int(r[1]), r[2]) for r in cur.fetchall()]
+
+
+# ---------------- Backfill ----------------
+
+TICKETS_CHECKPOINT = "search_index_tickets"
+MESSAGES_CHECKPOINT = "search_index_messages"
+
+
+def backfill(conn, batch_size: int = SEARCH_BATCH_SIZE, rebuild: bool = False) -> Tuple[int, int]:
+    """
+    Watermark'tan sonraki ticket ve mesajları indeksler (id sırasıyla, batch başına bir commit).
+    Satırın eski token'ları önce silinir: controller'ın zaten yazdıkları çift sayılmaz.
+    Dönüş: (ticket sayısı, mesaj sayısı)
+    """
+    from service.aes_service import AESService
+    from service.grispi_sync import get_watermark, set_watermark
+
+    def dec(v):
+        try:
+            return AESService.decrypt(v) if v else None
+        except Exception:
+            return None
+
+    cur = conn.cursor()
+    if rebuild:
+        set_watermark(cur, 0, TICKETS_CHECKPOINT)
+        set_watermark(cur, 0, MESSAGES_CHECKPOINT)
+        conn.commit()
+
+    n_tickets = 0
+    last = get_watermark(cur, TICKETS_CHECKPOINT)
+    while True:
+        cur.execute("""
+            SELECT TOP (?) TicketId, subject, description FROM TblTicket
+            WHERE TicketId > ? ORDER BY TicketId
+        """, (batch_size, last))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        ids = [r.TicketId for r in rows]
+        cur.execute(f"DELETE FROM TblSearchToken WHERE message_id IS NULL AND ticket_id IN ({','.join('?' * len(ids))})", ids)
+        for r in rows:
+            index_ticket(cur, r.TicketId, dec(r.subject), dec(r.description))
+        last = ids[-1]
+        set_watermark(cur, last, TICKETS_CHECKPOINT)
+        conn.commit()
+        n_tickets += len(rows)
+
+    n_messages = 0
+    last = get_watermark(cur, MESSAGES_CHECKPOINT)
+    while True:
+        cur.execute("""
+            SELECT TOP (?) id, ticket_id, message_text FROM TblTicketMessage
+            WHERE id > ? ORDER BY id
+        """, (batch_size, last))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        ids = [r.id for r in rows]
+        cur.execute(f"DELETE FROM TblSearchToken WHERE message_id IN ({','.join('?' * len(ids))})", ids)
+        for r in rows:
+            index_message(cur, r.ticket_id, r.id, dec(r.message_text))
+        last = ids[-1]
+        set_watermark(cur, last, MESSAGES_CHECKPOINT)
+        conn.commit()
+        n_messages += len(rows)
+
+    return n_tickets, n_messages
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import pyodbc
+
+    ap = argparse.ArgumentParser(description="TblSearchToken indeksini doldurur")
+    ap.add_argument("--rebuild", action="store_true", help="watermark'ı sıfırla, her şeyi yeniden indeksle")
+    ap.add_argument("--batch-size", type=int, default=SEARCH_BATCH_SIZE)
+    args = ap.parse_args()
+    with pyodbc.connect(os.getenv("CONNECTION_STRING")) as _conn:
+        t, m = backfill(_conn, max(1, args.batch_size), args.rebuild)
+    print(f"İndekslenen: {t} ticket, {m} mesaj")
@@ -0,0 +1,224 @@
+"""
+thumbnails.py
+-------------
+Resim eklerinin (png/jpg) küçük önizlemelerini arka planda üretir.
+
+- Yükleme commit edildikten sonra controller enqueue_thumbnail(blob.path, dosya_adı) çağırır;
+  istek resmi işlemeyi beklemez. Tek bir daemon thread kuyruğu sırayla tüketir.
+- Önizleme blob'un yanına yazılır: uploads/blobs/ab/cd/<sha256>.thumb.jpg
+  Blob içeriği değişmediği için önizleme de değişmez (ETag = sha, immutable önbellek);
+  aynı resim kaç kez yüklenirse yüklensin tek kez üretilir. Blob silinince
+  collect_garbage önizlemeyi de siler.
+- Uzun kenar THUMBNAIL_SIZE piksele indirilir (EXIF yönü uygulanır), JPEG olarak kaydedilir.
+  JPEG kaynaklarda draft() ile çözme sırasında ölçeklenir: büyük fotoğraflar tam boyutta
+  belleğe açılmaz.
+- Pillow kurulu değilse (ya da THUMBNAILS_ENABLED=false) hiçbir şey üretilmez; önizleme
+  ucu 404 döner, uygulamanın geri kalanı etkilenmez.
+
+Eksik önizlemeleri toplu üretmek için:
+    python -m service.thumbnails
+"""
+
+import os
+import queue
+import tempfile
+import threading
+from typing import Optional, Set
+
+from dotenv import load_dotenv
+
+from service.attachment_storage import BLOB_FOLDER, UPLOAD_TMP_FOLDER, blob_path, sha_of_path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:   # Pillow opsiyonel
+    Image = None
+    ImageOps = None
+
+load_dotenv()
+
+THUMBNAILS_ENABLED     = os.getenv("THUMBNAILS_ENABLED", "true").lower() in ("1", "true", "yes")
+THUMBNAIL_SIZE         = int(os.getenv("THUMBNAIL_SIZE", "320"))        # uzun kenar (px)
+THUMBNAIL_QUALITY      = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+THUMBNAIL_QUEUE_SIZE   = int(os.getenv("THUMBNAIL_QUEUE_SIZE", "1000"))
+
+THUMB_SUFFIX           = ".thumb.jpg"
+THUMBNAIL_EXTENSIONS   = {"png", "jpg", "jpeg"}
+_PIL_FORMATS           = ("PNG", "JPEG")
+
+
+def thumbnails_available() -> bool:
+    return THUMBNAILS_ENABLED and Image is not None
+
+
+def is_thumbnailable(filename: Optional[str]) -> bool:
+    return bool(filename) and "." in filename and filename.rsplit(".", 1)[1].lower() in THUMBNAIL_EXTENSIONS
+
+
+def thumbnail_path(path: str) -> str:
+    """Blob yolu -> yanındaki önizleme dosyası."""
+    return path + THUMB_SUFFIX
+
+
+def make_thumbnail(src: str, dst: str, size: int = THUMBNAIL_SIZE, quality: int = THUMBNAIL_QUALITY) -> None:
+    """
+    src resmini küçültüp dst'ye JPEG olarak yazar (geçici dosya + atomik rename).
+    Resim değilse / bozuksa Pillow hatası yükselir.
+    """
+    with Image.open(src, formats=_PIL_FORMATS) as img:
+        if img.format == "JPEG":
+            # DCT ölçeklemesi: 4000px fotoğraf ~500px olarak çözülür
+            img.draft("RGB", (size * 2, size * 2))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((size, size), Image.LANCZOS)
+
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            # JPEG'de şeffaflık yok: beyaz zemine yapıştır
+            img = img.convert("RGBA")
+            bg = Image.new("RGB", img.size, (255, 255, 255))
+            bg.paste(img, mask=img.getchannel("A"))
+            img = bg
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        os.makedirs(UPLOAD_TMP_FOLDER, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_TMP_FOLDER, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+class ThumbnailWorker:
+    """
+    Parametreler
+    ------------
+    size, quality : int
+        Önizleme uzun kenarı (px) ve JPEG kalitesi
+    max_queue : int
+        Bekleyen iş sınırı; doluysa yeni iş düşürülür (önizleme ucu tekrar ister)
+    """
+
+    def __init__(self, size: int = THUMBNAIL_SIZE, quality: int = THUMBNAIL_QUALITY, *, max_queue: int = 1000) -> None:
+        self.size = size
+        self.quality = quality
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()     # resim olmayan / bozuk blob'lar tekrar denenmez
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------- Public API -------------
+
+    def start(self) -> "ThumbnailWorker":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="thumbnails", daemon=True)
+            self._thread.start()
+        return self
+
+    def enqueue(self, path: str) -> bool:
+        """
+        Önizleme üretimini kuyruğa ekler.
+        True: önizleme var ya da üretilecek. False: üretilemez (bozuk resim / kuyruk dolu).
+        """
+        if os.path.isfile(thumbnail_path(path)):
+            return True
+        with self._lock:
+            if path in self._failed:
+                return False
+            if path in self._pending:
+                return True
+            try:
+                self._queue.put_nowait(path)
+            except queue.Full:
+                return False
+            self._pending.add(path)
+        return True
+
+    def process(self, path: str) -> bool:
+        """Tek blob için önizlemeyi senkron üretir (kuyruk thread'i ve toplu üretim kullanır)."""
+        dst = thumbnail_path(path)
+        if os.path.isfile(dst):
+            return True
+        try:
+            make_thumbnail(path, dst, self.size, self.quality)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"🖼️ Önizleme üretilemedi ({os.path.basename(path)}): {e}")
+            with self._lock:
+                self._failed.add(path)
+            return False
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # ------------- Internal helpers -------------
+
+    def _loop(self) -> None:
+        while True:
+            path = self._queue.get()
+            try:
+                self.process(path)
+            finally:
+                with self._lock:
+                    self._pending.discard(path)
+                self._queue.task_done()
+
+
+_worker: Optional[ThumbnailWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_thumbnail_worker() -> ThumbnailWorker:
+    """Önizleme thread'ini ilk kullanımda başlatır."""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = ThumbnailWorker(max_queue=THUMBNAIL_QUEUE_SIZE).start()
+    return _worker
+
+
+def enqueue_thumbnail(path: str, filename: Optional[str]) -> bool:
+    """Controller yardımcısı: resim blob'u ise önizlemeyi arka planda üret (best-effort)."""
+    if not thumbnails_available() or not is_thumbnailable(filename) or not sha_of_path(path):
+        return False
+    try:
+        return get_thumbnail_worker().enqueue(path)
+    except Exception as e:
+        print(f"🖼️ Önizleme kuyruğa eklenemedi: {e}")
+        return False
+
+
+def backfill() -> int:
+    """Önizlemesi olmayan tüm png/jpeg blob'lar için üretir; üretilen sayısını döner."""
+    worker = ThumbnailWorker()
+    made = 0
+    for dirpath, _, names in os.walk(BLOB_FOLDER):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            if not sha_of_path(name) or path != blob_path(name) or os.path.isfile(thumbnail_path(path)):
+                continue
+            # Dosya adı blob'da yok: Pillow başlığa bakıp png/jpeg olmayanları hemen reddeder
+            try:
+                with Image.open(path, formats=_PIL_FORMATS):
+                    pass
+            except Exception:
+                continue
+            if worker.process(path):
+                made += 1
+    return made
+
+
+if __name__ == "__main__":
+    if Image is None:
+        raise SystemExit("Pillow kurulu değil: pip install Pillow")
+    print("Üretilen önizleme:", backfill())
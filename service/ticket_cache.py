@@ -0,0 +1,123 @@
+"""
+ticket_cache.py
+---------------
+/Ticket/<id>/detail için serileştirilmiş (deşifre edilmiş) yanıt gövdelerinin LRU önbelleği.
+
+- Anahtar ticket_id; bir ticket altında message_limit başına bir gövde tutulur.
+- Her kayıt, oluşturulduğu andaki detay doğrulayıcısıyla (ETag) saklanır. Controller her istekte
+  ucuz doğrulayıcıyı hesaplar; ETag tutmuyorsa kayıt kullanılmaz. Böylece başka bir process'in ya da
+  webhook'un yaptığı değişiklik de eski gövde döndürmez.
+- Ticket'ı değiştiren endpoint'ler commit'ten sonra invalidate(ticket_id) çağırır: bellek hemen boşalır.
+- Sınır: TICKET_CACHE_MAX_ENTRIES ticket ve toplam TICKET_CACHE_MAX_BYTES; aşılınca en eski kullanılan atılır.
+  TICKET_CACHE_TTL_SECONDS doğrulayıcıya girmeyen değişikliklerin (kullanıcı/kategori adı) üst sınırıdır.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TICKET_CACHE_ENABLED      = os.getenv("TICKET_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TICKET_CACHE_MAX_ENTRIES  = int(os.getenv("TICKET_CACHE_MAX_ENTRIES", "2000"))
+TICKET_CACHE_MAX_BYTES    = int(os.getenv("TICKET_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TICKET_CACHE_TTL_SECONDS  = float(os.getenv("TICKET_CACHE_TTL_SECONDS", "300"))
+
+
+class CachedDetail(NamedTuple):
+    body: bytes
+    etag: str
+    stored_at: float
+
+
+class TicketCache:
+    def __init__(self, max_entries: int = TICKET_CACHE_MAX_ENTRIES, max_bytes: int = TICKET_CACHE_MAX_BYTES,
+                 ttl: float = TICKET_CACHE_TTL_SECONDS) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.ttl = max(0.0, ttl)
+        self._entries: "OrderedDict[int, Dict[int, CachedDetail]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stale = self.invalidations = self.evictions = 0
+
+    def get(self, ticket_id: int, variant: int, etag: str) -> Optional[bytes]:
+        """Güncel doğrulayıcıyla (etag) oluşturulmuş gövde; yoksa None."""
+        with self._lock:
+            variants = self._entries.get(ticket_id)
+            cached = variants.get(variant) if variants else None
+            if cached is None:
+                self.misses += 1
+                return None
+            if cached.etag != etag or (self.ttl and time.monotonic() - cached.stored_at >= self.ttl):
+                self.stale += 1
+                self._bytes -= len(cached.body)
+                del variants[variant]
+                if not variants:
+                    del self._entries[ticket_id]
+                return None
+            self._entries.move_to_end(ticket_id)
+            self.hits += 1
+            return cached.body
+
+    def put(self, ticket_id: int, variant: int, etag: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            variants = self._entries.setdefault(ticket_id, {})
+            old = variants.get(variant)
+            if old is not None:
+                self._bytes -= len(old.body)
+            variants[variant] = CachedDetail(body, etag, time.monotonic())
+            self._bytes += len(body)
+            self._entries.move_to_end(ticket_id)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= sum(len(c.body) for c in dropped.values())
+                self.evictions += 1
+
+    def invalidate(self, ticket_id: int) -> None:
+        with self._lock:
+            variants = self._entries.pop(int(ticket_id), None)
+            if variants:
+                self._bytes -= sum(len(c.body) for c in variants.values())
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                'enabled': TICKET_CACHE_ENABLED,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+_cache: Optional[TicketCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_ticket_cache() -> TicketCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TicketCache()
+    return _cache
+
+
+def invalidate_ticket(ticket_id: Optional[int]) -> None:
+    if ticket_id is not None and _cache is not None:
+        _cache.invalidate(ticket_id)
@@ -0,0 +1,255 @@
+"""
+ticket_reports.py
+-----------------
+Yönetim raporları için önceden toplanmış günlük tablolar (TblTicketDailyRollup).
+
+- Job, update_date watermark'ından sonra değişen ticket'ları okur (TblSyncCheckpoint).
+  Ticket başına son görülen durum TblTicketReportFact'te tutulur; değişen ticket'ın
+  eski katkısı rollup'tan düşülür, yenisi eklenir. Aynı ticket'ı tekrar işlemek fark üretmez,
+  bu yüzden her çalıştırma REPORT_LAG_SECONDS geriden başlar (geç commit olan yazımlar kaçmaz).
+- Kapalılık şifreli status üzerinde eşitlikle bulunur (AES deterministik): job hiçbir
+  satırı deşifre etmez. Şifreli eşitlik harfe duyarlı olduğu için her durumun büyük / küçük /
+  baş harfi büyük halleri aranır (PATCH eskiden status'u istemcinin gönderdiği gibi yazıyordu).
+  Kapanış anı, ticket'ın kapalı olarak ilk görüldüğü update_date'tir.
+- Açılış ve kapanış, ticket'ın güncel kategori / atanan kişisine yazılır: ticket devredilirse
+  geçmiş günlerdeki sayıları da yeni sahibine geçer.
+- /Ticket/reports/* yalnızca rollup tablosunu okur.
+
+    python -m service.ticket_reports            # cron ile (örn. 5 dakikada bir)
+    python -m service.ticket_reports --rebuild  # tabloları sıfırdan kurar
+"""
+
+import datetime
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REPORT_BATCH_SIZE       = int(os.getenv("REPORT_BATCH_SIZE", "1000"))
+REPORT_LAG_SECONDS      = int(os.getenv("REPORT_LAG_SECONDS", "300"))
+REPORT_CLOSED_STATUSES  = [s.strip().upper() for s in os.getenv("REPORT_CLOSED_STATUSES", "CLOSED,RESOLVED,SOLVED").split(",") if s.strip()]
+REPORT_MAX_DAYS         = int(os.getenv("REPORT_MAX_DAYS", "366"))
+
+CHECKPOINT_NAME = "ticket_reports"
+
+Key = Tuple[datetime.date, int, int]   # (gün, kategori, atanan)
+
+_FACT_MERGE_SQL = """
+    MERGE TblTicketReportFact WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS ticket_id, ? AS category_id, ? AS assignee_id, ? AS created_date, ? AS closed_at) AS s
+      ON t.ticket_id = s.ticket_id
+    WHEN MATCHED THEN UPDATE SET category_id = s.category_id, assignee_id = s.assignee_id,
+         created_date = s.created_date, closed_at = s.closed_at, updated_at = GETDATE()
+    WHEN NOT MATCHED THEN
+      INSERT (ticket_id, category_id, assignee_id, created_date, closed_at, updated_at)
+      VALUES (s.ticket_id, s.category_id, s.assignee_id, s.created_date, s.closed_at, GETDATE());
+"""
+
+_ROLLUP_MERGE_SQL = """
+    MERGE TblTicketDailyRollup WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS day, ? AS category_id, ? AS assignee_id, ? AS created_count, ? AS closed_count,
+                  ? AS resolution_seconds) AS s
+      ON t.day = s.day AND t.category_id = s.category_id AND t.assignee_id = s.assignee_id
+    WHEN MATCHED THEN UPDATE SET created_count = t.created_count + s.created_count,
+         closed_count = t.closed_count + s.closed_count,
+         resolution_seconds = t.resolution_seconds + s.resolution_seconds, updated_at = GETDATE()
+    WHEN NOT MATCHED THEN
+      INSERT (day, category_id, assignee_id, created_count, closed_count, resolution_seconds, updated_at)
+      VALUES (s.day, s.category_id, s.assignee_id, s.created_count, s.closed_count, s.resolution_seconds, GETDATE());
+"""
+
+
+def status_variants(status: str) -> List[str]:
+    """Şifreli eşitlik araması için bir durumun yazılmış olabileceği halleri: CLOSED, closed, Closed."""
+    s = status.strip()
+    return list(dict.fromkeys([s.upper(), s.lower(), s.capitalize()]))
+
+
+def _to_ms(dt: datetime.datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+def _from_ms(ms: int) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(ms / 1000.0)
+
+
+def _contribution(deltas: Dict[Key, List[int]], fact: tuple, sign: int) -> None:
+    """fact: (category_id, assignee_id, created_date, closed_at) -> rollup'a katkısı (sign: +1 / -1)."""
+    category_id, assignee_id, created_date, closed_at = fact
+    deltas[(created_date.date(), category_id, assignee_id)][0] += sign
+    if closed_at is not None:
+        d = deltas[(closed_at.date(), category_id, assignee_id)]
+        d[1] += sign
+        d[2] += sign * max(0, int((closed_at - created_date).total_seconds()))
+
+
+def apply_rollup(cur, deltas: Dict[Key, List[int]]) -> None:
+    rows = [(day, cat, asg, c, k, secs) for (day, cat, asg), (c, k, secs) in sorted(deltas.items()) if c or k or secs]
+    if rows:
+        cur.executemany(_ROLLUP_MERGE_SQL, rows)
+
+
+def process_batch(cur, tickets) -> None:
+    """
+    tickets: (TicketId, category_id, assigned_user_id, created_date, update_date, is_closed) satırları.
+    Fact'ler ve rollup aynı transaction'da güncellenir.
+    """
+    ids = [t[0] for t in tickets]
+    cur.execute(f"""
+        SELECT ticket_id, category_id, assignee_id, created_date, closed_at
+        FROM TblTicketReportFact WITH (UPDLOCK)
+        WHERE ticket_id IN ({','.join('?' * len(ids))})
+    """, ids)
+    old = {r[0]: tuple(r[1:]) for r in cur.fetchall()}
+
+    deltas: Dict[Key, List[int]] = defaultdict(lambda: [0, 0, 0])
+    facts = []
+    for ticket_id, category_id, assigned_user_id, created_date, update_date, is_closed in tickets:
+        prev = old.get(ticket_id)
+        closed_at = None
+        if is_closed:
+            closed_at = prev[3] if prev and prev[3] is not None else (update_date or created_date)
+        new = (category_id, assigned_user_id or 0, created_date, closed_at)
+        if new == prev:
+            continue
+        if prev:
+            _contribution(deltas, prev, -1)
+        _contribution(deltas, new, 1)
+        facts.append((ticket_id,) + new)
+
+    if facts:
+        cur.executemany(_FACT_MERGE_SQL, facts)
+        apply_rollup(cur, deltas)
+
+
+def run(conn, batch_size: int = REPORT_BATCH_SIZE, rebuild: bool = False) -> int:
+    """Watermark'tan sonra değişen ticket'ları işler; batch başına bir commit. Dönüş: işlenen ticket sayısı."""
+    from service.aes_service import AESService
+    from service.grispi_sync import get_watermark, set_watermark
+
+    cur = conn.cursor()
+    if rebuild:
+        cur.execute("DELETE FROM TblTicketDailyRollup")
+        cur.execute("DELETE FROM TblTicketReportFact")
+        set_watermark(cur, 0, CHECKPOINT_NAME)
+        conn.commit()
+
+    closed = [AESService.encrypt(v) for s in REPORT_CLOSED_STATUSES for v in status_variants(s)] or [None]
+    closed_sql = f"CASE WHEN status IN ({','.join('?' * len(closed))}) THEN 1 ELSE 0 END"
+
+    watermark = get_watermark(cur, CHECKPOINT_NAME)
+    since = _from_ms(watermark) - datetime.timedelta(seconds=REPORT_LAG_SECONDS) if watermark else datetime.datetime(1900, 1, 1)
+    last_id = 0
+    total = 0
+    while True:
+        # (update_date, TicketId) keyset: aynı update_date'e sahip çok sayıda ticket sayfalar arasında kaybolmaz.
+        # CAST: parametre datetime2 gider, DATETIME kolonuyla ms yuvarlaması farkı döngüye sokmasın
+        cur.execute(f"""
+            SELECT TOP (?) TicketId, category_id, assigned_user_id, created_date, update_date, {closed_sql}
+            FROM TblTicket
+            WHERE update_date > CAST(? AS DATETIME) OR (update_date = CAST(? AS DATETIME) AND TicketId > ?)
+            ORDER BY update_date, TicketId
+        """, [batch_size] + closed + [since, since, last_id])
+        rows = [tuple(r) for r in cur.fetchall()]
+        if not rows:
+            break
+        process_batch(cur, rows)
+        since, last_id = rows[-1][4], rows[-1][0]
+        set_watermark(cur, max(watermark, _to_ms(since)), CHECKPOINT_NAME)
+        conn.commit()
+        total += len(rows)
+    return total
+
+
+# ---------------- Okuma (yalnızca rollup) ----------------
+
+def _filters(category_id: Optional[int], assignee_id: Optional[int]) -> Tuple[str, list]:
+    sql, params = "", []
+    if category_id is not None:
+        sql += " AND category_id = ?"
+        params.append(category_id)
+    if assignee_id is not None:
+        sql += " AND assignee_id = ?"
+        params.append(assignee_id)
+    return sql, params
+
+
+def _days(start: datetime.date, end: datetime.date):
+    d = start
+    while d <= end:
+        yield d
+        d += datetime.timedelta(days=1)
+
+
+def volume(cur, start: datetime.date, end: datetime.date,
+           category_id: Optional[int] = None, assignee_id: Optional[int] = None) -> List[dict]:
+    """Gün başına açılan / kapanan (boş günler 0 ile)."""
+    where, params = _filters(category_id, assignee_id)
+    cur.execute(f"""
+        SELECT day, SUM(created_count), SUM(closed_count)
+        FROM TblTicketDailyRollup
+        WHERE day BETWEEN ? AND ? {where}
+        GROUP BY day
+    """, [start, end] + params)
+    by_day = {_as_date(r[0]): (int(r[1]), int(r[2])) for r in cur.fetchall()}
+    return [{'day': d.isoformat(), 'created': by_day.get(d, (0, 0))[0], 'closed': by_day.get(d, (0, 0))[1]}
+            for d in _days(start, end)]
+
+
+def backlog(cur, start: datetime.date, end: datetime.date,
+            category_id: Optional[int] = None, assignee_id: Optional[int] = None) -> List[dict]:
+    """Gün sonunda açık ticket sayısı: başlangıca kadarki toplam + günlük (açılan - kapanan)."""
+    where, params = _filters(category_id, assignee_id)
+    cur.execute(f"""
+        SELECT COALESCE(SUM(created_count - closed_count), 0)
+        FROM TblTicketDailyRollup
+        WHERE day < ? {where}
+    """, [start] + params)
+    running = int(cur.fetchone()[0])
+    daily = {row['day']: row['created'] - row['closed'] for row in volume(cur, start, end, category_id, assignee_id)}
+    out = []
+    for d in _days(start, end):
+        running += daily[d.isoformat()]
+        out.append({'day': d.isoformat(), 'open': running})
+    return out
+
+
+def resolution(cur, start: datetime.date, end: datetime.date, group_by: str = "category",
+               category_id: Optional[int] = None, assignee_id: Optional[int] = None) -> List[tuple]:
+    """Aralıkta kapananlar için (grup_id, kapanan, ortalama saniye); group_by: category | assignee."""
+    col = "assignee_id" if group_by == "assignee" else "category_id"
+    where, params = _filters(category_id, assignee_id)
+    cur.execute(f"""
+        SELECT {col}, SUM(closed_count), SUM(resolution_seconds)
+        FROM TblTicketDailyRollup
+        WHERE day BETWEEN ? AND ? {where}
+        GROUP BY {col}
+        HAVING SUM(closed_count) > 0
+        ORDER BY {col}
+    """, [start, end] + params)
+    return [(r[0], int(r[1]), int(r[2]) / int(r[1])) for r in cur.fetchall()]
+
+
+def _as_date(v) -> datetime.date:
+    if isinstance(v, datetime.datetime):
+        return v.date()
+    if isinstance(v, str):
+        return datetime.date.fromisoformat(v[:10])
+    return v
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import pyodbc
+
+    ap = argparse.ArgumentParser(description="TblTicketDailyRollup raporlarını günceller")
+    ap.add_argument("--rebuild", action="store_true", help="rollup ve fact tablolarını sıfırdan kur")
+    ap.add_argument("--batch-size", type=int, default=REPORT_BATCH_SIZE)
+    args = ap.parse_args()
+    with pyodbc.connect(os.getenv("CONNECTION_STRING")) as _conn:
+        n = run(_conn, max(1, args.batch_size), args.rebuild)
+    print(f"📊 Rapor güncellendi: {n} ticket işlendi")
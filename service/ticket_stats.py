@@ -0,0 +1,150 @@
+"""
+ticket_stats.py
+---------------
+Kategori ve durum başına ticket sayaçları (TblCategoryTicketStat).
+
+- Sayaçlar ticket'ı yazan transaction içinde artırılır/azaltılır; panel sayıları
+  TblTicket taranmadan (ve status deşifre edilmeden) okunur.
+- status, TblTicket'taki şifreli değerle tutulur: AES deterministik olduğu için
+  reconcile GROUP BY'ı doğrudan şifreli kolonda yapabilir.
+- Kilit sırası sabit (category_id, status) olsun diye değişiklikler sıralı uygulanır.
+- reconcile sayaçları TblTicket'tan yeniden sayar ve kaymaları düzeltir
+  (elle yapılan SQL değişiklikleri, geri alınmış deploy'lar vb.):
+      python -m service.ticket_stats
+
+Kullanım:
+    ticket_created(cur, category_id, enc_status)                       # INSERT ile aynı transaction
+    ticket_changed(cur, [(cat, eski_status, cat, yeni_status)])       # UPDATE ... OUTPUT DELETED/INSERTED
+    ticket_changed(cur, [(cat, status, None, None)])                  # silme
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+STAT_MERGE_SQL = """
+    MERGE TblCategoryTicketStat WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS category_id, ? AS status, ? AS delta) AS s
+      ON t.category_id = s.category_id AND t.status = s.status
+    WHEN MATCHED THEN UPDATE SET ticket_count = t.ticket_count + s.delta, updated_at = GETDATE()
+    WHEN NOT MATCHED THEN
+      INSERT (category_id, status, ticket_count, updated_at) VALUES (s.category_id, s.status, s.delta, GETDATE());
+"""
+
+# Toplu UPDATE'lerde (webhook) değişen satırlar bu geçici tabloya OUTPUT edilir
+CAPTURE_TABLE = "#ticket_status_change"
+
+_CAPTURE_APPLY_SQL = f"""
+    MERGE TblCategoryTicketStat WITH (HOLDLOCK) AS t
+    USING (
+        SELECT category_id, status, SUM(delta) AS delta
+        FROM (
+            SELECT category_id, old_status AS status, -1 AS delta FROM {CAPTURE_TABLE} WHERE old_status <> new_status
+            UNION ALL
+            SELECT category_id, new_status, 1 FROM {CAPTURE_TABLE} WHERE old_status <> new_status
+        ) d
+        GROUP BY category_id, status
+        HAVING SUM(delta) <> 0
+    ) AS s
+      ON t.category_id = s.category_id AND t.status = s.status
+    WHEN MATCHED THEN UPDATE SET ticket_count = t.ticket_count + s.delta, updated_at = GETDATE()
+    WHEN NOT MATCHED THEN
+      INSERT (category_id, status, ticket_count, updated_at) VALUES (s.category_id, s.status, s.delta, GETDATE());
+"""
+
+
+def apply_deltas(cur, deltas: Dict[Tuple[int, str], int]) -> None:
+    rows = [(cat, status, d) for (cat, status), d in sorted(deltas.items()) if d]
+    if rows:
+        cur.executemany(STAT_MERGE_SQL, rows)
+
+
+def ticket_created(cur, category_id: int, status: str) -> None:
+    apply_deltas(cur, {(int(category_id), status): 1})
+
+
+def ticket_changed(cur, changes: Iterable[Tuple[Optional[int], Optional[str], Optional[int], Optional[str]]]) -> None:
+    """changes: (eski_kategori, eski_status, yeni_kategori, yeni_status); None tarafı yok sayılır."""
+    deltas: Dict[Tuple[int, str], int] = defaultdict(int)
+    for old_cat, old_status, new_cat, new_status in changes:
+        if (old_cat, old_status) == (new_cat, new_status):
+            continue
+        if old_cat is not None and old_status is not None:
+            deltas[(int(old_cat), old_status)] -= 1
+        if new_cat is not None and new_status is not None:
+            deltas[(int(new_cat), new_status)] += 1
+    apply_deltas(cur, deltas)
+
+
+def begin_capture(cur) -> str:
+    """
+    Toplu UPDATE için geçici değişiklik tablosunu hazırlar; UPDATE'e şu eklenir:
+        OUTPUT INSERTED.category_id, DELETED.status, INSERTED.status INTO #ticket_status_change
+    """
+    cur.execute(f"""
+        IF OBJECT_ID('tempdb..{CAPTURE_TABLE}') IS NOT NULL DROP TABLE {CAPTURE_TABLE};
+        CREATE TABLE {CAPTURE_TABLE} (category_id INT, old_status NVARCHAR(128), new_status NVARCHAR(128));
+    """)
+    return CAPTURE_TABLE
+
+
+def apply_capture(cur) -> None:
+    """begin_capture'dan beri yakalanan durum değişikliklerini sayaçlara tek MERGE ile yansıtır."""
+    cur.execute(_CAPTURE_APPLY_SQL)
+    cur.execute(f"DROP TABLE {CAPTURE_TABLE}")
+
+
+def read_stats(cur, category_id: Optional[int] = None) -> List:
+    """(category_id, category_name, status[şifreli], ticket_count) satırları."""
+    sql = """
+        SELECT s.category_id, c.category_name, s.status, s.ticket_count
+        FROM TblCategoryTicketStat s
+        LEFT JOIN TblCategory c ON c.id = s.category_id
+        WHERE s.ticket_count <> 0
+    """
+    params: Tuple = ()
+    if category_id is not None:
+        sql += " AND s.category_id = ?"
+        params = (category_id,)
+    cur.execute(sql + " ORDER BY s.category_id", params)
+    return cur.fetchall()
+
+
+def reconcile(conn) -> List[Tuple[int, str, int, int]]:
+    """
+    Sayaçları TblTicket'tan yeniden sayar. Sayım sırasında TblTicket'a yazım kısa süre
+    bekletilir (TABLOCK, HOLDLOCK) ki sayım ile sayaçlar aynı anı göstersin.
+    Dönüş: düzeltilen (category_id, status, eski, doğru) listesi.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT category_id, status, COUNT(*)
+        FROM TblTicket WITH (TABLOCK, HOLDLOCK)
+        GROUP BY category_id, status
+    """)
+    actual = {(r[0], r[1]): r[2] for r in cur.fetchall()}
+    cur.execute("SELECT category_id, status, ticket_count FROM TblCategoryTicketStat WITH (UPDLOCK, HOLDLOCK)")
+    stored = {(r[0], r[1]): r[2] for r in cur.fetchall()}
+
+    drift = []
+    for key in sorted(set(actual) | set(stored)):
+        want, have = actual.get(key, 0), stored.get(key, 0)
+        if want != have:
+            drift.append((key[0], key[1], have, want))
+    apply_deltas(cur, {(cat, status): want - have for cat, status, have, want in drift})
+    cur.execute("DELETE FROM TblCategoryTicketStat WHERE ticket_count = 0")
+    conn.commit()
+    return drift
+
+
+if __name__ == "__main__":
+    import os
+
+    import pyodbc
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    with pyodbc.connect(os.getenv("CONNECTION_STRING")) as _conn:
+        _drift = reconcile(_conn)
+    print(f"Düzeltilen sayaç: {len(_drift)}")
+    for _cat, _status, _have, _want in _drift:
+        print(f"  kategori={_cat} {_have} -> {_want}")
@@ -0,0 +1,165 @@
+"""
+upload_sessions.py
+------------------
+Büyük ekler için devam ettirilebilir (parça parça) yükleme.
+
+Akış (controllers/UploadController.py):
+    POST   /Upload/sessions                 {file_name, size, sha256?}  -> session_id
+    PUT    /Upload/sessions/<id>            Upload-Offset: n, X-Chunk-Sha256: <hex>, gövde = parça
+    GET    /Upload/sessions/<id>            kaldığı offset + yazılmış parçalar
+    POST   /Upload/sessions/<id>/finalize   {ticket_id | message_id}   -> ek satırı
+
+- Oturum dosyası uploads/sessions/<id>.upload; parçalar sırayla (offset = received_size) eklenir.
+  Bağlantı koparsa istemci GET ile offset'i öğrenip oradan devam eder.
+- Parça önce ayrı bir dosyaya okunur ve hash'lenir (yavaş ağ DB kilidi tutmaz); özet
+  doğruysa oturum satırı kilitlenip dosyaya eklenir ve TblUploadChunk'a yazılır.
+- finalize tüm dosyayı hash'ler, blob olarak yerine taşır (kopyalamadan: hard link + rename)
+  ve ticket/mesaj ekine bağlar; oturum dosyası ancak commit'ten sonra silinir.
+- Süresi geçen (UPLOAD_SESSION_TTL_SECONDS boyunca parça gelmeyen) oturumlar
+  expire_sessions ile silinir:
+      python -m service.upload_sessions
+"""
+
+import datetime
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import BinaryIO, Tuple
+
+from dotenv import load_dotenv
+
+from service.attachment_storage import UPLOAD_FOLDER, UPLOAD_CHUNK_SIZE, UploadTooLarge
+
+load_dotenv()
+
+UPLOAD_SESSION_FOLDER       = os.path.join(UPLOAD_FOLDER, "sessions")   # blob'larla aynı disk: finalize rename
+RESUMABLE_MAX_BYTES         = int(os.getenv("RESUMABLE_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_CHUNK_MAX_BYTES      = int(os.getenv("UPLOAD_CHUNK_MAX_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_SECONDS  = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def session_path(session_id: str) -> str:
+    return os.path.join(UPLOAD_SESSION_FOLDER, session_id + ".upload")
+
+
+def expires_from_now() -> datetime.datetime:
+    return datetime.datetime.now() + datetime.timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS)
+
+
+def receive_chunk(stream: BinaryIO, max_bytes: int) -> Tuple[str, int, str]:
+    """
+    İstek gövdesini geçici parça dosyasına akıtır.
+    Dönüş: (geçici_yol, boyut, sha256). max_bytes aşılırsa UploadTooLarge (dosya silinir).
+    """
+    os.makedirs(UPLOAD_SESSION_FOLDER, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_SESSION_FOLDER, suffix=".chunk")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                data = stream.read(UPLOAD_CHUNK_SIZE)
+                if not data:
+                    break
+                size += len(data)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                hasher.update(data)
+                f.write(data)
+    except BaseException:
+        discard_chunk(tmp_path)
+        raise
+    return tmp_path, size, hasher.hexdigest()
+
+
+def discard_chunk(tmp_path: str) -> None:
+    try:
+        os.unlink(tmp_path)
+    except FileNotFoundError:
+        pass
+
+
+def append_chunk(session_id: str, offset: int, tmp_path: str) -> None:
+    """
+    Parçayı oturum dosyasına offset'ten itibaren yazar (oturum satırı kilitliyken çağrılır).
+    Önceki yarım kalmış bir yazımdan artan baytlar offset'te kesilir.
+    """
+    path = session_path(session_id)
+    with open(path, "r+b" if os.path.exists(path) else "w+b") as dst, open(tmp_path, "rb") as src:
+        dst.truncate(offset)
+        dst.seek(offset)
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+        dst.flush()
+        os.fsync(dst.fileno())
+    discard_chunk(tmp_path)
+
+
+def snapshot_session_file(session_id: str) -> str:
+    """
+    Oturum dosyasının hard link'ini (olmazsa kopyasını) açar; finalize blob'a bunu taşır.
+    Transaction başarısız olursa asıl dosya yerinde kalır, finalize tekrar denenebilir.
+    """
+    src = session_path(session_id)
+    dst = os.path.join(UPLOAD_SESSION_FOLDER, f"{session_id}.{uuid.uuid4().hex[:8]}.finalize")
+    try:
+        os.link(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, dst)
+    return dst
+
+
+def reset_session_file(session_id: str) -> None:
+    try:
+        os.unlink(session_path(session_id))
+    except FileNotFoundError:
+        pass
+
+
+def expire_sessions(conn) -> int:
+    """
+    Süresi geçmiş oturumları (satır + parça kayıtları + dosya) siler; tamamlanan
+    oturumların satırları da aynı süre sonunda temizlenir. Artık kalmış .chunk/.finalize
+    dosyaları ve satırı olmayan .upload dosyaları da silinir. Dönüş: silinen oturum sayısı.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id FROM TblUploadSession
+        WHERE expires_at < GETDATE()
+    """)
+    expired = [r[0] for r in cur.fetchall()]
+    for i in range(0, len(expired), 500):
+        chunk = expired[i:i + 500]
+        marks = ','.join('?' * len(chunk))
+        cur.execute(f"DELETE FROM TblUploadChunk WHERE session_id IN ({marks})", chunk)
+        cur.execute(f"DELETE FROM TblUploadSession WHERE id IN ({marks})", chunk)
+        conn.commit()
+    for sid in expired:
+        reset_session_file(sid)
+
+    if os.path.isdir(UPLOAD_SESSION_FOLDER):
+        cutoff = time.time() - UPLOAD_SESSION_TTL_SECONDS
+        for entry in os.scandir(UPLOAD_SESSION_FOLDER):
+            if entry.stat().st_mtime >= cutoff:
+                continue
+            if entry.name.endswith(".upload"):
+                cur.execute("SELECT 1 FROM TblUploadSession WHERE id = ?", (entry.name[:-len(".upload")],))
+                if cur.fetchone():
+                    continue
+            discard_chunk(entry.path)
+    return len(expired)
+
+
+if __name__ == "__main__":
+    import pyodbc
+
+    with pyodbc.connect(os.getenv("CONNECTION_STRING")) as _conn:
+        print("Silinen yükleme oturumu:", expire_sessions(_conn))
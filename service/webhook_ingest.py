@@ -0,0 +1,454 @@
+"""
+webhook_ingest.py
+-----------------
+Grispi webhook event'lerini bellekte kuyruklar ve tek bir yazıcı thread ile batch halinde DB'ye yazar.
+
+- HTTP handler yalnızca imzayı doğrular ve event'i kuyruğa koyar (hızlı 202).
+- Yazıcı thread WEBHOOK_BATCH_SIZE event ya da WEBHOOK_FLUSH_INTERVAL saniye dolunca
+  tek bağlantı + tek commit ile yazar; event sayısı kadar bağlantı açılmaz.
+- Tekrar gelen event'ler önce bellekteki son id'lerle, sonra TblWebhookEvent ile elenir.
+  Yalnızca gerçek event id'si (eventId) kullanılır; yoksa içerik özeti (ticket payload'ındaki "id"
+  ticket'ın id'sidir, aynı ticket'ın sonraki event'lerini elemek için kullanılamaz).
+- Handler 202 döndükten sonra Grispi event'i tekrar göndermez. Yazılamayan batch (DB kesintisi)
+  bu yüzden atılmaz: WEBHOOK_SPOOL_DIR'e JSON olarak yazılır ve üstel geri çekilmeyle yeniden denenir.
+  Process yeniden başlarsa spool'dakiler kaldığı yerden devam eder; WEBHOOK_MAX_ATTEMPTS dolunca
+  dead_letter.jsonl'a taşınır. Tekrar yazım güvenlidir (TblWebhookEvent ile elenir).
+
+Spool düzeni (mail_queue ile aynı):
+    <spool>/<batch_id>.json               -> yeniden denenecek batch
+    <spool>/<batch_id>.<pid>.inflight     -> o anda bir process tarafından yazılıyor
+    <spool>/dead_letter.jsonl             -> vazgeçilen batch'ler
+
+Event eşlemesi:
+- Ticket event'leri  -> TblGrispiTicket aynası + (lokal karşılığı varsa) TblTicket status/priority
+- Comment event'leri -> TblTicketMessage (lokal karşılığı olan ticket'lar için, AES ile)
+"""
+
+import os
+import hmac
+import hashlib
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pyodbc
+from dotenv import load_dotenv
+
+from service.aes_service import AESService
+from service.grispi_sync import upsert_grispi_tickets, ms_to_date, safe_field
+from service.mail_queue import _pid_alive
+from service.ticket_stats import begin_capture, apply_capture
+from service.event_bus import publish_ticket_event
+
+load_dotenv()
+
+CONNECTION_STRING = os.getenv("CONNECTION_STRING")
+
+GRISPI_WEBHOOK_SECRET  = os.getenv("GRISPI_WEBHOOK_SECRET")
+WEBHOOK_QUEUE_SIZE     = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))
+WEBHOOK_BATCH_SIZE     = int(os.getenv("WEBHOOK_BATCH_SIZE", "200"))
+WEBHOOK_FLUSH_INTERVAL = float(os.getenv("WEBHOOK_FLUSH_INTERVAL", "1.0"))   # saniye
+WEBHOOK_SEEN_CACHE     = 50000
+WEBHOOK_SPOOL_DIR      = os.getenv("WEBHOOK_SPOOL_DIR", os.path.join("spool", "webhook"))
+WEBHOOK_RETRY_DELAY    = float(os.getenv("WEBHOOK_RETRY_DELAY", "5"))         # saniye, her denemede 2 katı
+WEBHOOK_RETRY_MAX_DELAY = float(os.getenv("WEBHOOK_RETRY_MAX_DELAY", "300"))
+WEBHOOK_MAX_ATTEMPTS   = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "100"))
+
+_queue = queue.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+_seen = OrderedDict()          # son event id'leri (LRU)
+_seen_lock = threading.Lock()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+# ---------------- İmza / parse ----------------
+
+def verify_signature(raw_body: bytes, signature: str) -> bool:
+    """
+    HMAC-SHA256(secret, raw_body) hex karşılaştırması. "sha256=<hex>" formatı da kabul edilir.
+    Secret tanımlı değilse tüm istekler reddedilir.
+    """
+    if not GRISPI_WEBHOOK_SECRET or not signature:
+        return False
+    sig = signature.split("=", 1)[1] if signature.startswith("sha256=") else signature
+    expected = hmac.new(GRISPI_WEBHOOK_SECRET.encode(), raw_body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, sig.strip().lower())
+
+
+def event_id_of(event: dict, raw_body: bytes = b"") -> str:
+    # "id" kullanılmaz: ticket event'lerinde ticket'ın id'si olabilir, aynı ticket'ın sonraki event'leri elenirdi
+    eid = event.get("eventId")
+    if eid:
+        return str(eid)
+    # id gönderilmediyse içerik özeti ile tekilleştir
+    return "sha256:" + hashlib.sha256(raw_body or repr(sorted(event.items())).encode()).hexdigest()
+
+
+def _event_type(event: dict) -> str:
+    return str(event.get("type") or event.get("event") or event.get("eventType") or "").upper()
+
+
+# ---------------- Kuyruk ----------------
+
+def _mark_seen(event_id) -> bool:
+    """Yeni ise True döner ve id'yi kaydeder."""
+    with _seen_lock:
+        if event_id in _seen:
+            _seen.move_to_end(event_id)
+            return False
+        _seen[event_id] = True
+        if len(_seen) > WEBHOOK_SEEN_CACHE:
+            _seen.popitem(last=False)
+        return True
+
+
+def _forget(event_ids):
+    with _seen_lock:
+        for eid in event_ids:
+            _seen.pop(eid, None)
+
+
+def enqueue(event_id: str, event: dict) -> bool:
+    """
+    Event'i yazma kuyruğuna ekler.
+    Dönüş: False -> kuyruk dolu (çağıran 503 dönmeli ki Grispi tekrar denesin).
+    Tekrar gelen event'ler sessizce True döner.
+    """
+    ensure_writer()
+    if not _mark_seen(event_id):
+        return True
+    try:
+        _queue.put_nowait((event_id, event))
+        return True
+    except queue.Full:
+        _forget([event_id])
+        return False
+
+
+def ensure_writer():
+    global _writer
+    if _writer and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer and _writer.is_alive():
+            return
+        _writer = threading.Thread(target=_writer_loop, name="webhook-writer", daemon=True)
+        _writer.start()
+
+
+def _drain_batch(timeout=None):
+    """İlk event'i (en fazla timeout saniye) bekler, sonra batch dolana ya da flush süresi geçene kadar toplar."""
+    try:
+        batch = [_queue.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    deadline = time.monotonic() + WEBHOOK_FLUSH_INTERVAL
+    while len(batch) < WEBHOOK_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _writer_loop():
+    _recover_inflight()
+    next_replay = 0.0   # açılışta spool'da önceki çalıştırmadan kalanlar da denenir
+    while True:
+        batch = _drain_batch(max(0.0, next_replay - time.time()))
+        if batch:
+            due = _write_or_spool(batch)
+            if due is not None:
+                next_replay = min(next_replay, due)
+        if time.time() >= next_replay:
+            next_replay = _replay_due()
+
+
+def _write_or_spool(batch):
+    """Batch'i yazar; iki denemede de yazılamazsa spool'a alır. Dönüş: spool'daki batch'in deneme zamanı."""
+    for attempt in (1, 2):
+        try:
+            write_batch(batch)
+            return None
+        except Exception as e:
+            print(f"⚠️ Webhook batch yazılamadı (deneme {attempt}, {len(batch)} event):", e)
+            if attempt == 1:
+                time.sleep(2)
+                continue
+            try:
+                return _spool(batch, e)
+            except OSError as spool_error:
+                # Spool'a da yazılamıyor: id'leri unut ki aynı event tekrar gelirse işlenebilsin
+                print(f"❌ Webhook batch spool'a yazılamadı, {len(batch)} event kayboldu:", spool_error)
+                _forget([eid for eid, _ in batch])
+                return None
+
+
+# ---------------- Spool (yazılamayan batch'ler) ----------------
+
+def _retry_delay(attempts):
+    return min(WEBHOOK_RETRY_MAX_DELAY, WEBHOOK_RETRY_DELAY * (2 ** max(0, attempts - 1)))
+
+
+def _write_json(path, job):
+    # Yarım yazılmış dosya kalmasın: tmp + atomik replace
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _spool(batch, error):
+    os.makedirs(WEBHOOK_SPOOL_DIR, exist_ok=True)
+    now = time.time()
+    job = {
+        "id": uuid.uuid4().hex,
+        "events": [[eid, ev] for eid, ev in batch],
+        "attempts": 1,
+        "next_attempt_at": now + _retry_delay(1),
+        "created_at": now,
+        "last_error": str(error),
+    }
+    _write_json(os.path.join(WEBHOOK_SPOOL_DIR, job["id"] + ".json"), job)
+    print(f"💾 Webhook batch spool'a alındı ({job['id']}, {len(batch)} event)")
+    return job["next_attempt_at"]
+
+
+def _recover_inflight():
+    """Ölü process'lerin (ya da bu process'in önceki thread'inin) yarıda bıraktığı batch'leri geri alır."""
+    try:
+        names = os.listdir(WEBHOOK_SPOOL_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not name.endswith(".inflight"):
+            continue
+        try:
+            batch_id, pid, _ = name.split(".")
+            if int(pid) != os.getpid() and _pid_alive(int(pid)):
+                continue
+            os.replace(os.path.join(WEBHOOK_SPOOL_DIR, name), os.path.join(WEBHOOK_SPOOL_DIR, batch_id + ".json"))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Yarım kalan webhook batch'i geri alınamadı ({name}): {e}")
+
+
+def _replay_due():
+    """
+    Zamanı gelen spool batch'lerini sırayla yazar; biri yazılamazsa (DB hâlâ yok) tur biter.
+    Dönüş: bir sonraki tarama zamanı. Başka process'lerin spool'u için en geç WEBHOOK_RETRY_MAX_DELAY sonra.
+    """
+    now = time.time()
+    next_replay = now + WEBHOOK_RETRY_MAX_DELAY
+    try:
+        names = sorted(n for n in os.listdir(WEBHOOK_SPOOL_DIR) if n.endswith(".json"))
+    except FileNotFoundError:
+        return next_replay
+
+    for name in names:
+        path = os.path.join(WEBHOOK_SPOOL_DIR, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            continue  # başka process sahiplendi
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Webhook spool dosyası okunamadı ({name}): {e}")
+            continue
+        due = float(job.get("next_attempt_at") or 0)
+        if due > now:
+            next_replay = min(next_replay, due)
+            continue
+
+        # Sahiplen: başka bir process aldıysa dosya yoktur
+        inflight = os.path.join(WEBHOOK_SPOOL_DIR, f"{job['id']}.{os.getpid()}.inflight")
+        try:
+            os.replace(path, inflight)
+        except FileNotFoundError:
+            continue
+
+        try:
+            write_batch([(eid, ev) for eid, ev in job["events"]])
+            os.remove(inflight)
+            print(f"💾 Spool'daki webhook batch'i yazıldı ({job['id']}, {job['attempts']} denemeden sonra)")
+            continue
+        except Exception as e:
+            job["attempts"] += 1
+            job["last_error"] = str(e)
+
+        if job["attempts"] >= WEBHOOK_MAX_ATTEMPTS:
+            job["dead_at"] = time.time()
+            with open(os.path.join(WEBHOOK_SPOOL_DIR, "dead_letter.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(job, ensure_ascii=False) + "\n")
+            os.remove(inflight)
+            print(f"❌ Webhook batch dead-letter'a taşındı ({job['id']}, {len(job['events'])} event): {job['last_error']}")
+            continue
+
+        job["next_attempt_at"] = time.time() + _retry_delay(job["attempts"])
+        _write_json(path, job)
+        os.remove(inflight)
+        print(f"⚠️ Spool'daki webhook batch'i yazılamadı ({job['id']}, deneme {job['attempts']}): {job['last_error']}")
+        return min(next_replay, job["next_attempt_at"])
+
+    return next_replay
+
+
+# ---------------- Yazma ----------------
+
+def _comment_row(event):
+    ticket = event.get("ticket") or {}
+    comment = event.get("comment") or event.get("data") or {}
+    key = ticket.get("key") or event.get("ticketKey")
+    body = comment.get("body") or comment.get("text")
+    if not key or not body:
+        return None
+
+    creator = comment.get("creator") or {}
+    email = creator.get("email") if isinstance(creator, dict) else None
+    created = ms_to_date(comment.get("createdAt"))
+    is_internal = 0 if comment.get("publicVisible", True) else 1
+
+    return (
+        AESService.encrypt(body),
+        created,
+        is_internal,
+        AESService.encrypt(email) if email else None,  # deterministik AES -> TblUser ile eşleşir
+        str(key),
+    )
+
+
+def _ticket_status_row(ticket):
+    key = ticket.get("key")
+    if not key:
+        return None
+    field_map = ticket.get("fieldMap") or {}
+    status = safe_field(field_map, "ts.status") or ticket.get("status")
+    priority = safe_field(field_map, "ts.priority") or ticket.get("priority")
+    if not status and not priority:
+        return None
+    return (
+        AESService.encrypt(str(status).upper()) if status else None,
+        AESService.encrypt(str(priority).upper()) if priority else None,
+        str(key),
+    )
+
+
+def _local_ticket_ids(cur, grispi_keys):
+    """grispi_key -> TicketId (yalnızca lokal karşılığı olanlar)."""
+    keys, out = list(grispi_keys), {}
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        cur.execute(f"""
+            SELECT grispi_key, local_ticket_id FROM TblGrispiTicket
+            WHERE local_ticket_id IS NOT NULL AND grispi_key IN ({','.join('?' * len(chunk))})
+        """, chunk)
+        out.update((r[0], r[1]) for r in cur.fetchall())
+    return out
+
+
+def write_batch(batch):
+    """(event_id, event) listesini tek bağlantı ve tek transaction ile yazar."""
+    if not batch:
+        return 0
+
+    with pyodbc.connect(CONNECTION_STRING) as conn:
+        cur = conn.cursor()
+
+        # 1) DB tarafında daha önce işlenmişleri ele
+        ids = list(dict.fromkeys(eid for eid, _ in batch))
+        done = set()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cur.execute(
+                f"SELECT event_id FROM TblWebhookEvent WHERE event_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            done.update(r[0] for r in cur.fetchall())
+
+        fresh, picked = [], set()
+        for eid, ev in batch:
+            if eid in done or eid in picked:
+                continue
+            picked.add(eid)
+            fresh.append((eid, ev))
+        if not fresh:
+            return 0
+
+        cur.fast_executemany = True
+        cur.executemany(
+            "INSERT INTO TblWebhookEvent (event_id, source, event_type, received_at) VALUES (?, 'grispi', ?, GETDATE())",
+            [(eid, _event_type(ev)[:64] or None) for eid, ev in fresh]
+        )
+
+        # 2) Event'leri türüne göre ayır
+        tickets, comments = [], []
+        for _, ev in fresh:
+            etype = _event_type(ev)
+            if "COMMENT" in etype:
+                row = _comment_row(ev)
+                if row:
+                    comments.append(row)
+            elif "TICKET" in etype and ev.get("ticket"):
+                tickets.append(ev["ticket"])
+
+        # 3) Ticket aynası + lokal ticket durumu
+        if tickets:
+            upsert_grispi_tickets(cur, tickets)
+            status_rows = [r for r in (_ticket_status_row(t) for t in tickets) if r]
+            if status_rows:
+                # Durum değişiklikleri kategori sayaçlarına aynı transaction'da yansır
+                capture = begin_capture(cur)
+                cur.executemany(f"""
+                    UPDATE t
+                    SET status = COALESCE(?, t.status),
+                        priority = COALESCE(?, t.priority),
+                        update_date = GETDATE()
+                    OUTPUT INSERTED.category_id, DELETED.status, INSERTED.status INTO {capture}
+                    FROM TblTicket t
+                    JOIN TblGrispiTicket g ON g.local_ticket_id = t.TicketId
+                    WHERE g.grispi_key = ?
+                """, status_rows)
+                apply_capture(cur)
+
+        # 4) Yorumlar -> lokal mesajlar (gönderen e-postadan bulunamazsa talep sahibi)
+        if comments:
+            cur.executemany("""
+                INSERT INTO TblTicketMessage (ticket_id, sender_user_id, message_text, created_at, is_internal)
+                SELECT t.TicketId, COALESCE(u.id, t.user_id), ?, COALESCE(?, GETDATE()), ?
+                FROM TblGrispiTicket g
+                JOIN TblTicket t ON t.TicketId = g.local_ticket_id
+                OUTER APPLY (SELECT TOP 1 id FROM TblUser WHERE preliminary_email = ?) u
+                WHERE g.grispi_key = ?
+            """, comments)
+            cur.executemany("""
+                UPDATE t SET update_date = GETDATE()
+                FROM TblTicket t
+                JOIN TblGrispiTicket g ON g.local_ticket_id = t.TicketId
+                WHERE g.grispi_key = ?
+            """, [(row[-1],) for row in comments])
+
+        # SSE izleyicileri için lokal karşılıklar (commit sonrası yayınlanır)
+        updated_keys = {r[-1] for r in status_rows} if tickets else set()
+        commented_keys = {r[-1] for r in comments}
+        local_ids = _local_ticket_ids(cur, updated_keys | commented_keys)
+
+        conn.commit()
+
+    for key in updated_keys:
+        publish_ticket_event(local_ids.get(key), 'ticket.updated', {'source': 'grispi'}, queue_changed=True)
+    for key in commented_keys:
+        publish_ticket_event(local_ids.get(key), 'message.created', {'source': 'grispi'})
+
+    print(f"📨 Webhook batch yazıldı: {len(fresh)} event ({len(tickets)} ticket, {len(comments)} yorum)")
+    return len(fresh)
+
+
+def queue_size() -> int:
+    return _queue.qsize()